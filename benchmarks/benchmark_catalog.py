@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import multiprocessing
+import Spartacus.Database
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compare_databases
+import workers.compare_catalog
+import workers.persistent_connection
+
+
+#Catalog comparer modules, whose "get_<module>_tasks" functions get their tasks
+CATALOG_MODULE_LIST = [
+    'compare_functions',
+    'compare_indexes',
+    'compare_mviews',
+    'compare_procedures',
+    'compare_schemas',
+    'compare_sequences',
+    'compare_tables_checks',
+    'compare_tables_columns',
+    'compare_tables_excludes',
+    'compare_tables_fks',
+    'compare_tables_pks',
+    'compare_tables_rules',
+    'compare_tables_triggers',
+    'compare_tables_uniques',
+    'compare_tables',
+    'compare_trigger_functions',
+    'compare_views'
+]
+
+
+#Seconds waited for sessions to report their statistics
+STATISTICS_DELAY = 2.0
+
+
+def get_database(p_params=None):
+    """Get a database from connection params: host, port, database, user and password.
+    """
+
+    return Spartacus.Database.PostgreSQL(
+        p_host=p_params[0],
+        p_port=p_params[1],
+        p_service=p_params[2],
+        p_user=p_params[3],
+        p_password=p_params[4],
+        p_application_name='benchmark_catalog'
+    )
+
+
+def get_catalog_task_list():
+    """Get tasks of every catalog comparer, as compare_databases.py does.
+    """
+
+    v_task_list = []
+
+    for v_module in CATALOG_MODULE_LIST:
+        __import__('workers.{0}'.format(v_module))
+        v_task_list += getattr(sys.modules['workers.{0}'.format(v_module)], 'get_{0}_tasks'.format(v_module))()
+
+    return v_task_list
+
+
+def get_block_count(p_params=None):
+    """Get number of blocks read by all sessions of a database so far, found in shared buffers or not.
+    """
+
+    v_database = get_database(p_params=p_params)
+    v_database.Open(p_autocommit=True)
+
+    try:
+        return int(v_database.Query(p_sql='SELECT blks_hit + blks_read AS block_count FROM pg_stat_database WHERE datname = CURRENT_DATABASE()').Rows[0]['block_count'])
+    finally:
+        v_database.Close()
+
+
+def run(p_params_1=None, p_params_2=None, p_task_list=None, p_processes=None):
+    """Run tasks in a pool of processes with persistent connections, as compare_databases.py does. Returns elapsed seconds, number of messages
+    and number of blocks read by both databases.
+    """
+
+    v_block_count = get_block_count(p_params=p_params_1) + get_block_count(p_params=p_params_2)
+
+    v_manager = multiprocessing.Manager()
+    v_queue = v_manager.Queue()
+    v_pool = multiprocessing.Pool(
+        p_processes,
+        initializer=workers.persistent_connection.initialize_process,
+        initargs=(get_database(p_params=p_params_1), get_database(p_params=p_params_2))
+    )
+
+    v_start_time = time.time()
+    v_result_list = []
+
+    for v_index, v_task in enumerate(p_task_list):
+        v_result_list.append(
+            v_pool.apply_async(
+                func=compare_databases.run_producer_task,
+                kwds={
+                    'p_function': v_task['function'],
+                    'p_kwds': dict(v_task['kwds'], p_block_size=1000, p_fetch_mode='serial', p_queue=v_queue, p_worker_index=v_index)
+                }
+            )
+        )
+
+    v_pool.close()
+    v_pool.join()
+
+    v_elapsed_time = time.time() - v_start_time
+    v_message_count = 0
+
+    #Comparers may fail on objects this version does not handle, like any comparison does, so just how long they took is measured
+    while True:
+        try:
+            v_block = v_queue.get_nowait()
+            v_message_count += len(v_block) if isinstance(v_block, list) else 1
+        except queue.Empty:
+            break
+
+    v_manager.shutdown()
+
+    #Sessions report their statistics when they end, some time after their processes finished
+    time.sleep(STATISTICS_DELAY)
+
+    return (v_elapsed_time, v_message_count, get_block_count(p_params=p_params_1) + get_block_count(p_params=p_params_2) - v_block_count)
+
+
+if __name__ == '__main__':
+    v_parser = argparse.ArgumentParser(description='Benchmark database objects comparison: every catalog comparer against a single shared catalog snapshot ("--catalog-comparison-mode snapshot") or each one in a process of a pool ("--catalog-comparison-mode parallel").')
+    v_parser.add_argument('-s', '--source-database-connection', dest='source_database_connection', type=str, required=True, help='Source database connection: "host:port:database:user:password".')
+    v_parser.add_argument('-t', '--target-database-connection', dest='target_database_connection', type=str, required=True, help='Target database connection: "host:port:database:user:password".')
+    v_parser.add_argument('-p', '--processes', dest='processes', type=int, default=multiprocessing.cpu_count(), help='Number of processes of the pool of parallel mode. Defaults to the number of CPUs.')
+    v_parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=3, help='Number of runs of each mode. The best one is printed.')
+    v_options = v_parser.parse_args()
+
+    v_params_1 = v_options.source_database_connection.split(':')
+    v_params_2 = v_options.target_database_connection.split(':')
+    v_catalog_task_list = get_catalog_task_list()
+
+    v_mode_dict = {
+        'snapshot': (workers.compare_catalog.get_compare_catalog_tasks(p_task_list=v_catalog_task_list, p_database_1=get_database(p_params=v_params_1), p_database_2=get_database(p_params=v_params_2)), 1),
+        'parallel': (v_catalog_task_list, v_options.processes)
+    }
+
+    for v_mode, (v_task_list, v_processes) in v_mode_dict.items():
+        v_run_list = [run(p_params_1=v_params_1, p_params_2=v_params_2, p_task_list=v_task_list, p_processes=v_processes) for v_index in range(v_options.repeat)]
+        v_elapsed_time, v_message_count, v_block_count = min(v_run_list)
+
+        print('{0}: {1:.2f} s, {2} blocks read by both databases, {3} tasks in {4} processes, {5} messages'.format(v_mode, v_elapsed_time, v_block_count, len(v_task_list), v_processes, v_message_count))
@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import multiprocessing
+import Spartacus.Database
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workers.compare_tables_data
+import workers.persistent_connection
+
+
+def get_database(p_params=None):
+    """Get a database from connection params: host, port, database, user and password.
+    """
+
+    return Spartacus.Database.PostgreSQL(
+        p_host=p_params[0],
+        p_port=p_params[1],
+        p_service=p_params[2],
+        p_user=p_params[3],
+        p_password=p_params[4],
+        p_application_name='benchmark_connections'
+    )
+
+
+def run(p_database_list_1=None, p_database_list_2=None, p_schema=None, p_table=None, p_key=None):
+    """Compare a table once for each pair of given databases. Returns elapsed seconds.
+    """
+
+    v_manager = multiprocessing.Manager()
+    v_queue = v_manager.Queue()
+    v_start_time = time.time()
+
+    for v_database_1, v_database_2 in zip(p_database_list_1, p_database_list_2):
+        workers.compare_tables_data.compare_tables_data(
+            p_database_1=v_database_1,
+            p_database_2=v_database_2,
+            p_block_size=1000,
+            p_schema=p_schema,
+            p_table=p_table,
+            p_key=p_key,
+            p_queue=v_queue,
+            p_worker_index=0
+        )
+
+    v_elapsed_time = time.time() - v_start_time
+
+    while True:
+        try:
+            v_queue.get_nowait()
+        except queue.Empty:
+            break
+
+    v_manager.shutdown()
+
+    return v_elapsed_time
+
+
+if __name__ == '__main__':
+    v_parser = argparse.ArgumentParser(description='Benchmark many small tables data comparison tasks: connections opened by each task against persistent connections of the process.')
+    v_parser.add_argument('-s', '--source-database-connection', dest='source_database_connection', type=str, required=True, help='Source database connection: "host:port:database:user:password".')
+    v_parser.add_argument('-t', '--target-database-connection', dest='target_database_connection', type=str, required=True, help='Target database connection: "host:port:database:user:password".')
+    v_parser.add_argument('-n', '--table', dest='table', type=str, required=True, help='Small table compared by each task: "schema.table".')
+    v_parser.add_argument('-k', '--key', dest='key', type=str, required=True, help='Comma separated columns that form the table records key.')
+    v_parser.add_argument('-c', '--tasks', dest='tasks', type=int, default=500, help='Number of tasks.')
+    v_options = v_parser.parse_args()
+
+    v_schema, v_table = v_options.table.split('.')
+    v_params_1 = v_options.source_database_connection.split(':')
+    v_params_2 = v_options.target_database_connection.split(':')
+
+    #As producers got their tasks before: new database objects for each one
+    v_elapsed_time = run(
+        p_database_list_1=[get_database(p_params=v_params_1) for v_index in range(v_options.tasks)],
+        p_database_list_2=[get_database(p_params=v_params_2) for v_index in range(v_options.tasks)],
+        p_schema=v_schema,
+        p_table=v_table,
+        p_key=v_options.key
+    )
+
+    print('connection per task: {0:.2f} s, {1:.0f} tasks/s'.format(v_elapsed_time, v_options.tasks / v_elapsed_time))
+
+    v_connection_1 = workers.persistent_connection.PersistentConnection(p_database=get_database(p_params=v_params_1))
+    v_connection_2 = workers.persistent_connection.PersistentConnection(p_database=get_database(p_params=v_params_2))
+
+    v_elapsed_time = run(
+        p_database_list_1=[v_connection_1] * v_options.tasks,
+        p_database_list_2=[v_connection_2] * v_options.tasks,
+        p_schema=v_schema,
+        p_table=v_table,
+        p_key=v_options.key
+    )
+
+    print('persistent connections: {0:.2f} s, {1:.0f} tasks/s, {2} connections opened'.format(
+        v_elapsed_time,
+        v_options.tasks / v_elapsed_time,
+        v_connection_1.v_connect_count + v_connection_2.v_connect_count
+    ))
+
+    v_connection_1.Release()
+    v_connection_2.Release()
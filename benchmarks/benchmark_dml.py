@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+import inspect
+import decimal
+import datetime
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workers.compare_tables_data
+
+
+class CountingQueue(object):
+    """Stand-in for the queue buffer that just counts messages and characters of their statements.
+    """
+
+    def __init__(self):
+        self.v_count = 0
+        self.v_size = 0
+
+    def put(self, p_data=None):
+        self.v_count += 1
+        self.v_size += len(p_data['row']['sql'])
+
+
+def get_table(p_column_count=None, p_row_count=None):
+    """Get columns, data types and records of a wide table with an integer key and columns of several types.
+    """
+
+    v_type_list = ['text', 'integer', 'numeric(12,2)', 'timestamp without time zone', 'boolean']
+    v_columns = ['id'] + ['c{0}'.format(v_index) for v_index in range(1, p_column_count)]
+
+    v_column_type_dict = {
+        v_column: 'integer' if v_index == 0 else v_type_list[v_index % len(v_type_list)]
+        for v_index, v_column in enumerate(v_columns)
+    }
+
+    v_value_dict = {
+        'text': lambda v_row, v_column: 'value {0} of {1}'.format(v_row, v_column) if v_row % 7 else None,
+        'integer': lambda v_row, v_column: v_row * v_column,
+        'numeric(12,2)': lambda v_row, v_column: decimal.Decimal(v_row) / 4,
+        'timestamp without time zone': lambda v_row, v_column: datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=v_row),
+        'boolean': lambda v_row, v_column: v_row % 2 == 0
+    }
+
+    v_rows = [
+        [v_row] + [
+            v_value_dict[v_column_type_dict[v_columns[v_column]]](v_row, v_column)
+            for v_column in range(1, p_column_count)
+        ]
+        for v_row in range(p_row_count)
+    ]
+
+    return v_columns, v_column_type_dict, v_rows
+
+
+def get_statements_legacy(p_schema=None, p_table=None, p_column_type_dict=None, p_columns=None, p_row=None, p_key=None, p_all_diffs=None):
+    """Build INSERT, UPDATE and DELETE statements of a record formatting the whole templates each time, as done before compiled templates.
+    """
+
+    v_get_value = workers.compare_tables_data.get_sql_value
+    v_get_condition = workers.compare_tables_data.get_sql_key_condition
+
+    return [
+        inspect.cleandoc(
+            doc='''\
+                INSERT INTO {p_schema}.{p_table} (
+                    {p_columns}
+                ) VALUES (
+                    {p_values}
+                );
+            '''.format(
+                p_schema=p_schema,
+                p_table=p_table,
+                p_columns=','.join(p_columns),
+                p_values=','.join([
+                    v_get_value(p_value=v_value, p_type=p_column_type_dict[v_column])
+                    for v_column, v_value in zip(p_columns, p_row)
+                ])
+            )
+        ),
+        inspect.cleandoc(
+            doc='''\
+                UPDATE {p_schema}.{p_table}
+                SET {p_set}
+                WHERE {p_condition};
+            '''.format(
+                p_schema=p_schema,
+                p_table=p_table,
+                p_set=','.join([
+                    '{p_column} = {p_value}'.format(
+                        p_column=v_diff['column'],
+                        p_value=v_get_value(p_value=v_diff['new_value'], p_type=p_column_type_dict[v_diff['column']])
+                    )
+                    for v_diff in p_all_diffs
+                ]),
+                p_condition=v_get_condition(p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key)
+            )
+        ),
+        inspect.cleandoc(
+            doc='''\
+                DELETE
+                FROM {p_schema}.{p_table}
+                WHERE {p_condition};
+            '''.format(
+                p_schema=p_schema,
+                p_table=p_table,
+                p_condition=v_get_condition(p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key)
+            )
+        )
+    ]
+
+
+def run_legacy(p_column_type_dict=None, p_columns=None, p_rows=None, p_key=None, p_diffs=None):
+    """Build statements of all records, formatting whole templates for each one.
+    """
+
+    v_queue = CountingQueue()
+
+    for v_row in p_rows:
+        for v_sql in get_statements_legacy(p_schema='public', p_table='wide', p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=v_row, p_key=p_key, p_all_diffs=p_diffs):
+            v_queue.put({'row': {'sql': v_sql}})
+
+    return v_queue
+
+
+def run_compiled(p_column_type_dict=None, p_columns=None, p_rows=None, p_key=None, p_diffs=None):
+    """Build statements of all records through the callbacks, with templates compiled once.
+    """
+
+    v_queue = CountingQueue()
+    v_templates = workers.compare_tables_data.DmlTemplates(p_schema='public', p_table='wide', p_column_type_dict=p_column_type_dict)
+
+    for v_row in p_rows:
+        workers.compare_tables_data.inserted_callback(p_queue=v_queue, p_schema='public', p_table='wide', p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=v_row, p_key=p_key, p_templates=v_templates)
+        workers.compare_tables_data.updated_callback(p_queue=v_queue, p_schema='public', p_table='wide', p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row_1=v_row, p_row_2=v_row, p_key=p_key, p_all_diffs=p_diffs, p_templates=v_templates)
+        workers.compare_tables_data.deleted_callback(p_queue=v_queue, p_schema='public', p_table='wide', p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=v_row, p_key=p_key, p_templates=v_templates)
+
+    return v_queue
+
+
+if __name__ == '__main__':
+    v_parser = argparse.ArgumentParser(description='Benchmark SQL generation of tables data differences: templates formatted for each record against templates compiled once per table.')
+    v_parser.add_argument('-n', '--rows', dest='rows', type=int, default=20000, help='Number of records. Each one gets an INSERT, an UPDATE and a DELETE statement.')
+    v_parser.add_argument('-c', '--columns', dest='columns', type=int, default=60, help='Number of columns of the table.')
+    v_parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=3, help='Number of repetitions. Best time is reported.')
+    v_options = v_parser.parse_args()
+
+    v_columns, v_column_type_dict, v_rows = get_table(p_column_count=v_options.columns, p_row_count=v_options.rows)
+    v_key = ['id']
+
+    #A quarter of the columns changed in each updated record
+    v_diffs = [
+        {'column': v_column, 'old_value': None, 'new_value': 'new value'}
+        for v_column in v_columns[1::4]
+        if v_column_type_dict[v_column] == 'text'
+    ]
+
+    #Both ways must build the very same statements
+    v_templates = workers.compare_tables_data.DmlTemplates(p_schema='public', p_table='wide', p_column_type_dict=v_column_type_dict)
+
+    for v_row in v_rows[:100]:
+        v_legacy_list = get_statements_legacy(p_schema='public', p_table='wide', p_column_type_dict=v_column_type_dict, p_columns=v_columns, p_row=v_row, p_key=v_key, p_all_diffs=v_diffs)
+
+        v_compiled_list = [
+            v_templates.get_insert_sql(p_columns=v_columns, p_row=v_row, p_key=v_key),
+            v_templates.get_update_sql(p_columns=v_columns, p_row=v_row, p_key=v_key, p_all_diffs=v_diffs),
+            v_templates.get_delete_sql(p_columns=v_columns, p_row=v_row, p_key=v_key)
+        ]
+
+        if v_legacy_list != v_compiled_list:
+            raise Exception('Compiled templates built different statements for record {0}.'.format(v_row[0]))
+
+    for v_name, v_function in [
+        ('formatted per record', run_legacy),
+        ('compiled per table', run_compiled)
+    ]:
+        v_best = None
+
+        for v_index in range(v_options.repeat):
+            v_start = time.perf_counter()
+            v_queue = v_function(p_column_type_dict=v_column_type_dict, p_columns=v_columns, p_rows=v_rows, p_key=v_key, p_diffs=v_diffs)
+            v_elapsed = time.perf_counter() - v_start
+            v_best = v_elapsed if v_best is None else min(v_best, v_elapsed)
+
+        print('{0}: {1:.3f}s, {2:.0f} records/s, {3:.0f} statements/s, {4:.1f} MB of SQL'.format(
+            v_name,
+            v_best,
+            len(v_rows) / v_best,
+            v_queue.v_count / v_best,
+            v_queue.v_size / 1024 / 1024
+        ))
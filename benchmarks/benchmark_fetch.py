@@ -0,0 +1,197 @@
+import os
+import sys
+import time
+import queue
+import socket
+import asyncio
+import argparse
+import multiprocessing
+import Spartacus.Database
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workers.utils
+import workers.compare_tables_data
+
+
+async def forward(p_reader=None, p_writer=None, p_delay=None):
+    """Forward data from a stream to another, delivering each chunk p_delay seconds after it was read, in the same order.
+    """
+
+    v_loop = asyncio.get_running_loop()
+    v_pending = asyncio.Queue()
+
+    async def deliver():
+        while True:
+            v_deadline, v_data = await v_pending.get()
+
+            if v_data is None:
+                break
+
+            await asyncio.sleep(max(0, v_deadline - v_loop.time()))
+            p_writer.write(v_data)
+            await p_writer.drain()
+
+        p_writer.close()
+
+    v_task = asyncio.ensure_future(deliver())
+
+    try:
+        while True:
+            v_data = await p_reader.read(65536)
+
+            if not v_data:
+                break
+
+            v_pending.put_nowait((v_loop.time() + p_delay, v_data))
+    except ConnectionError:
+        pass
+    finally:
+        v_pending.put_nowait((None, None))
+
+    try:
+        await v_task
+    except ConnectionError:
+        pass
+
+
+async def serve(p_server_socket=None, p_host=None, p_port=None, p_latency=None):
+    """Serve connections accepted by p_server_socket, forwarding them to the database, with p_latency seconds of round trip latency.
+    """
+
+    async def handle(p_client_reader, p_client_writer):
+        if p_host.startswith('/'):
+            v_server_reader, v_server_writer = await asyncio.open_unix_connection(os.path.join(p_host, '.s.PGSQL.{0}'.format(p_port)))
+        else:
+            v_server_reader, v_server_writer = await asyncio.open_connection(p_host, int(p_port))
+
+        await asyncio.gather(
+            forward(p_reader=p_client_reader, p_writer=v_server_writer, p_delay=p_latency / 2),
+            forward(p_reader=v_server_reader, p_writer=p_client_writer, p_delay=p_latency / 2)
+        )
+
+    v_server = await asyncio.start_server(handle, sock=p_server_socket)
+
+    async with v_server:
+        await v_server.serve_forever()
+
+
+def run_proxy(p_server_socket=None, p_host=None, p_port=None, p_latency=None):
+    """Run the latency proxy. Meant to be the target of a separate process.
+    """
+
+    asyncio.run(serve(p_server_socket=p_server_socket, p_host=p_host, p_port=p_port, p_latency=p_latency))
+
+
+def start_proxy(p_params=None, p_latency=None):
+    """Start a latency proxy to the database in a separate process. Returns the process and the connection params through the proxy.
+    """
+
+    v_server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    v_server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    v_server_socket.bind(('127.0.0.1', 0))
+    v_server_socket.listen(16)
+
+    v_process = multiprocessing.Process(
+        target=run_proxy,
+        kwargs={'p_server_socket': v_server_socket, 'p_host': p_params[0], 'p_port': p_params[1], 'p_latency': p_latency},
+        daemon=True
+    )
+
+    v_process.start()
+    v_port = v_server_socket.getsockname()[1]
+    v_server_socket.close()
+
+    return v_process, ['127.0.0.1', str(v_port)] + p_params[2:]
+
+
+def run(p_params_1=None, p_params_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_comparison_mode=None, p_fetch_mode=None):
+    """Compare a table in given fetch mode. Returns elapsed seconds and number of found differences.
+    """
+
+    v_manager = multiprocessing.Manager()
+    v_queue = v_manager.Queue()
+
+    v_database_list = [
+        Spartacus.Database.PostgreSQL(
+            p_host=v_params[0],
+            p_port=v_params[1],
+            p_service=v_params[2],
+            p_user=v_params[3],
+            p_password=v_params[4],
+            p_application_name='benchmark_fetch'
+        )
+        for v_params in [p_params_1, p_params_2]
+    ]
+
+    v_start_time = time.time()
+
+    workers.compare_tables_data.compare_tables_data(
+        p_database_1=v_database_list[0],
+        p_database_2=v_database_list[1],
+        p_block_size=p_block_size,
+        p_schema=p_schema,
+        p_table=p_table,
+        p_key=p_key,
+        p_queue=v_queue,
+        p_worker_index=0,
+        p_comparison_mode=p_comparison_mode,
+        p_fetch_mode=p_fetch_mode
+    )
+
+    v_elapsed_time = time.time() - v_start_time
+    v_difference_count = 0
+
+    while True:
+        try:
+            v_data = v_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        if isinstance(v_data, list):
+            v_difference_count += len([v_item for v_item in v_data if v_item.get('type') == 'tables_data'])
+        elif isinstance(v_data, dict) and v_data.get('type') == 'tables_data':
+            v_difference_count += 1
+
+    v_manager.shutdown()
+
+    return v_elapsed_time, v_difference_count
+
+
+if __name__ == '__main__':
+    v_parser = argparse.ArgumentParser(description='Benchmark fetch modes of tables data comparer, through proxies that add latency to database connections.')
+    v_parser.add_argument('-s', '--source-database-connection', dest='source_database_connection', type=str, required=True, help='Source database connection: "host:port:database:user:password".')
+    v_parser.add_argument('-t', '--target-database-connection', dest='target_database_connection', type=str, required=True, help='Target database connection: "host:port:database:user:password".')
+    v_parser.add_argument('-n', '--table', dest='table', type=str, required=True, help='Table to be compared: "schema.table".')
+    v_parser.add_argument('-k', '--key', dest='key', type=str, required=True, help='Comma separated columns that form the table records key.')
+    v_parser.add_argument('-m', '--data-comparison-mode', dest='data_comparison_mode', type=str, default='rows', choices=workers.compare_tables_data.COMPARISON_MODE_LIST, help='How tables data is compared.')
+    v_parser.add_argument('-b', '--block-size', dest='block_size', type=int, default=1000, help='Number of data records fetched at a time.')
+    v_parser.add_argument('-l', '--latency', dest='latency', type=float, default=20, help='Round trip latency added to database connections, in milliseconds.')
+    v_options = v_parser.parse_args()
+
+    v_schema, v_table = v_options.table.split('.')
+    v_process_list = []
+    v_params_list = []
+
+    for v_connection in [v_options.source_database_connection, v_options.target_database_connection]:
+        v_process, v_params = start_proxy(p_params=v_connection.split(':'), p_latency=v_options.latency / 1000)
+        v_process_list.append(v_process)
+        v_params_list.append(v_params)
+
+    try:
+        for v_fetch_mode in workers.utils.FETCH_MODE_LIST:
+            v_elapsed_time, v_difference_count = run(
+                p_params_1=v_params_list[0],
+                p_params_2=v_params_list[1],
+                p_block_size=v_options.block_size,
+                p_schema=v_schema,
+                p_table=v_table,
+                p_key=v_options.key,
+                p_comparison_mode=v_options.data_comparison_mode,
+                p_fetch_mode=v_fetch_mode
+            )
+
+            print('{0}: {1:.2f} s, {2} differences'.format(v_fetch_mode, v_elapsed_time, v_difference_count))
+    finally:
+        for v_process in v_process_list:
+            v_process.terminate()
@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import argparse
+import psycopg2.extras
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workers.utils
+
+
+class FakeCursor(object):
+    """Minimal cursor used to build psycopg2 DictRow instances, just like the ones fetched from the database.
+    """
+
+    def __init__(self, p_columns=None):
+        self.description = [(v_column,) for v_column in p_columns]
+        self.index = {
+            v_column: v_index
+            for v_index, v_column in enumerate(p_columns)
+        }
+
+
+def get_rows(p_columns=None, p_row_count=None, p_step=None):
+    """Get sorted records with a composite key (integer, text), skipping each p_step-th record.
+
+        Args:
+            p_columns (list): list of columns. Defaults to None.
+            p_row_count (int): number of records. Defaults to None.
+            p_step (int): period of skipped records. Defaults to None.
+
+        Returns:
+            list: list of psycopg2.extras.DictRow instances.
+    """
+
+    v_cursor = FakeCursor(p_columns=p_columns)
+    v_row_list = []
+
+    for v_index in range(p_row_count):
+        if v_index % p_step == 0:
+            continue
+
+        v_row = psycopg2.extras.DictRow(v_cursor)
+        v_row[:] = [v_index, 'key {0}'.format(v_index % 10), 'value {0}'.format(v_index), None]
+        v_row_list.append(v_row)
+
+    return v_row_list
+
+
+def merge_legacy(p_rows_1=None, p_rows_2=None, p_key=None):
+    """Merge records using keys built by joining their string representations, as done before typed keys.
+    """
+
+    v_index_1 = 0
+    v_index_2 = 0
+    v_count_dict = {'equal': 0, 'deleted': 0, 'inserted': 0}
+
+    while v_index_1 < len(p_rows_1) and v_index_2 < len(p_rows_2):
+        v_row_1 = p_rows_1[v_index_1]
+        v_row_2 = p_rows_2[v_index_2]
+
+        v_record_1_pk = '_'.join(
+            [
+                str(v_row_1[v_column])
+                for v_column in p_key
+            ]
+        )
+
+        v_record_2_pk = '_'.join(
+            [
+                str(v_row_2[v_column])
+                for v_column in p_key
+            ]
+        )
+
+        if v_record_1_pk == v_record_2_pk:
+            v_count_dict['equal'] += 1
+            v_index_1 += 1
+            v_index_2 += 1
+        elif v_record_1_pk < v_record_2_pk:
+            v_count_dict['deleted'] += 1
+            v_index_1 += 1
+        else:
+            v_count_dict['inserted'] += 1
+            v_index_2 += 1
+
+    v_count_dict['deleted'] += len(p_rows_1) - v_index_1
+    v_count_dict['inserted'] += len(p_rows_2) - v_index_2
+
+    return v_count_dict
+
+
+def merge_typed(p_columns=None, p_rows_1=None, p_rows_2=None, p_key=None):
+    """Merge records using typed key tuples.
+    """
+
+    v_get_key = workers.utils.get_key_function(p_columns=p_columns, p_key=p_key)
+    v_index_1 = 0
+    v_index_2 = 0
+    v_count_dict = {'equal': 0, 'deleted': 0, 'inserted': 0}
+
+    while v_index_1 < len(p_rows_1) and v_index_2 < len(p_rows_2):
+        v_record_1_pk = v_get_key(p_rows_1[v_index_1])
+        v_record_2_pk = v_get_key(p_rows_2[v_index_2])
+
+        if v_record_1_pk == v_record_2_pk:
+            v_count_dict['equal'] += 1
+            v_index_1 += 1
+            v_index_2 += 1
+        elif v_record_1_pk < v_record_2_pk:
+            v_count_dict['deleted'] += 1
+            v_index_1 += 1
+        else:
+            v_count_dict['inserted'] += 1
+            v_index_2 += 1
+
+    v_count_dict['deleted'] += len(p_rows_1) - v_index_1
+    v_count_dict['inserted'] += len(p_rows_2) - v_index_2
+
+    return v_count_dict
+
+
+if __name__ == '__main__':
+    v_parser = argparse.ArgumentParser(description='Benchmark records key extraction and comparison used by the data comparer merge loops.')
+    v_parser.add_argument('-n', '--rows', dest='rows', type=int, default=1000000, help='Number of records of each side.')
+    v_parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=3, help='Number of repetitions. Best time is reported.')
+    v_options = v_parser.parse_args()
+
+    v_columns = ['id', 'kind', 'value', 'note']
+    v_key = ['id', 'kind']
+    v_rows_1 = get_rows(p_columns=v_columns, p_row_count=v_options.rows, p_step=1000)
+    v_rows_2 = get_rows(p_columns=v_columns, p_row_count=v_options.rows, p_step=997)
+
+    for v_name, v_function in [
+        ('legacy string keys', lambda: merge_legacy(p_rows_1=v_rows_1, p_rows_2=v_rows_2, p_key=v_key)),
+        ('typed tuple keys', lambda: merge_typed(p_columns=v_columns, p_rows_1=v_rows_1, p_rows_2=v_rows_2, p_key=v_key))
+    ]:
+        v_best = None
+
+        for v_index in range(v_options.repeat):
+            v_start = time.perf_counter()
+            v_count_dict = v_function()
+            v_elapsed = time.perf_counter() - v_start
+            v_best = v_elapsed if v_best is None else min(v_best, v_elapsed)
+
+        print('{0}: {1:.3f}s, {2:.0f} records/s, {3}'.format(
+            v_name,
+            v_best,
+            (len(v_rows_1) + len(v_rows_2)) / v_best,
+            v_count_dict
+        ))
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workers.utils
+
+
+def get_message(p_index=None):
+    """Get a message like the ones sent by tables data comparer.
+    """
+
+    return {
+        'type': 'tables_data',
+        'row': {
+            'schema_name': 'public',
+            'table_name': 'benchmark',
+            'status': 'INSERTED',
+            'sql': 'INSERT INTO public.benchmark (id, value) VALUES ($data_comparer${0}$data_comparer$::integer, $data_comparer$value {0}$data_comparer$::text);'.format(p_index)
+        }
+    }
+
+
+def produce(p_queue=None, p_message_count=None, p_block_size=None):
+    """Send messages one by one if p_block_size is 0, else by blocks.
+    """
+
+    if p_block_size == 0:
+        for v_index in range(p_message_count):
+            p_queue.put(get_message(p_index=v_index))
+    else:
+        v_queue_buffer = workers.utils.QueueBuffer(p_queue=p_queue, p_block_size=p_block_size)
+
+        for v_index in range(p_message_count):
+            v_queue_buffer.put(get_message(p_index=v_index))
+
+        v_queue_buffer.flush()
+
+    p_queue.put(None)
+
+
+def run(p_producer_count=None, p_message_count=None, p_block_size=None):
+    """Run producers and consume their messages. Returns number of messages per second.
+    """
+
+    v_manager = multiprocessing.Manager()
+    v_queue = v_manager.Queue()
+    v_pool = multiprocessing.Pool(p_producer_count)
+    v_start_time = time.time()
+
+    for v_index in range(p_producer_count):
+        v_pool.apply_async(func=produce, kwds={'p_queue': v_queue, 'p_message_count': p_message_count, 'p_block_size': p_block_size})
+
+    v_finished_count = 0
+    v_received_count = 0
+
+    while v_finished_count < p_producer_count:
+        v_data = v_queue.get()
+
+        if v_data is None:
+            v_finished_count += 1
+        elif isinstance(v_data, list):
+            v_received_count += len(v_data)
+        else:
+            v_received_count += 1
+
+    v_elapsed_time = time.time() - v_start_time
+    v_pool.close()
+    v_pool.join()
+    v_manager.shutdown()
+
+    return v_received_count / v_elapsed_time
+
+
+if __name__ == '__main__':
+    v_parser = argparse.ArgumentParser(description='Benchmark messages sent by producers to consumers through the manager queue.')
+    v_parser.add_argument('-p', '--producers', dest='producers', type=int, default=multiprocessing.cpu_count(), help='Number of producer processes.')
+    v_parser.add_argument('-n', '--messages', dest='messages', type=int, default=20000, help='Number of messages sent by each producer.')
+    v_parser.add_argument('-b', '--block-size', dest='block_size', type=int, default=1000, help='Number of messages sent at a time by batched producers.')
+    v_options = v_parser.parse_args()
+
+    for v_name, v_block_size in [('one put per message', 0), ('batched messages', v_options.block_size)]:
+        print('{0}: {1:.0f} messages/s'.format(
+            v_name,
+            run(p_producer_count=v_options.producers, p_message_count=v_options.messages, p_block_size=v_block_size)
+        ))
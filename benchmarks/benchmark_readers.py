@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import multiprocessing
+import Spartacus.Database
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workers.compare_tables_data
+
+
+def get_database(p_params=None):
+    """Get a database from connection params: host, port, database, user and password.
+    """
+
+    return Spartacus.Database.PostgreSQL(
+        p_host=p_params[0],
+        p_port=p_params[1],
+        p_service=p_params[2],
+        p_user=p_params[3],
+        p_password=p_params[4],
+        p_application_name='benchmark_readers'
+    )
+
+
+def run(p_params_1=None, p_params_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_fetch_mode=None, p_row_reader=None):
+    """Compare a table in rows comparison mode with given row reader. Returns elapsed seconds, cpu seconds of this process and number of found differences.
+    """
+
+    v_manager = multiprocessing.Manager()
+    v_queue = v_manager.Queue()
+    v_start_time = time.time()
+    v_start_cpu_time = time.process_time()
+
+    workers.compare_tables_data.compare_tables_data(
+        p_database_1=get_database(p_params=p_params_1),
+        p_database_2=get_database(p_params=p_params_2),
+        p_block_size=p_block_size,
+        p_schema=p_schema,
+        p_table=p_table,
+        p_key=p_key,
+        p_queue=v_queue,
+        p_worker_index=0,
+        p_comparison_mode='rows',
+        p_fetch_mode=p_fetch_mode,
+        p_row_reader=p_row_reader
+    )
+
+    v_elapsed_time = time.time() - v_start_time
+    v_cpu_time = time.process_time() - v_start_cpu_time
+    v_difference_count = 0
+
+    while True:
+        try:
+            v_data = v_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        v_difference_count += len(v_data)
+
+    v_manager.shutdown()
+
+    return v_elapsed_time, v_cpu_time, v_difference_count
+
+
+if __name__ == '__main__':
+    v_parser = argparse.ArgumentParser(description='Benchmark row readers of tables data comparer: blocks fetched by queries against records streamed by COPY.')
+    v_parser.add_argument('-s', '--source-database-connection', dest='source_database_connection', type=str, required=True, help='Source database connection: "host:port:database:user:password".')
+    v_parser.add_argument('-t', '--target-database-connection', dest='target_database_connection', type=str, required=True, help='Target database connection: "host:port:database:user:password".')
+    v_parser.add_argument('-n', '--table', dest='table', type=str, required=True, help='Table to be compared: "schema.table".')
+    v_parser.add_argument('-k', '--key', dest='key', type=str, required=True, help='Comma separated columns that form the table records key.')
+    v_parser.add_argument('-b', '--block-size', dest='block_size', type=int, default=1000, help='Number of data records fetched at a time.')
+    v_options = v_parser.parse_args()
+
+    v_schema, v_table = v_options.table.split('.')
+    v_params_1 = v_options.source_database_connection.split(':')
+    v_params_2 = v_options.target_database_connection.split(':')
+
+    v_database = get_database(p_params=v_params_2)
+    v_row_count = int(v_database.ExecuteScalar(p_sql='SELECT COUNT(*) FROM {p_schema}.{p_table}'.format(p_schema=v_schema, p_table=v_table)))
+
+    for v_name, v_fetch_mode, v_row_reader in [('query, serial', 'serial', 'query'), ('query, thread', 'thread', 'query'), ('copy', 'serial', 'copy')]:
+        v_elapsed_time, v_cpu_time, v_difference_count = run(
+            p_params_1=v_params_1,
+            p_params_2=v_params_2,
+            p_block_size=v_options.block_size,
+            p_schema=v_schema,
+            p_table=v_table,
+            p_key=v_options.key,
+            p_fetch_mode=v_fetch_mode,
+            p_row_reader=v_row_reader
+        )
+
+        print('{0}: {1:.2f} s, {2:.0f} rows/s, {3:.0f} rows per cpu second, {4} differences'.format(
+            v_name,
+            v_elapsed_time,
+            v_row_count / v_elapsed_time,
+            v_row_count / v_cpu_time,
+            v_difference_count
+        ))
@@ -0,0 +1,141 @@
+import os
+import sys
+import argparse
+import Spartacus.Database
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workers.utils
+import workers.compare_tables_data
+
+
+#Key columns checked, with values whose order in python differs from their order in the database when compared as fetched
+COLUMN_LIST = [
+    ('json_key', 'json', ['{"b": 1, "a": 2}', '{"a": 10}', '{"a": 9}', '{"a": "x y"}', '[1, 2]', '"x"', '10', '9']),
+    ('jsonb_key', 'jsonb', ['{"b": 1, "a": 2}', '{"a": 10}', '{"a": 9}', '{"aa": 1}', '[1, 2]', '"x"', '10', '9']),
+    ('oid_key', 'oid', ['9', '10', '100', '4294967295']),
+    ('interval_key', 'interval', ['1 mon', '3 days', '1 day', '25:00:00', '-1 day', '1 year 2 mons']),
+    ('interval_array_key', 'interval[]', ['{"1 mon"}', '{"3 days"}', '{"1 day","2 days"}', '{"-1 day"}']),
+    ('inet_key', 'inet', ['10.0.0.1', '9.0.0.1', '::1', '10.0.0.0/8']),
+    ('range_key', 'int4range', ['[1,5)', '[10,20)', '[9,10)', 'empty', '(,3)']),
+    ('text_array_key', 'text[]', ['{a,"b c"}', '{"",NULL}', '{"{x}"}', '{NULL}'])
+]
+
+
+def check_column(p_database=None, p_schema=None, p_table=None, p_column=None):
+    """Check records ordered by a key column in the database are ordered alike by the keys python compares.
+    Returns a list of problems found, empty if none.
+    """
+
+    v_key = [p_column]
+    v_key_order_dict = workers.compare_tables_data.get_key_order_dict(
+        p_database_1=p_database,
+        p_database_2=p_database,
+        p_schema=p_schema,
+        p_table=p_table,
+        p_key=v_key
+    )
+
+    v_table = p_database.Query(
+        p_sql='''
+            SELECT {p_column}
+            FROM {p_schema}.{p_table}
+            WHERE {p_column} IS NOT NULL
+            ORDER BY {p_order}
+        '''.format(
+            p_column=p_column,
+            p_schema=p_schema,
+            p_table=p_table,
+            p_order=v_key_order_dict[p_column][0].format(p_column=p_column)
+        )
+    )
+
+    v_sort_key_dict = workers.compare_tables_data.get_sort_key_dict(p_key_order_dict=v_key_order_dict)
+    v_get_key = workers.utils.get_key_function(p_columns=v_table.Columns, p_key=v_key, p_sort_key_dict=v_sort_key_dict)
+    v_key_list = [workers.utils.get_sortable_key(p_key=v_get_key(v_row)) for v_row in v_table.Rows]
+    v_problem_list = []
+
+    for v_key_1, v_key_2 in zip(v_key_list, v_key_list[1:]):
+        if not v_key_1 < v_key_2:
+            v_problem_list.append('{0}: {1} is not before {2}'.format(p_column, v_key_1, v_key_2))
+
+    #Dropping each record once from one side must be found as a single deleted record, not as a pair of deleted and inserted ones
+    for v_index in range(len(v_table.Rows)):
+        v_count_dict = {'inserted': 0, 'deleted': 0}
+        v_table_2 = Spartacus.Database.DataTable()
+        v_table_2.Columns = v_table.Columns
+        v_table_2.Rows = v_table.Rows[:v_index] + v_table.Rows[v_index + 1:]
+
+        workers.utils.compare_blocks(
+            p_blocks_1=[v_table],
+            p_blocks_2=[v_table_2],
+            p_key=v_key,
+            p_inserted_callback=lambda p_columns, p_row, p_key: v_count_dict.update(inserted=v_count_dict['inserted'] + 1),
+            p_deleted_callback=lambda p_columns, p_row, p_key: v_count_dict.update(deleted=v_count_dict['deleted'] + 1),
+            p_sort_key_dict=v_sort_key_dict
+        )
+
+        if v_count_dict != {'inserted': 0, 'deleted': 1}:
+            v_problem_list.append('{0}: dropping {1} gives {2}'.format(p_column, v_table.Rows[v_index][0], v_count_dict))
+
+    return v_problem_list
+
+
+if __name__ == '__main__':
+    v_parser = argparse.ArgumentParser(description='Check key columns of types fetched by psycopg2 as python values are ordered by the data comparer just like the database orders them.')
+    v_parser.add_argument('-d', '--database-connection', dest='database_connection', type=str, required=True, help='Database connection: "host:port:database:user:password". Just a temporary table is created.')
+    v_options = v_parser.parse_args()
+
+    v_params = v_options.database_connection.split(':')
+
+    v_database = Spartacus.Database.PostgreSQL(
+        p_host=v_params[0],
+        p_port=v_params[1],
+        p_service=v_params[2],
+        p_user=v_params[3],
+        p_password=v_params[4],
+        p_application_name='check_key_order'
+    )
+
+    v_database.Open(p_autocommit=True)
+    v_problem_list = []
+
+    try:
+        v_database.Execute(
+            p_sql='CREATE TEMPORARY TABLE key_order ({p_columns})'.format(
+                p_columns=', '.join([
+                    '{0} {1}'.format(v_column, v_type)
+                    for v_column, v_type, v_value_list in COLUMN_LIST
+                ])
+            )
+        )
+
+        v_row_count = max([len(v_value_list) for v_column, v_type, v_value_list in COLUMN_LIST])
+
+        for v_index in range(v_row_count):
+            v_database.Execute(
+                p_sql='INSERT INTO key_order VALUES ({p_values})'.format(
+                    p_values=', '.join([
+                        "'{0}'::{1}".format(v_value_list[v_index].replace("'", "''"), v_type) if v_index < len(v_value_list) else 'NULL'
+                        for v_column, v_type, v_value_list in COLUMN_LIST
+                    ])
+                )
+            )
+
+        v_schema = v_database.Query(p_sql='SELECT QUOTE_IDENT(nspname) AS schema_name FROM pg_namespace WHERE oid = PG_MY_TEMP_SCHEMA()').Rows[0]['schema_name']
+
+        for v_column, v_type, v_value_list in COLUMN_LIST:
+            try:
+                v_column_problem_list = check_column(p_database=v_database, p_schema=v_schema, p_table='key_order', p_column=v_column)
+            except Exception as exc:
+                v_column_problem_list = ['{0}: {1}: {2}'.format(v_column, type(exc).__name__, exc)]
+
+            print('{0} ({1}): {2}'.format(v_column, v_type, 'ok' if len(v_column_problem_list) == 0 else 'FAILED'))
+            v_problem_list.extend(v_column_problem_list)
+    finally:
+        v_database.Close()
+
+    for v_problem in v_problem_list:
+        print(v_problem)
+
+    sys.exit(1 if len(v_problem_list) > 0 else 0)
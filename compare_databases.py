@@ -1,11 +1,25 @@
+import time
 import traceback
 import argparse
 import inspect
 import Spartacus.Database
 import multiprocessing
 import queue
-
+import io
+import os
+import json
+import gzip
+import shlex
+import urllib.parse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+import workers.utils
 import workers.custom_exceptions
+import workers.compare_catalog
 import workers.compare_functions
 import workers.compare_indexes
 import workers.compare_mviews
@@ -24,6 +38,40 @@ import workers.compare_tables_uniques
 import workers.compare_tables
 import workers.compare_trigger_functions
 import workers.compare_views
+import workers.persistent_connection
+
+
+#Categories of rows of output report table
+OUTPUT_REPORT_CATEGORY_LIST = ['functions', 'indexes', 'mviews', 'procedures', 'schemas', 'sequences', 'tables_checks', 'tables_columns', 'tables_data', 'tables_excludes', 'tables_fks', 'tables_pks', 'tables_rules', 'tables_triggers', 'tables_uniques', 'tables', 'trigger_functions', 'views']
+
+#Columns of output report table filled from rows sent by producers
+OUTPUT_REPORT_COLUMN_LIST = ['schema_name', 'table_name', 'column_name', 'constraint_name', 'trigger_name', 'index_name', 'sequence_name', 'view_name', 'mview_name', 'function_id', 'status', 'sql']
+
+#Characters escaped in COPY text format
+COPY_ESCAPE_TABLE = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r'
+})
+
+#Directory of COPY files of tables data patches, inside the output directory
+PATCH_DIRECTORY = 'tables_data_patch'
+
+#Seconds a consumer waits for messages before inserting already received ones into the output database
+CONSUMER_TIMEOUT = 1.0
+
+#Seconds between checks of consumers and, when they are adaptive, of the queue depth
+CONSUMER_SCALE_INTERVAL = 1.0
+
+#Pending message blocks per running consumer above which another adaptive consumer is started
+CONSUMER_SCALE_DEPTH = 10
+
+#Consecutive checks finding the queue empty after which an adaptive consumer is retired
+CONSUMER_RETIRE_CHECKS = 5
+
+#Estimated cost of tasks without a cost of their own, like catalog comparisons run each one in its own process, in table pages. They are scheduled after larger tasks, filling gaps
+DEFAULT_TASK_COST = 0
 
 
 def get_output_sql(p_type=None, p_row=None):
@@ -63,7 +111,7 @@ def get_output_sql(p_type=None, p_row=None):
     if not isinstance(p_type, str):
         raise workers.custom_exceptions.InvalidParameterTypeException('"p_type" parameter must be a "str" instance.', p_type)
 
-    if p_type not in ['functions', 'indexes', 'mviews', 'procedures', 'schemas', 'sequences', 'tables_checks', 'tables_columns', 'tables_data', 'tables_excludes', 'tables_fks', 'tables_pks', 'tables_rules', 'tables_triggers', 'tables_uniques', 'tables', 'trigger_functions', 'views']:
+    if p_type not in OUTPUT_REPORT_CATEGORY_LIST:
         raise workers.custom_exceptions.InvalidParameterValueException(
             '"p_type" parameter must be one between: functions, indexes, mviews, procedures, schemas, sequences, tables_checks, tables_columns, tables_data, tables_excludes, tables_fks, tables_pks, tables_rules, tables_triggers, tables_uniques, tables, trigger_functions, views.',
             p_type
@@ -380,353 +428,1677 @@ def get_output_sql(p_type=None, p_row=None):
     return v_sql
 
 
-def consumer_worker(p_output_database=None, p_block_size=None, p_queue=None, p_is_sending_data_array=None):
+def get_output_copy_line(p_type=None, p_row=None):
+    """Get line of COPY text format to insert in report table.
+
+        Args:
+            p_type (str): the type of the row that will be inserted into output database. Defaults to None.
+                Notes: check "get_output_sql" for allowed values.
+            p_row (dict): key/value pairs of values to be inserted into output database. Defaults to None.
+
+        Returns:
+            str: the line, with its trailing line break.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+            workers.custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_type, str):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_type" parameter must be a "str" instance.', p_type)
+
+    if p_type not in OUTPUT_REPORT_CATEGORY_LIST:
+        raise workers.custom_exceptions.InvalidParameterValueException(
+            '"p_type" parameter must be one between: {p_categories}.'.format(p_categories=', '.join(OUTPUT_REPORT_CATEGORY_LIST)),
+            p_type
+        )
+
+    if not isinstance(p_row, dict):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_row" parameter must be a "dict" instance.', p_row)
+
+    return '\t'.join(
+        [p_type] +
+        [
+            str(p_row[v_column]).translate(COPY_ESCAPE_TABLE) if p_row.get(v_column) is not None else '\\N'
+            for v_column in OUTPUT_REPORT_COLUMN_LIST
+        ]
+    ) + '\n'
+
+
+def write_output_messages(p_output_database=None, p_message_list=None, p_write_mode=None):
+    """Insert messages sent by producers into the report table.
+
+        Args:
+            p_output_database (Spartacus.Database.PostgreSQL): the output database, already opened. Defaults to None.
+            p_message_list (list): list of messages. Each message is a dict with 'type' and 'row' keys. Defaults to None.
+            p_write_mode (str): how messages are inserted. Defaults to None.
+                Notes: must be one of:
+                    - copy: rows are streamed to the table by a COPY command.
+                    - function: rows are inserted by "database_comparer_report.output_report_fnc_add" function calls.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+            workers.custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_output_database, Spartacus.Database.PostgreSQL):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_output_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_output_database)
+
+    if not isinstance(p_message_list, list):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_message_list" parameter must be a "list" instance.', p_message_list)
+
+    if p_write_mode not in ['copy', 'function']:
+        raise workers.custom_exceptions.InvalidParameterValueException('"p_write_mode" parameter must be one between: copy, function.', p_write_mode)
+
+    if len(p_message_list) == 0:
+        return
+
+    if p_write_mode == 'copy':
+        v_cursor = p_output_database.v_con.cursor()
+
+        v_cursor.copy_expert(
+            sql='''
+                COPY database_comparer_report.output_report (
+                    category,
+                    {p_columns}
+                )
+                FROM STDIN
+            '''.format(
+                p_columns=','.join(OUTPUT_REPORT_COLUMN_LIST)
+            ),
+            file=io.StringIO(
+                ''.join([
+                    get_output_copy_line(
+                        p_type=v_message['type'],
+                        p_row=v_message['row']
+                    )
+                    for v_message in p_message_list
+                ])
+            )
+        )
+
+        v_cursor.close()
+    else:
+        p_output_database.Execute(
+            p_sql=';'.join([
+                get_output_sql(
+                    p_type=v_message['type'],
+                    p_row=v_message['row']
+                )
+                for v_message in p_message_list
+            ])
+        )
+
+
+def get_output_file_text(p_type=None, p_row=None, p_output_format=None):
+    """Get text to be written in a report file for a given row.
+
+        Args:
+            p_type (str): the type of the row. Defaults to None.
+                Notes: check "get_output_sql" for allowed values.
+            p_row (dict): key/value pairs of values to be written. Defaults to None.
+            p_output_format (str): the report file format. Defaults to None.
+                Notes: must be one of:
+                    - sql: a SQL script, with a comment line before each command.
+                    - jsonl: a JSON object per line.
+
+        Returns:
+            str: the text.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+            workers.custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_type, str):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_type" parameter must be a "str" instance.', p_type)
+
+    if not isinstance(p_row, dict):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_row" parameter must be a "dict" instance.', p_row)
+
+    if p_output_format not in ['sql', 'jsonl']:
+        raise workers.custom_exceptions.InvalidParameterValueException('"p_output_format" parameter must be one between: sql, jsonl.', p_output_format)
+
+    if p_output_format == 'jsonl':
+        v_object = {'category': p_type}
+        v_object.update(p_row)
+
+        return json.dumps(v_object) + '\n'
+
+    return '-- {p_category} {p_status}: {p_name}\n{p_sql}\n\n'.format(
+        p_category=p_type,
+        p_status=p_row['status'],
+        p_name='.'.join([
+            str(p_row[v_column])
+            for v_column in OUTPUT_REPORT_COLUMN_LIST
+            if v_column not in ['status', 'sql'] and p_row.get(v_column) is not None
+        ]),
+        p_sql=p_row['sql']
+    )
+
+
+def open_output_file(p_output_directory=None, p_type=None, p_consumer_index=None, p_output_format=None, p_output_compression=None):
+    """Open a report file for writing, truncating it if it exists. Each consumer writes each category of rows to its own file.
+
+        Args:
+            p_output_directory (str): the directory where the file is created. Defaults to None.
+            p_type (str): the type of the rows written to the file. Defaults to None.
+            p_consumer_index (int): the consumer sub process index. Defaults to None.
+            p_output_format (str): the report file format. Check "get_output_file_text" for allowed values, besides copy, used for patch files. Defaults to None.
+            p_output_compression (str): the report file compression. Defaults to None.
+                Notes: must be one of:
+                    - none: the file is not compressed.
+                    - gzip: the file is compressed with gzip.
+                    - zstd: the file is compressed with zstd. Requires zstandard package.
+
+        Returns:
+            io.TextIOBase: the opened file.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+            workers.custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_output_directory, str):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_output_directory" parameter must be a "str" instance.', p_output_directory)
+
+    if not isinstance(p_type, str):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_type" parameter must be a "str" instance.', p_type)
+
+    if not isinstance(p_consumer_index, int):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_consumer_index" parameter must be an "int" instance.', p_consumer_index)
+
+    if p_output_format not in ['sql', 'jsonl', 'copy']:
+        raise workers.custom_exceptions.InvalidParameterValueException('"p_output_format" parameter must be one between: sql, jsonl, copy.', p_output_format)
+
+    if p_output_compression not in ['none', 'gzip', 'zstd']:
+        raise workers.custom_exceptions.InvalidParameterValueException('"p_output_compression" parameter must be one between: none, gzip, zstd.', p_output_compression)
+
+    v_path = os.path.join(
+        p_output_directory,
+        '{p_type}_{p_index}.{p_format}'.format(
+            p_type=p_type,
+            p_index=p_consumer_index,
+            p_format=p_output_format
+        )
+    )
+
+    if p_output_compression == 'gzip':
+        return gzip.open(filename=v_path + '.gz', mode='wt', encoding='utf-8')
+
+    if p_output_compression == 'zstd':
+        if zstandard is None:
+            raise workers.custom_exceptions.InvalidParameterValueException('"p_output_compression" parameter cannot be zstd, as zstandard package is not installed.', p_output_compression)
+
+        return zstandard.open(filename=v_path + '.zst', mode='wt', encoding='utf-8')
+
+    return open(file=v_path, mode='w', encoding='utf-8')
+
+
+def get_patch_file_type(p_schema=None, p_table=None, p_action=None):
+    """Get the type of the patch files of a table, used to name them as report files are named. See "open_output_file".
+    Names are url encoded, so quoted identifiers are valid file names.
+
+        Args:
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_action (str): 'upsert' for files of inserted and updated records, 'delete' for files of keys of deleted records. Defaults to None.
+
+        Returns:
+            str: the type, a path relative to the output directory.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+            workers.custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_schema, str):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_schema" parameter must be a "str" instance.', p_schema)
+
+    if not isinstance(p_table, str):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_table" parameter must be a "str" instance.', p_table)
+
+    if p_action not in ['upsert', 'delete']:
+        raise workers.custom_exceptions.InvalidParameterValueException('"p_action" parameter must be one between: upsert, delete.', p_action)
+
+    return os.path.join(
+        PATCH_DIRECTORY,
+        '{p_schema}.{p_table}.{p_action}'.format(
+            p_schema=urllib.parse.quote(p_schema, safe=''),
+            p_table=urllib.parse.quote(p_table, safe=''),
+            p_action=p_action
+        )
+    )
+
+
+def write_output_files(p_file_dict=None, p_message_list=None, p_output_directory=None, p_consumer_index=None, p_output_format=None, p_output_compression=None):
+    """Write messages sent by producers into report files, one per category.
+
+        Args:
+            p_file_dict (dict): key/value pairs of categories and their opened files. Files are opened and added as needed. Defaults to None.
+            p_message_list (list): list of messages. Each message is a dict with 'type' and 'row' keys. Defaults to None.
+            p_output_directory (str): the directory where files are created. Defaults to None.
+            p_consumer_index (int): the consumer sub process index. Defaults to None.
+            p_output_format (str): the report file format. Check "get_output_file_text" for allowed values, besides patch. Defaults to None.
+                Notes: patch writes records of tables data patches into COPY files of their tables, and other messages as sql.
+            p_output_compression (str): the report file compression. Check "open_output_file" for allowed values. Defaults to None.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_file_dict, dict):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_file_dict" parameter must be a "dict" instance.', p_file_dict)
+
+    if not isinstance(p_message_list, list):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_message_list" parameter must be a "list" instance.', p_message_list)
+
+    v_text_dict = {}
+
+    for v_message in p_message_list:
+        #Records of patches go to COPY files of their tables, other messages are written as SQL
+        if v_message['type'] == 'tables_data_patch':
+            v_text_dict.setdefault(
+                get_patch_file_type(
+                    p_schema=v_message['row']['schema_name'],
+                    p_table=v_message['row']['table_name'],
+                    p_action='delete' if v_message['row']['status'] == 'DELETED' else 'upsert'
+                ),
+                []
+            ).append(v_message['row']['data'] + '\n')
+        else:
+            v_text_dict.setdefault(v_message['type'], []).append(
+                get_output_file_text(
+                    p_type=v_message['type'],
+                    p_row=v_message['row'],
+                    p_output_format='sql' if p_output_format == 'patch' else p_output_format
+                )
+            )
+
+    for v_type, v_text_list in v_text_dict.items():
+        if v_type not in p_file_dict:
+            p_file_dict[v_type] = open_output_file(
+                p_output_directory=p_output_directory,
+                p_type=v_type,
+                p_consumer_index=p_consumer_index,
+                p_output_format='copy' if v_type.startswith(PATCH_DIRECTORY + os.sep) else 'sql' if p_output_format == 'patch' else p_output_format,
+                p_output_compression=p_output_compression
+            )
+
+        p_file_dict[v_type].write(''.join(v_text_list))
+
+
+def consumer_worker(p_output_database=None, p_block_size=None, p_queue=None, p_write_mode='copy', p_timeout=CONSUMER_TIMEOUT, p_output_format='database', p_output_directory=None, p_output_compression='none', p_consumer_index=0):
     """Worker in charge of getting changes pointed by producer workers and insert such information into the output database.
+    Waits for messages until it receives a None sentinel, which is sent by main process for each consumer once all producers are done.
 
         Args:
             p_output_database (Spartacus.Database.PostgreSQL): the output database. Defaults to None.
             p_block_size (int): number of data records that the consumer will insert at a time. Defaults to None.
             p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
-            p_is_sending_data_array (multiprocessing.managers.ArrayProxy): array used to control process that are still sending data. Defaults to None.
+            p_write_mode (str): how messages are inserted into the output database. Check "write_output_messages" for allowed values. Defaults to 'copy'.
+            p_timeout (float): seconds to wait for messages before inserting already received ones. Defaults to CONSUMER_TIMEOUT.
+            p_output_format (str): where messages are written. Defaults to 'database'.
+                Notes: must be one of:
+                    - database: messages are inserted into the output database.
+                    - sql: messages are written to SQL script files. Check "get_output_file_text".
+                    - jsonl: messages are written to JSON lines files. Check "get_output_file_text".
+                    - patch: records of tables data are written to COPY files of their tables, and other messages to SQL script files. Check "write_patch_script".
+            p_output_directory (str): directory of report files. Required when p_output_format is not database. Defaults to None.
+            p_output_compression (str): compression of report files. Check "open_output_file" for allowed values. Defaults to 'none'.
+            p_consumer_index (int): the consumer sub process index, used to name report files. Defaults to 0.
+
+        Returns:
+            int: number of messages received from producers.
 
         Raises:
             custom_exceptions.InvalidParameterTypeException.
             custom_exceptions.InvalidParameterValueException.
     """
 
-    if not isinstance(p_output_database, Spartacus.Database.PostgreSQL):
+    if p_output_format not in ['database', 'sql', 'jsonl', 'patch']:
+        raise workers.custom_exceptions.InvalidParameterValueException('"p_output_format" parameter must be one between: database, sql, jsonl, patch.', p_output_format)
+
+    if p_output_format == 'database' and not isinstance(p_output_database, Spartacus.Database.PostgreSQL):
         raise workers.custom_exceptions.InvalidParameterTypeException('"p_output_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_output_database)
 
+    if p_output_format != 'database' and not isinstance(p_output_directory, str):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_output_directory" parameter must be a "str" instance.', p_output_directory)
+
+    if not isinstance(p_consumer_index, int):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_consumer_index" parameter must be an "int" instance.', p_consumer_index)
+
     if not isinstance(p_block_size, int):
-        raise custom_exceptions.InvalidParameterTypeException('"p_block_size" parameter must be an "int" instance.', p_block_size)
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_block_size" parameter must be an "int" instance.', p_block_size)
 
     if p_block_size < 1:
-        raise custom_exceptions.InvalidParameterValueException('"p_block_size" parameter must be a positive "int" instance.', p_block_size)
+        raise workers.custom_exceptions.InvalidParameterValueException('"p_block_size" parameter must be a positive "int" instance.', p_block_size)
 
     if not isinstance(p_queue, multiprocessing.managers.BaseProxy):
-        raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "multiprocessing.managers.BaseProxy" instance.', p_queue)
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "multiprocessing.managers.BaseProxy" instance.', p_queue)
+
+    if p_write_mode not in ['copy', 'function']:
+        raise workers.custom_exceptions.InvalidParameterValueException('"p_write_mode" parameter must be one between: copy, function.', p_write_mode)
+
+    if not isinstance(p_timeout, (int, float)):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_timeout" parameter must be a "float" instance.', p_timeout)
+
+    if p_timeout <= 0:
+        raise workers.custom_exceptions.InvalidParameterValueException('"p_timeout" parameter must be a positive "float" instance.', p_timeout)
+
+    v_message_list = []
+    v_message_count = 0
+    v_file_dict = {}
+
+    def write_output(p_message_list=None):
+        if p_output_format == 'database':
+            write_output_messages(p_output_database=p_output_database, p_message_list=p_message_list, p_write_mode=p_write_mode)
+        else:
+            write_output_files(
+                p_file_dict=v_file_dict,
+                p_message_list=p_message_list,
+                p_output_directory=p_output_directory,
+                p_consumer_index=p_consumer_index,
+                p_output_format=p_output_format,
+                p_output_compression=p_output_compression
+            )
 
-    if not isinstance(p_is_sending_data_array, multiprocessing.managers.ArrayProxy):
-        raise custom_exceptions.InvalidParameterTypeException('"p_is_sending_data_array" parameter must be an "multiprocessing.managers.ArrayProxy" instance.', p_is_sending_data_array)
+    if p_output_format == 'database':
+        p_output_database.Open(p_autocommit=True)
 
-    v_sql_list = []
+    #Block until data arrives, so idle consumers do not use cpu
+    while True:
+        try:
+            v_data = p_queue.get(timeout=p_timeout)
+        except queue.Empty:
+            #Producers are slow, so let's write what was already received
+            write_output(p_message_list=v_message_list)
+            v_message_list = []
 
-    p_output_database.Open(p_autocommit=True)
+            continue
 
-    #While any task is still active or has data to be read, try to get data
-    #Used or because processes can be done but queue still have data or processes still executing and queue with no data
-    while any(p_is_sending_data_array) or p_queue.qsize() > 0:
-        v_data = None
+        #All producers are done
+        if v_data is None:
+            break
 
-        try:
-            v_data = p_queue.get_nowait()
-        except queue.Empty:
-            pass
+        #Producers send lists of messages
+        v_message_list += v_data
+        v_message_count += len(v_data)
 
-        if v_data is not None:
-            v_sql_list.append(
-                get_output_sql(
-                    p_type=v_data['type'],
-                    p_row=v_data['row']
-                )
-            )
+        if len(v_message_list) >= p_block_size:
+            write_output(p_message_list=v_message_list)
+            v_message_list = []
 
-            if len(v_sql_list) == p_block_size:
-                p_output_database.Execute(p_sql=';'.join(v_sql_list))
-                v_sql_list = []
+    write_output(p_message_list=v_message_list)
 
-    if len(v_sql_list) > 0:
-        p_output_database.Execute(p_sql=';'.join(v_sql_list))
+    for v_file in v_file_dict.values():
+        v_file.close()
 
-    p_output_database.Close(p_commit=True)
+    if p_output_format == 'database':
+        p_output_database.Close(p_commit=True)
 
+    return v_message_count
 
-if __name__ == '__main__':
-    try:
-        v_parser = argparse.ArgumentParser(
-            epilog=inspect.cleandoc(
-                doc='''\
-                    Script used to compare databases and find the differences between them, if any.
-                    Found differences will be written to a given report database connection, in the table "database_comparer_report.output_report".
-                    The differences considers commands to get in target from source database.
-                '''
-            )
-        )
 
-        v_parser.add_argument(
-            '-b',
-            '--block-size',
-            dest='block_size',
-            help='Number of data records that the comparer will deal with at the same time in each opened process. Used to reduce memory usage. Also points number of records inserted at a time in the consumer workers.',
-            type=int,
-            required=True
-        )
+def get_patch_copy_command(p_table=None, p_columns=None, p_path=None, p_output_compression=None):
+    """Get psql command that loads a patch file into a staging table.
 
-        v_parser.add_argument(
-            '-e',
-            '--exclude-tables',
-            dest='exclude_tables',
-            help='List of tables to be excluded from tables data comparisons. Will still be considered for tables structure comparison. Example: --exclude-tables {public.table_1, my_schema.table_2}.',
-            type=str,
-            default=[],
-            nargs='+',
-            required=False
-        )
+        Args:
+            p_table (str): the staging table name. Defaults to None.
+            p_columns (str): comma separated columns of the file. Defaults to None.
+            p_path (str): absolute path of the file. Defaults to None.
+            p_output_compression (str): the file compression. Check "open_output_file" for allowed values. Defaults to None.
 
-        v_parser.add_argument(
-            '-s',
-            '--source-database-connection',
-            dest='source_database_connection',
-            help='Connection string to the source database of comparison. Has the following structure: HOST:PORT:DATABASE:USER:PASSWORD. You can leave password empty if it is already in you .pgpass file.',
-            type=str,
-            required=True
-        )
+        Returns:
+            str: the command.
+    """
 
-        v_parser.add_argument(
-            '-t',
-            '--target-database-connection',
-            dest='target_database_connection',
-            help='Connection string to the target database of comparison. Has the following structure: HOST:PORT:DATABASE:USER:PASSWORD. You can leave password empty if it is already in you .pgpass file.',
-            type=str,
-            required=True
+    if p_output_compression == 'none':
+        v_source = p_path
+    else:
+        #Compressed files are read through their command line tools
+        v_source = '{p_tool} -dc {p_path}'.format(
+            p_tool='gzip' if p_output_compression == 'gzip' else 'zstd',
+            p_path=shlex.quote(p_path)
         )
 
-        v_parser.add_argument(
-            '-o',
-            '--output-database-connection',
-            dest='output_database_connection',
-            help='Connection string to the report database. Has the following structure: HOST:PORT:DATABASE:USER:PASSWORD. You can leave password empty if it is already in you .pgpass file.',
-            type=str,
-            required=True
-        )
+    return "\\copy {p_table} ({p_columns}) FROM {p_program}'{p_source}'\n".format(
+        p_table=p_table,
+        p_columns=p_columns,
+        p_program='' if p_output_compression == 'none' else 'PROGRAM ',
+        p_source=v_source.replace("'", "''")
+    )
 
-        v_options = v_parser.parse_args()
 
-        #Get databases credentials
-        v_source_params = v_options.source_database_connection.split(':')
-        v_target_params = v_options.target_database_connection.split(':')
-        v_output_params = v_options.output_database_connection.split(':')
+def get_patch_keyless_delete_sql(p_schema=None, p_table=None, p_columns=None):
+    """Get DELETE statement of staged records of a table without primary key. Such a table may hold several copies of a record,
+    while each copy deleted is staged on its own, so just as many physical records as staged copies are deleted, picked by their ctid.
+    Records are matched by their text, that is NULL safe and lets both sides be hashed, so the table is scanned just once.
 
-        v_output_database = Spartacus.Database.PostgreSQL(
-            p_host=v_output_params[0],
-            p_port=v_output_params[1],
-            p_service=v_output_params[2],
-            p_user=v_output_params[3],
-            p_password=v_output_params[4],
-            p_application_name='compare_databases'
-        )
+        Args:
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_columns (list): columns of the staging table, that key records of the table. Defaults to None.
 
-        #Open output database and create output structure
-        v_output_database.Open(p_autocommit=True)
+        Returns:
+            str: the statement.
+    """
 
-        v_output_database.Execute(
-            p_sql='''
-                CREATE SCHEMA IF NOT EXISTS database_comparer_report;
-            '''
+    v_record_1 = 'ROW({p_columns})::TEXT'.format(p_columns=','.join(['t.{0}'.format(v_column) for v_column in p_columns]))
+    v_record_2 = 'ROW({p_columns})::TEXT'.format(p_columns=','.join(['d.{0}'.format(v_column) for v_column in p_columns]))
+
+    return inspect.cleandoc(
+        doc='''\
+            DELETE FROM {p_schema}.{p_table} t
+            USING (
+                SELECT r.data_comparer_ctid
+                FROM (
+                    SELECT t.ctid AS data_comparer_ctid,
+                           {p_record_1} AS data_comparer_record,
+                           ROW_NUMBER() OVER (PARTITION BY {p_record_1} ORDER BY t.ctid) AS data_comparer_copy
+                    FROM {p_schema}.{p_table} t
+                    WHERE {p_record_1} IN (
+                        SELECT {p_record_2}
+                        FROM data_comparer_delete d
+                    )
+                ) r
+                INNER JOIN (
+                    SELECT {p_record_2} AS data_comparer_record,
+                           COUNT(*) AS data_comparer_copies
+                    FROM data_comparer_delete d
+                    GROUP BY 1
+                ) d
+                        ON d.data_comparer_record = r.data_comparer_record
+                WHERE r.data_comparer_copy <= d.data_comparer_copies
+            ) x
+            WHERE t.ctid = x.data_comparer_ctid;
+        '''.format(
+            p_schema=p_schema,
+            p_table=p_table,
+            p_record_1=v_record_1,
+            p_record_2=v_record_2
         )
+    ) + '\n\n'
 
-        v_output_database.Execute(
-            p_sql='''
-                CREATE TABLE IF NOT EXISTS database_comparer_report.output_report (
-                    id SERIAL NOT NULL PRIMARY KEY,
-                    category TEXT NOT NULL,
-                    schema_name TEXT,
-                    table_name TEXT,
-                    column_name TEXT,
-                    constraint_name TEXT,
-                    trigger_name TEXT,
-                    index_name TEXT,
-                    sequence_name TEXT,
-                    view_name TEXT,
-                    mview_name TEXT,
-                    function_id TEXT,
-                    status TEXT,
-                    sql TEXT
-                );
-            '''
-        )
 
-        v_output_database.Execute(
-            p_sql='''
-                TRUNCATE database_comparer_report.output_report
-            '''
-        )
+def write_patch_script(p_database=None, p_output_directory=None, p_table_list=None, p_consumer_count=None, p_output_compression=None):
+    """Write tables_data_patch.sql psql script into the output directory, which applies patch files written by consumers.
+    Each table is patched in a transaction of its own: keys of deleted records are loaded into a temporary staging table and deleted by a single joined DELETE,
+    then inserted and updated records are loaded into another staging table and applied by a single INSERT ... ON CONFLICT DO UPDATE statement.
+    Tables without primary key get a plain INSERT, as their updated records are reported as deleted and inserted ones, and a DELETE of one physical record
+    per staged copy. Check "get_patch_keyless_delete_sql".
 
-        v_output_database.Execute(
-            p_sql='''
-                CREATE OR REPLACE FUNCTION database_comparer_report.output_report_fnc_add (
-                    p_category TEXT DEFAULT NULL::TEXT,
-                    p_schema_name TEXT DEFAULT NULL::TEXT,
-                    p_table_name TEXT DEFAULT NULL::TEXT,
-                    p_column_name TEXT DEFAULT NULL::TEXT,
-                    p_constraint_name TEXT DEFAULT NULL::TEXT,
-                    p_trigger_name TEXT DEFAULT NULL::TEXT,
-                    p_index_name TEXT DEFAULT NULL::TEXT,
-                    p_sequence_name TEXT DEFAULT NULL::TEXT,
-                    p_view_name TEXT DEFAULT NULL::TEXT,
-                    p_mview_name TEXT DEFAULT NULL::TEXT,
-                    p_function_id TEXT DEFAULT NULL::TEXT,
-                    p_status TEXT DEFAULT NULL::TEXT,
-                    p_sql TEXT DEFAULT NULL::TEXT
-                )
-                RETURNS INTEGER
-                LANGUAGE plpgsql
-                AS
-                $function$
-                DECLARE
-                    v_id INTEGER;
-                BEGIN
-                    INSERT INTO database_comparer_report.output_report (
-                        category,
-                        schema_name,
-                        table_name,
-                        column_name,
-                        constraint_name,
-                        trigger_name,
-                        index_name,
-                        sequence_name,
-                        view_name,
-                        mview_name,
-                        function_id,
-                        status,
-                        sql
-                    ) VALUES (
-                        p_category,
-                        p_schema_name,
-                        p_table_name,
-                        p_column_name,
-                        p_constraint_name,
-                        p_trigger_name,
-                        p_index_name,
-                        p_sequence_name,
-                        p_view_name,
-                        p_mview_name,
-                        p_function_id,
-                        p_status,
-                        p_sql
-                    )
-                    RETURNING id INTO v_id;
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the target database, which tables structure is used. Defaults to None.
+            p_output_directory (str): the directory of report files. Defaults to None.
+            p_table_list (list): list of tables data comparisons, each one a list with schema, table, comma separated key and comma separated compared columns, None if all of them are compared. Defaults to None.
+            p_consumer_count (int): number of consumer sub processes that wrote patch files. Defaults to None.
+            p_output_compression (str): the report file compression. Check "open_output_file" for allowed values. Defaults to None.
 
-                    RETURN v_id;
-                END;
-                $function$
-            '''
-        )
+        Returns:
+            int: number of patched tables.
 
-        v_output_database.Close(p_commit=True)
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+    """
 
-        #Open a process pool for producers and create tasks to be run in parallel
-        v_producers_process_pool = multiprocessing.Pool(multiprocessing.cpu_count())
-        v_producers_result_list = []
-        v_producers_task_list = []
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
 
-        v_producers_task_list += workers.compare_functions.get_compare_functions_tasks()
-        v_producers_task_list += workers.compare_indexes.get_compare_indexes_tasks()
-        v_producers_task_list += workers.compare_mviews.get_compare_mviews_tasks()
-        v_producers_task_list += workers.compare_procedures.get_compare_procedures_tasks()
-        v_producers_task_list += workers.compare_schemas.get_compare_schemas_tasks()
-        v_producers_task_list += workers.compare_sequences.get_compare_sequences_tasks()
-        v_producers_task_list += workers.compare_tables_checks.get_compare_tables_checks_tasks()
-        v_producers_task_list += workers.compare_tables_columns.get_compare_tables_columns_tasks()
-
-        v_producers_task_list += workers.compare_tables_data.get_compare_tables_data_tasks(
-            p_database_1=Spartacus.Database.PostgreSQL(
-                p_host=v_source_params[0],
-                p_port=v_source_params[1],
-                p_service=v_source_params[2],
-                p_user=v_source_params[3],
-                p_password=v_source_params[4],
-                p_application_name='compare_databases'
-            ),
-            p_database_2=Spartacus.Database.PostgreSQL(
-                p_host=v_target_params[0],
-                p_port=v_target_params[1],
-                p_service=v_target_params[2],
-                p_user=v_target_params[3],
-                p_password=v_target_params[4],
-                p_application_name='compare_databases'
-            ),
-            p_block_size=v_options.block_size,
-            p_exclude_tables=v_options.exclude_tables
-        )
-
-        v_producers_task_list += workers.compare_tables_excludes.get_compare_tables_excludes_tasks()
-        v_producers_task_list += workers.compare_tables_fks.get_compare_tables_fks_tasks()
-        v_producers_task_list += workers.compare_tables_pks.get_compare_tables_pks_tasks()
-        v_producers_task_list += workers.compare_tables_rules.get_compare_tables_rules_tasks()
-        v_producers_task_list += workers.compare_tables_triggers.get_compare_tables_triggers_tasks()
-        v_producers_task_list += workers.compare_tables_uniques.get_compare_tables_uniques_tasks()
-        v_producers_task_list += workers.compare_tables.get_compare_tables_tasks()
-        v_producers_task_list += workers.compare_trigger_functions.get_compare_trigger_functions_tasks()
-        v_producers_task_list += workers.compare_views.get_compare_views_tasks()
-
-        v_manager = multiprocessing.Manager()
-        v_queue = v_manager.Queue()
-        v_is_sending_data_array = v_manager.Array('b', [True] * len(v_producers_task_list))
-
-        #Open a process pool for consumers and create tasks to be run in parallel
-        v_consumers_process_pool = multiprocessing.Pool(multiprocessing.cpu_count())
-        v_consumers_result_list = []
+    if not isinstance(p_output_directory, str):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_output_directory" parameter must be a "str" instance.', p_output_directory)
 
-        for i in range(multiprocessing.cpu_count()):
-            v_consumers_result_list.append(
-                v_consumers_process_pool.apply_async(
-                    func=consumer_worker,
-                    kwds={
-                        'p_output_database': Spartacus.Database.PostgreSQL(
-                            p_host=v_output_params[0],
-                            p_port=v_output_params[1],
-                            p_service=v_output_params[2],
-                            p_user=v_output_params[3],
-                            p_password=v_output_params[4],
-                            p_application_name='compare_databases'
-                        ),
-                        'p_block_size': v_options.block_size,
-                        'p_queue': v_queue,
-                        'p_is_sending_data_array': v_is_sending_data_array
-                    }
-                )
-            )
+    if not isinstance(p_table_list, list):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_table_list" parameter must be a "list" instance.', p_table_list)
 
-        for i in range(len(v_producers_task_list)):
-            v_task = v_producers_task_list[i]
+    if not isinstance(p_consumer_count, int):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_consumer_count" parameter must be an "int" instance.', p_consumer_count)
 
-            v_task['kwds']['p_database_1'] = Spartacus.Database.PostgreSQL(
-                p_host=v_source_params[0],
-                p_port=v_source_params[1],
-                p_service=v_source_params[2],
-                p_user=v_source_params[3],
-                p_password=v_source_params[4],
-                p_application_name='compare_databases'
-            )
+    v_extension = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}[p_output_compression]
+    v_section_list = []
 
-            v_task['kwds']['p_database_2'] = Spartacus.Database.PostgreSQL(
-                p_host=v_target_params[0],
-                p_port=v_target_params[1],
-                p_service=v_target_params[2],
-                p_user=v_target_params[3],
-                p_password=v_target_params[4],
+    p_database.Open(p_autocommit=False)
+
+    try:
+        for v_schema, v_table, v_key, v_compared_columns in p_table_list:
+            v_path_dict = {}
+
+            for v_action in ['delete', 'upsert']:
+                v_path_dict[v_action] = [
+                    v_path
+                    for v_path in [
+                        os.path.abspath(
+                            os.path.join(
+                                p_output_directory,
+                                '{p_type}_{p_index}.copy{p_extension}'.format(
+                                    p_type=get_patch_file_type(p_schema=v_schema, p_table=v_table, p_action=v_action),
+                                    p_index=v_index,
+                                    p_extension=v_extension
+                                )
+                            )
+                        )
+                        for v_index in range(p_consumer_count)
+                    ]
+                    if os.path.exists(v_path)
+                ]
+
+            if len(v_path_dict['delete']) == 0 and len(v_path_dict['upsert']) == 0:
+                continue
+
+            v_key_list = v_key.split(',')
+            v_text = 'BEGIN;\n\n'
+
+            v_row = p_database.Query(
+                p_sql='''
+                    SELECT STRING_AGG(QUOTE_IDENT(a.attname), ',' ORDER BY a.attnum) AS column_names,
+                           (SELECT STRING_AGG(QUOTE_IDENT(ka.attname), ',' ORDER BY k.position)
+                            FROM pg_index i
+                            CROSS JOIN LATERAL UNNEST(i.indkey) WITH ORDINALITY k(attnum, position)
+                            INNER JOIN pg_attribute ka
+                                    ON ka.attrelid = i.indrelid
+                                   AND ka.attnum = k.attnum
+                            WHERE i.indrelid = '{p_schema}.{p_table}'::regclass
+                              AND i.indisprimary) AS pk_column_names
+                    FROM pg_attribute a
+                    WHERE a.attrelid = '{p_schema}.{p_table}'::regclass
+                      AND a.attnum > 0
+                      AND NOT a.attisdropped
+                '''.format(
+                    p_schema=v_schema.replace("'", "''"),
+                    p_table=v_table.replace("'", "''")
+                )
+            ).Rows[0]
+
+            if len(v_path_dict['delete']) > 0:
+                v_text += 'CREATE TEMPORARY TABLE data_comparer_delete ON COMMIT DROP AS SELECT {p_key} FROM {p_schema}.{p_table} WITH NO DATA;\n'.format(
+                    p_key=v_key,
+                    p_schema=v_schema,
+                    p_table=v_table
+                )
+
+                v_text += ''.join([
+                    get_patch_copy_command(p_table='data_comparer_delete', p_columns=v_key, p_path=v_path, p_output_compression=p_output_compression)
+                    for v_path in v_path_dict['delete']
+                ])
+
+                if v_row['pk_column_names'] is not None:
+                    #Primary key columns are never NULL, so a plain equality lets the join use the primary key index or a hash
+                    v_text += 'DELETE FROM {p_schema}.{p_table} t USING data_comparer_delete d WHERE {p_condition};\n\n'.format(
+                        p_schema=v_schema,
+                        p_table=v_table,
+                        p_condition=' AND '.join([
+                            't.{p_column} = d.{p_column}'.format(p_column=v_column)
+                            for v_column in v_key_list
+                        ])
+                    )
+                else:
+                    #Tables without primary key are keyed by all their columns and may hold several copies of a record, each deleted copy reported on its own
+                    v_text += get_patch_keyless_delete_sql(p_schema=v_schema, p_table=v_table, p_columns=v_key_list)
+
+            if len(v_path_dict['upsert']) > 0:
+                #Records just hold compared columns, so others keep their values or defaults
+                v_columns = v_row['column_names'] if v_compared_columns is None else v_compared_columns
+                v_column_list = v_columns.split(',')
+
+                v_text += 'CREATE TEMPORARY TABLE data_comparer_upsert ON COMMIT DROP AS SELECT {p_columns} FROM {p_schema}.{p_table} WITH NO DATA;\n'.format(
+                    p_columns=v_columns,
+                    p_schema=v_schema,
+                    p_table=v_table
+                )
+
+                v_text += ''.join([
+                    get_patch_copy_command(p_table='data_comparer_upsert', p_columns=v_columns, p_path=v_path, p_output_compression=p_output_compression)
+                    for v_path in v_path_dict['upsert']
+                ])
+
+                v_text += 'INSERT INTO {p_schema}.{p_table} ({p_columns}) SELECT {p_columns} FROM data_comparer_upsert{p_conflict};\n\n'.format(
+                    p_schema=v_schema,
+                    p_table=v_table,
+                    p_columns=v_columns,
+                    p_conflict='' if v_row['pk_column_names'] is None else ' ON CONFLICT ({p_key}) {p_action}'.format(
+                        p_key=v_row['pk_column_names'],
+                        p_action='DO UPDATE SET {p_sets}'.format(
+                            p_sets=','.join([
+                                '{p_column} = EXCLUDED.{p_column}'.format(p_column=v_column)
+                                for v_column in v_column_list
+                                if v_column not in v_row['pk_column_names'].split(',')
+                            ])
+                        ) if len(v_column_list) > len(v_row['pk_column_names'].split(',')) else 'DO NOTHING'
+                    )
+                )
+
+            v_section_list.append('-- tables_data_patch: {p_schema}.{p_table}\n{p_text}COMMIT;\n\n'.format(
+                p_schema=v_schema,
+                p_table=v_table,
+                p_text=v_text
+            ))
+    finally:
+        p_database.Close(p_commit=False)
+
+    with open(file=os.path.join(p_output_directory, 'tables_data_patch.sql'), mode='w', encoding='utf-8') as v_file:
+        v_file.write('\\set ON_ERROR_STOP on\n\n' + ''.join(v_section_list))
+
+    return len(v_section_list)
+
+
+def get_process_count(p_max_count=None, p_connection_budget=None, p_process_connections=None, p_reserved_connections=0):
+    """Get how many processes of a pool can run without exceeding a budget of connections to a database.
+
+        Args:
+            p_max_count (int): number of processes when the budget allows it. Defaults to None.
+            p_connection_budget (int): maximum number of connections to the database, or None if unlimited. Defaults to None.
+            p_process_connections (int): connections each process may hold at the same time. Defaults to None.
+            p_reserved_connections (int): connections taken from the budget by a single process besides its own ones, like a catalog snapshot. Defaults to 0.
+
+        Returns:
+            int: the number of processes. May be 0 if the budget is too small for a single one.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_max_count, int):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_max_count" parameter must be an "int" instance.', p_max_count)
+
+    if p_connection_budget is not None and not isinstance(p_connection_budget, int):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_connection_budget" parameter must be None or an "int" instance.', p_connection_budget)
+
+    if not isinstance(p_process_connections, int):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_process_connections" parameter must be an "int" instance.', p_process_connections)
+
+    if p_connection_budget is None:
+        return p_max_count
+
+    return max(min(p_max_count, (p_connection_budget - p_reserved_connections) // p_process_connections), 0)
+
+
+def run_producer_task(p_function=None, p_kwds=None):
+    """Run a producer task with the persistent database connections of this process, measuring how long it takes.
+    Check "workers.persistent_connection.initialize_process".
+
+        Args:
+            p_function (function): the function of the task. Defaults to None.
+            p_kwds (dict): keyworded args to be passed to the function. Defaults to None.
+
+        Returns:
+            float: seconds the task took.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not callable(p_function):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_function" parameter must be a callable "function".', p_function)
+
+    if not isinstance(p_kwds, dict):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_kwds" parameter must be a "dict" instance.', p_kwds)
+
+    v_start_time = time.time()
+    v_database_1, v_database_2 = workers.persistent_connection.get_process_connections()
+    p_function(p_database_1=v_database_1, p_database_2=v_database_2, **p_kwds)
+
+    return time.time() - v_start_time
+
+
+def read_tables_data_watermarks(p_output_database=None):
+    """Read watermarks of the last tables data comparison from the report database, creating their table if it does not exist.
+
+        Args:
+            p_output_database (Spartacus.Database.PostgreSQL): the output database. Defaults to None.
+
+        Returns:
+            dict: text representation of each watermark, keyed by schema, table and watermark column names tuple.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_output_database, Spartacus.Database.PostgreSQL):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_output_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_output_database)
+
+    p_output_database.Open(p_autocommit=True)
+
+    try:
+        p_output_database.Execute(
+            p_sql='''
+                CREATE SCHEMA IF NOT EXISTS database_comparer_report;
+            '''
+        )
+
+        p_output_database.Execute(
+            p_sql='''
+                CREATE TABLE IF NOT EXISTS database_comparer_report.tables_data_watermark (
+                    schema_name TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    column_name TEXT NOT NULL,
+                    watermark TEXT NOT NULL,
+                    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                    PRIMARY KEY (schema_name, table_name)
+                );
+            '''
+        )
+
+        v_table = p_output_database.Query(
+            p_sql='''
+                SELECT schema_name,
+                       table_name,
+                       column_name,
+                       watermark
+                FROM database_comparer_report.tables_data_watermark
+            '''
+        )
+    finally:
+        p_output_database.Close(p_commit=True)
+
+    return {
+        (v_row['schema_name'], v_row['table_name'], v_row['column_name']): v_row['watermark']
+        for v_row in v_table.Rows
+    }
+
+
+def write_tables_data_watermarks(p_output_database=None, p_watermark_list=None):
+    """Write watermarks of tables data comparison into the report database, replacing the ones of the last comparison.
+
+        Args:
+            p_output_database (Spartacus.Database.PostgreSQL): the output database. Defaults to None.
+            p_watermark_list (list): list of watermarks. Each one is a dict with 'schema_name', 'table_name', 'column_name' and 'watermark' keys. Defaults to None.
+
+        Raises:
+            workers.custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_output_database, Spartacus.Database.PostgreSQL):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_output_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_output_database)
+
+    if not isinstance(p_watermark_list, list):
+        raise workers.custom_exceptions.InvalidParameterTypeException('"p_watermark_list" parameter must be a "list" instance.', p_watermark_list)
+
+    if len(p_watermark_list) == 0:
+        return
+
+    p_output_database.Open(p_autocommit=False)
+
+    try:
+        p_output_database.Execute(
+            p_sql='''
+                INSERT INTO database_comparer_report.tables_data_watermark (
+                    schema_name,
+                    table_name,
+                    column_name,
+                    watermark
+                ) VALUES
+                {p_values}
+                ON CONFLICT (schema_name, table_name) DO UPDATE
+                SET column_name = EXCLUDED.column_name,
+                    watermark = EXCLUDED.watermark,
+                    updated_at = NOW()
+            '''.format(
+                p_values=','.join([
+                    '({p_values})'.format(
+                        p_values=','.join([
+                            workers.compare_tables_data.get_sql_value(p_value=v_watermark[v_column], p_type='text')
+                            for v_column in ['schema_name', 'table_name', 'column_name', 'watermark']
+                        ])
+                    )
+                    for v_watermark in p_watermark_list
+                ])
+            )
+        )
+
+        p_output_database.Close(p_commit=True)
+    except Exception:
+        p_output_database.Close(p_commit=False)
+        raise
+
+
+if __name__ == '__main__':
+    try:
+        v_parser = argparse.ArgumentParser(
+            epilog=inspect.cleandoc(
+                doc='''\
+                    Script used to compare databases and find the differences between them, if any.
+                    Found differences will be written to a given report database connection, in the table "database_comparer_report.output_report".
+                    The differences considers commands to get in target from source database.
+                '''
+            )
+        )
+
+        v_parser.add_argument(
+            '-b',
+            '--block-size',
+            dest='block_size',
+            help='Number of data records that the comparer will deal with at the same time in each opened process. Used to reduce memory usage. Also points number of records inserted at a time in the consumer workers.',
+            type=int,
+            required=True
+        )
+
+        v_parser.add_argument(
+            '-m',
+            '--data-comparison-mode',
+            dest='data_comparison_mode',
+            help='How tables data is compared. "rows" fetches and compares every record. "checksum" makes both databases compute checksums of key ranges, bisecting ranges that differ, and fetches just records of ranges that differ. "hash" fetches keys and hashes of every record, and full records just when they differ. Defaults to "rows".',
+            type=str,
+            choices=workers.compare_tables_data.COMPARISON_MODE_LIST,
+            default='rows',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-k',
+            '--keyless-comparison-mode',
+            dest='keyless_comparison_mode',
+            help='How data of tables without primary key is compared. "rows" compares them as any other table, using all their columns as key, so records are sorted by all columns. "multiset" compares checksums of hash buckets of records, fetching just buckets that differ, without sorting records. Defaults to "multiset".',
+            type=str,
+            choices=workers.compare_tables_data.KEYLESS_COMPARISON_MODE_LIST,
+            default='multiset',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-a',
+            '--fetch-mode',
+            dest='fetch_mode',
+            help='How blocks of records of both databases are fetched while comparing them. "serial" fetches each block when needed. "thread" fetches next block of each database in a background thread while the current one is compared. "asyncio" fetches next blocks of both databases at the same time through an event loop and asynchronous connections of its own. Defaults to "thread".',
+            type=str,
+            choices=workers.utils.FETCH_MODE_LIST,
+            default='thread',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-y',
+            '--row-reader',
+            dest='row_reader',
+            help='How records are read when tables data is compared row by row. "query" fetches them by blocks through a cursor. "copy" streams them with COPY commands in text format, comparing raw records and decoding just the ones that differ. Defaults to "query".',
+            type=str,
+            choices=workers.compare_tables_data.ROW_READER_LIST,
+            default='query',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-g',
+            '--dml-batch-rows',
+            dest='dml_batch_rows',
+            help='Maximum number of records of each reported INSERT or DELETE statement of tables data. Consecutive inserted records are grouped in multi-row INSERT statements, and consecutive deleted ones in DELETE statements with a list of keys, so reports are applied much faster. Defaults to 1, a statement for each record.',
+            type=int,
+            default=1,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-r',
+            '--split-rows',
+            dest='split_rows',
+            help='Tables estimated to hold more records than this number are split in key ranges of about this size, so their data is compared by many processes in parallel. Use 0 to never split tables. Defaults to 1000000.',
+            type=int,
+            default=1000000,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-w',
+            '--report-write-mode',
+            dest='report_write_mode',
+            help='How consumers insert comparison results into the output database. "copy" streams them with COPY commands. "function" calls database_comparer_report.output_report_fnc_add for each result. Defaults to "copy".',
+            type=str,
+            choices=['copy', 'function'],
+            default='copy',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-c',
+            '--catalog-comparison-mode',
+            dest='catalog_comparison_mode',
+            help='How database objects are compared. "snapshot" runs all object comparers in a single process, sharing a single snapshot of each database catalog, where each catalog table is read just once into a temporary table and each catalog query is run just once. "parallel" runs each object comparer in its own process, with its own connections. Defaults to "snapshot".',
+            type=str,
+            choices=['snapshot', 'parallel'],
+            default='snapshot',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-e',
+            '--exclude-tables',
+            dest='exclude_tables',
+            help='List of tables to be excluded from tables data comparisons. Will still be considered for tables structure comparison. Example: --exclude-tables {public.table_1, my_schema.table_2}.',
+            type=str,
+            default=[],
+            nargs='+',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-i',
+            '--include-columns',
+            dest='include_columns',
+            help='List of column patterns to be compared in tables data comparisons. Tables matched by any pattern just have matching columns read and compared, besides primary key columns. Patterns are "column", "table.column" (public schema) or "schema.table.column", and accept shell-style wildcards. Example: --include-columns public.table_1.name my_schema.*.amount.',
+            type=str,
+            default=[],
+            nargs='+',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-x',
+            '--exclude-columns',
+            dest='exclude_columns',
+            help='List of column patterns never read nor compared in tables data comparisons. Primary key columns are always compared. Patterns are as in --include-columns. Example: --exclude-columns updated_at public.table_1.payload.',
+            type=str,
+            default=[],
+            nargs='+',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-W',
+            '--table-filters',
+            dest='table_filters',
+            help='List of row filters of tables data comparisons, each one as "[schema.]table=predicate". Just records matching the SQL predicate are compared, in both databases. Schema defaults to public. Example: --table-filters "orders=created_at >= \'2024-01-01\'" "sales.items=tenant_id = 7".',
+            type=str,
+            default=[],
+            nargs='+',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-u',
+            '--watermark-columns',
+            dest='watermark_columns',
+            help='List of watermark columns of tables, each one as "[schema.]table=column", like an update timestamp or a row version that grows whenever a record changes. The greatest value of each column is saved in database_comparer_report.tables_data_watermark table of the report database, and next comparisons just compare records changed since then in any database, besides a key-only pass that finds inserted and deleted records. Requires --output-database-connection. Example: --watermark-columns orders=updated_at sales.items=row_version.',
+            type=str,
+            default=[],
+            nargs='+',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--max-source-connections',
+            dest='max_source_connections',
+            help='Maximum number of connections opened to the source database at the same time while comparing. Comparer subprocesses are limited so their connections fit, counting an extra connection of each one when --fetch-mode is "asyncio" and the catalog snapshot connection. Defaults to no limit.',
+            type=int,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--max-target-connections',
+            dest='max_target_connections',
+            help='Maximum number of connections opened to the target database at the same time while comparing, counted as in --max-source-connections. Defaults to no limit.',
+            type=int,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--max-output-connections',
+            dest='max_output_connections',
+            help='Maximum number of connections opened to the report database at the same time. Consumer subprocesses that write to it are limited to this number. Defaults to no limit.',
+            type=int,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--producers',
+            dest='producers',
+            help='Number of comparer subprocesses. Defaults to the number of cpu cores.',
+            type=int,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--consumers',
+            dest='consumers',
+            help='Number of consumer subprocesses, that write comparison results. They just wait for database or disk, so a few of them are usually enough. When --consumer-mode is "adaptive", the maximum number of them. Defaults to the number of cpu cores.',
+            type=int,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--consumer-mode',
+            dest='consumer_mode',
+            help='How many consumer subprocesses run. "fixed" runs --consumers of them all the time. "adaptive" starts with one, starts another one while results queue up faster than running ones write them, up to --consumers, and retires one when the queue stays empty, down to one. Defaults to "fixed".',
+            type=str,
+            choices=['fixed', 'adaptive'],
+            default='fixed',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--queue-max-items',
+            dest='queue_max_items',
+            help='Maximum number of message blocks, of up to --block-size messages each, kept in memory between comparer and consumer subprocesses. Defaults to 1000.',
+            type=int,
+            default=1000,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--queue-max-size',
+            dest='queue_max_size',
+            help='Maximum size of message blocks kept in memory between comparer and consumer subprocesses, in megabytes of their text values. Defaults to 256.',
+            type=int,
+            default=256,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--queue-overflow-mode',
+            dest='queue_overflow_mode',
+            help='What comparer subprocesses do when the queue of messages is full, because consumers are slower. "block" waits for consumers. "spill" writes further messages to a temporary file, read back in order as the queue empties, so comparisons never wait. Defaults to "block".',
+            type=str,
+            choices=workers.utils.QUEUE_OVERFLOW_MODE_LIST,
+            default='block',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '--spill-directory',
+            dest='spill_directory',
+            help='Directory of the temporary file of spilled messages, when --queue-overflow-mode is "spill". Defaults to the system temporary directory.',
+            type=str,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-s',
+            '--source-database-connection',
+            dest='source_database_connection',
+            help='Connection string to the source database of comparison. Has the following structure: HOST:PORT:DATABASE:USER:PASSWORD. You can leave password empty if it is already in you .pgpass file. Not required if --source-catalog-snapshot is given, but then tables data is not compared.',
+            type=str,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-S',
+            '--source-catalog-snapshot',
+            dest='source_catalog_snapshot',
+            help='Path of a catalog snapshot file, saved by --save-source-catalog-snapshot, to read the source database objects from instead of querying the source database.',
+            type=str,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-D',
+            '--save-source-catalog-snapshot',
+            dest='save_source_catalog_snapshot',
+            help='Path of a file to save the source database catalog snapshot to, so later comparisons can use it through --source-catalog-snapshot.',
+            type=str,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-t',
+            '--target-database-connection',
+            dest='target_database_connection',
+            help='Connection string to the target database of comparison. Has the following structure: HOST:PORT:DATABASE:USER:PASSWORD. You can leave password empty if it is already in you .pgpass file.',
+            type=str,
+            required=True
+        )
+
+        v_parser.add_argument(
+            '-o',
+            '--output-database-connection',
+            dest='output_database_connection',
+            help='Connection string to the report database. Has the following structure: HOST:PORT:DATABASE:USER:PASSWORD. You can leave password empty if it is already in you .pgpass file. Required when --output-format is "database".',
+            type=str,
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-f',
+            '--output-format',
+            dest='output_format',
+            help='Where comparison results are written. "database" inserts them into database_comparer_report.output_report table of the report database. "sql" writes SQL script files and "jsonl" writes JSON lines files into --output-directory, one file per category of results and consumer process. "patch" writes tables data differences as COPY files per table, applied by set-based statements of the tables_data_patch.sql psql script, and other results as SQL script files. Defaults to "database".',
+            type=str,
+            choices=['database', 'sql', 'jsonl', 'patch'],
+            default='database',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-d',
+            '--output-directory',
+            dest='output_directory',
+            help='Directory where report files are written when --output-format is "sql", "jsonl" or "patch". Created if it does not exist. Defaults to "database_comparer_report".',
+            type=str,
+            default='database_comparer_report',
+            required=False
+        )
+
+        v_parser.add_argument(
+            '-z',
+            '--output-compression',
+            dest='output_compression',
+            help='Compression of report files. "zstd" requires zstandard python package. Defaults to "none".',
+            type=str,
+            choices=['none', 'gzip', 'zstd'],
+            default='none',
+            required=False
+        )
+
+        v_options = v_parser.parse_args()
+
+        if v_options.output_format == 'database' and v_options.output_database_connection is None:
+            v_parser.error('--output-database-connection is required when --output-format is "database".')
+
+        if len(v_options.watermark_columns) > 0 and v_options.output_database_connection is None:
+            v_parser.error('--watermark-columns requires --output-database-connection, where watermarks are saved.')
+
+        if v_options.output_compression == 'zstd' and zstandard is None:
+            v_parser.error('--output-compression "zstd" requires zstandard python package.')
+
+        if v_options.dml_batch_rows < 1:
+            v_parser.error('--dml-batch-rows must be a positive number.')
+
+        if v_options.source_database_connection is None and v_options.source_catalog_snapshot is None:
+            v_parser.error('--source-database-connection or --source-catalog-snapshot is required.')
+
+        if v_options.save_source_catalog_snapshot is not None and v_options.source_database_connection is None:
+            v_parser.error('--save-source-catalog-snapshot requires --source-database-connection.')
+
+        if (v_options.source_catalog_snapshot is not None or v_options.save_source_catalog_snapshot is not None) and v_options.catalog_comparison_mode != 'snapshot':
+            v_parser.error('Catalog snapshot files require --catalog-comparison-mode "snapshot".')
+
+        for v_option in ['max_source_connections', 'max_target_connections', 'max_output_connections', 'producers', 'consumers', 'queue_max_items', 'queue_max_size']:
+            if getattr(v_options, v_option) is not None and getattr(v_options, v_option) < 1:
+                v_parser.error('--{p_option} must be a positive number.'.format(p_option=v_option.replace('_', '-')))
+
+        #Each comparer subprocess keeps a connection to each database, plus one of its own when blocks are fetched asynchronously
+        v_process_connections = 2 if v_options.fetch_mode == 'asyncio' else 1
+        v_reserved_connections = 1 if v_options.catalog_comparison_mode == 'snapshot' else 0
+        v_producer_count = v_options.producers if v_options.producers is not None else multiprocessing.cpu_count()
+
+        for v_connection_budget in [v_options.max_source_connections if v_options.source_database_connection is not None else None, v_options.max_target_connections]:
+            v_producer_count = get_process_count(
+                p_max_count=v_producer_count,
+                p_connection_budget=v_connection_budget,
+                p_process_connections=v_process_connections,
+                p_reserved_connections=v_reserved_connections
+            )
+
+        if v_producer_count == 0:
+            v_parser.error('--max-source-connections and --max-target-connections must allow at least {p_count} connections with given --fetch-mode and --catalog-comparison-mode.'.format(p_count=v_process_connections + v_reserved_connections))
+
+        #Consumers just connect to the report database when writing to it
+        v_consumer_count = get_process_count(
+            p_max_count=v_options.consumers if v_options.consumers is not None else multiprocessing.cpu_count(),
+            p_connection_budget=v_options.max_output_connections if v_options.output_format == 'database' else None,
+            p_process_connections=1
+        )
+
+        #Get databases credentials
+        v_source_params = v_options.source_database_connection.split(':') if v_options.source_database_connection is not None else None
+        v_target_params = v_options.target_database_connection.split(':')
+
+        v_output_params = v_options.output_database_connection.split(':') if v_options.output_database_connection is not None else None
+
+        if v_options.output_format == 'database':
+            v_output_database = Spartacus.Database.PostgreSQL(
+                p_host=v_output_params[0],
+                p_port=v_output_params[1],
+                p_service=v_output_params[2],
+                p_user=v_output_params[3],
+                p_password=v_output_params[4],
                 p_application_name='compare_databases'
             )
 
+            #Open output database and create output structure
+            v_output_database.Open(p_autocommit=True)
+
+            v_output_database.Execute(
+                p_sql='''
+                    CREATE SCHEMA IF NOT EXISTS database_comparer_report;
+                '''
+            )
+
+            v_output_database.Execute(
+                p_sql='''
+                    CREATE TABLE IF NOT EXISTS database_comparer_report.output_report (
+                        id SERIAL NOT NULL PRIMARY KEY,
+                        category TEXT NOT NULL,
+                        schema_name TEXT,
+                        table_name TEXT,
+                        column_name TEXT,
+                        constraint_name TEXT,
+                        trigger_name TEXT,
+                        index_name TEXT,
+                        sequence_name TEXT,
+                        view_name TEXT,
+                        mview_name TEXT,
+                        function_id TEXT,
+                        status TEXT,
+                        sql TEXT
+                    );
+                '''
+            )
+
+            v_output_database.Execute(
+                p_sql='''
+                    TRUNCATE database_comparer_report.output_report
+                '''
+            )
+
+            v_output_database.Execute(
+                p_sql='''
+                    CREATE OR REPLACE FUNCTION database_comparer_report.output_report_fnc_add (
+                        p_category TEXT DEFAULT NULL::TEXT,
+                        p_schema_name TEXT DEFAULT NULL::TEXT,
+                        p_table_name TEXT DEFAULT NULL::TEXT,
+                        p_column_name TEXT DEFAULT NULL::TEXT,
+                        p_constraint_name TEXT DEFAULT NULL::TEXT,
+                        p_trigger_name TEXT DEFAULT NULL::TEXT,
+                        p_index_name TEXT DEFAULT NULL::TEXT,
+                        p_sequence_name TEXT DEFAULT NULL::TEXT,
+                        p_view_name TEXT DEFAULT NULL::TEXT,
+                        p_mview_name TEXT DEFAULT NULL::TEXT,
+                        p_function_id TEXT DEFAULT NULL::TEXT,
+                        p_status TEXT DEFAULT NULL::TEXT,
+                        p_sql TEXT DEFAULT NULL::TEXT
+                    )
+                    RETURNS INTEGER
+                    LANGUAGE plpgsql
+                    AS
+                    $function$
+                    DECLARE
+                        v_id INTEGER;
+                    BEGIN
+                        INSERT INTO database_comparer_report.output_report (
+                            category,
+                            schema_name,
+                            table_name,
+                            column_name,
+                            constraint_name,
+                            trigger_name,
+                            index_name,
+                            sequence_name,
+                            view_name,
+                            mview_name,
+                            function_id,
+                            status,
+                            sql
+                        ) VALUES (
+                            p_category,
+                            p_schema_name,
+                            p_table_name,
+                            p_column_name,
+                            p_constraint_name,
+                            p_trigger_name,
+                            p_index_name,
+                            p_sequence_name,
+                            p_view_name,
+                            p_mview_name,
+                            p_function_id,
+                            p_status,
+                            p_sql
+                        )
+                        RETURNING id INTO v_id;
+
+                        RETURN v_id;
+                    END;
+                    $function$
+                '''
+            )
+
+            v_output_database.Close(p_commit=True)
+        else:
+            os.makedirs(v_options.output_directory, exist_ok=True)
+
+            if v_options.output_format == 'patch':
+                os.makedirs(os.path.join(v_options.output_directory, PATCH_DIRECTORY), exist_ok=True)
+
+        #Open a process pool for producers and create tasks to be run in parallel
+        #Each producer process keeps a connection to each database, reused by all its tasks
+        v_producers_process_pool = multiprocessing.Pool(
+            v_producer_count,
+            initializer=workers.persistent_connection.initialize_process,
+            initargs=(
+                Spartacus.Database.PostgreSQL(
+                    p_host=v_source_params[0],
+                    p_port=v_source_params[1],
+                    p_service=v_source_params[2],
+                    p_user=v_source_params[3],
+                    p_password=v_source_params[4],
+                    p_application_name='compare_databases'
+                ) if v_source_params is not None else None,
+                Spartacus.Database.PostgreSQL(
+                    p_host=v_target_params[0],
+                    p_port=v_target_params[1],
+                    p_service=v_target_params[2],
+                    p_user=v_target_params[3],
+                    p_password=v_target_params[4],
+                    p_application_name='compare_databases'
+                )
+            )
+        )
+        v_producers_result_list = []
+        v_producers_task_list = []
+
+        v_catalog_task_list = []
+
+        v_catalog_task_list += workers.compare_functions.get_compare_functions_tasks()
+        v_catalog_task_list += workers.compare_indexes.get_compare_indexes_tasks()
+        v_catalog_task_list += workers.compare_mviews.get_compare_mviews_tasks()
+        v_catalog_task_list += workers.compare_procedures.get_compare_procedures_tasks()
+        v_catalog_task_list += workers.compare_schemas.get_compare_schemas_tasks()
+        v_catalog_task_list += workers.compare_sequences.get_compare_sequences_tasks()
+        v_catalog_task_list += workers.compare_tables_checks.get_compare_tables_checks_tasks()
+        v_catalog_task_list += workers.compare_tables_columns.get_compare_tables_columns_tasks()
+        v_catalog_task_list += workers.compare_tables_excludes.get_compare_tables_excludes_tasks()
+        v_catalog_task_list += workers.compare_tables_fks.get_compare_tables_fks_tasks()
+        v_catalog_task_list += workers.compare_tables_pks.get_compare_tables_pks_tasks()
+        v_catalog_task_list += workers.compare_tables_rules.get_compare_tables_rules_tasks()
+        v_catalog_task_list += workers.compare_tables_triggers.get_compare_tables_triggers_tasks()
+        v_catalog_task_list += workers.compare_tables_uniques.get_compare_tables_uniques_tasks()
+        v_catalog_task_list += workers.compare_tables.get_compare_tables_tasks()
+        v_catalog_task_list += workers.compare_trigger_functions.get_compare_trigger_functions_tasks()
+        v_catalog_task_list += workers.compare_views.get_compare_views_tasks()
+
+        #Catalog comparers may share a snapshot in a single process or run each one in its own process
+        if v_options.catalog_comparison_mode == 'snapshot':
+            v_producers_task_list += workers.compare_catalog.get_compare_catalog_tasks(
+                p_task_list=v_catalog_task_list,
+                p_snapshot_file_1=v_options.source_catalog_snapshot,
+                p_save_snapshot_file_1=v_options.save_source_catalog_snapshot,
+                p_database_1=Spartacus.Database.PostgreSQL(
+                    p_host=v_source_params[0],
+                    p_port=v_source_params[1],
+                    p_service=v_source_params[2],
+                    p_user=v_source_params[3],
+                    p_password=v_source_params[4],
+                    p_application_name='compare_databases'
+                ) if v_source_params is not None and v_options.source_catalog_snapshot is None else None,
+                p_database_2=Spartacus.Database.PostgreSQL(
+                    p_host=v_target_params[0],
+                    p_port=v_target_params[1],
+                    p_service=v_target_params[2],
+                    p_user=v_target_params[3],
+                    p_password=v_target_params[4],
+                    p_application_name='compare_databases'
+                )
+            )
+        else:
+            v_producers_task_list += v_catalog_task_list
+
+        #Tables data can just be compared against a live source database
+        if v_source_params is not None:
+            v_watermark_dict = {}
+
+            if len(v_options.watermark_columns) > 0:
+                v_watermark_dict = read_tables_data_watermarks(
+                    p_output_database=Spartacus.Database.PostgreSQL(
+                        p_host=v_output_params[0],
+                        p_port=v_output_params[1],
+                        p_service=v_output_params[2],
+                        p_user=v_output_params[3],
+                        p_password=v_output_params[4],
+                        p_application_name='compare_databases'
+                    )
+                )
+
+            v_producers_task_list += workers.compare_tables_data.get_compare_tables_data_tasks(
+                p_database_1=Spartacus.Database.PostgreSQL(
+                    p_host=v_source_params[0],
+                    p_port=v_source_params[1],
+                    p_service=v_source_params[2],
+                    p_user=v_source_params[3],
+                    p_password=v_source_params[4],
+                    p_application_name='compare_databases'
+                ),
+                p_database_2=Spartacus.Database.PostgreSQL(
+                    p_host=v_target_params[0],
+                    p_port=v_target_params[1],
+                    p_service=v_target_params[2],
+                    p_user=v_target_params[3],
+                    p_password=v_target_params[4],
+                    p_application_name='compare_databases'
+                ),
+                p_block_size=v_options.block_size,
+                p_exclude_tables=v_options.exclude_tables,
+                p_comparison_mode=v_options.data_comparison_mode,
+                p_split_rows=v_options.split_rows,
+                p_keyless_comparison_mode=v_options.keyless_comparison_mode,
+                p_row_reader=v_options.row_reader,
+                p_dml_batch_rows=v_options.dml_batch_rows,
+                p_data_format='patch' if v_options.output_format == 'patch' else 'statements',
+                p_include_columns=v_options.include_columns,
+                p_exclude_columns=v_options.exclude_columns,
+                p_table_filters=v_options.table_filters,
+                p_watermark_columns=v_options.watermark_columns,
+                p_watermark_dict=v_watermark_dict
+            )
+        else:
+            print('Tables data will not be compared, as there is no source database connection.')
+
+        #Pool workers take tasks in submission order, so larger tasks are submitted first to avoid a long tail of a single busy process
+        v_producers_task_list.sort(key=lambda v_task: v_task.get('cost', DEFAULT_TASK_COST), reverse=True)
+
+        v_start_time = time.time()
+        v_manager = workers.utils.QueueManager()
+        v_manager.start()
+
+        #Messages wait in the manager process for consumers, so their memory is bounded when the report is written slower than differences are found
+        v_queue = v_manager.BoundedQueue(
+            p_max_items=v_options.queue_max_items,
+            p_max_size=v_options.queue_max_size * 1024 * 1024,
+            p_overflow_mode=v_options.queue_overflow_mode,
+            p_spill_directory=v_options.spill_directory
+        )
+
+        #Bucket checksums of tables without primary key split in ranges of pages are summed in the manager process, so the last range of each table compares them
+        v_bucket_store = v_manager.BucketChecksumStore()
+
+        #Open a process pool for consumers and create tasks to be run in parallel. Adaptive consumers start just one of them
+        v_consumers_process_pool = multiprocessing.Pool(v_consumer_count)
+        v_consumers_result_list = []
+        v_active_consumer_count = v_consumer_count if v_options.consumer_mode == 'fixed' else 1
+
+        v_consumer_kwds = {
+            'p_output_database': Spartacus.Database.PostgreSQL(
+                p_host=v_output_params[0],
+                p_port=v_output_params[1],
+                p_service=v_output_params[2],
+                p_user=v_output_params[3],
+                p_password=v_output_params[4],
+                p_application_name='compare_databases'
+            ) if v_options.output_format == 'database' else None,
+            'p_block_size': v_options.block_size,
+            'p_queue': v_queue,
+            'p_write_mode': v_options.report_write_mode,
+            'p_output_format': v_options.output_format,
+            'p_output_directory': v_options.output_directory,
+            'p_output_compression': v_options.output_compression
+        }
+
+        for i in range(v_active_consumer_count):
+            v_consumers_result_list.append(
+                v_consumers_process_pool.apply_async(
+                    func=consumer_worker,
+                    kwds=dict(v_consumer_kwds, p_consumer_index=i)
+                )
+            )
+
+        for i in range(len(v_producers_task_list)):
+            v_task = v_producers_task_list[i]
+
             v_task['kwds']['p_block_size'] = v_options.block_size
+            v_task['kwds']['p_fetch_mode'] = v_options.fetch_mode
             v_task['kwds']['p_queue'] = v_queue
-            v_task['kwds']['p_is_sending_data_array'] = v_is_sending_data_array
             v_task['kwds']['p_worker_index'] = i
 
+            if v_task['kwds'].get('p_page_range') is not None:
+                v_task['kwds']['p_bucket_store'] = v_bucket_store
+
             v_producers_result_list.append(
                 v_producers_process_pool.apply_async(
-                    func=v_task['function'],
-                    kwds=v_task['kwds']
+                    func=run_producer_task,
+                    kwds={
+                        'p_function': v_task['function'],
+                        'p_kwds': v_task['kwds']
+                    }
                 )
             )
 
         v_producers_process_pool.close()
+
+        #Consumers are watched while producers run. Adaptive ones follow the queue depth: each consumer started gets an index of its own, so report files are not shared,
+        #and a retired one finishes after writing messages queued before its sentinel. Consumers just finish before their sentinel if they fail, and if none is left,
+        #messages are discarded, so producers do not wait for a full queue forever
+        v_idle_check_count = 0
+        v_check_time = time.time()
+        v_queue_abandoned = False
+
+        while not all([v_result.ready() for v_result in v_producers_result_list]):
+            [v_result for v_result in v_producers_result_list if not v_result.ready()][0].wait(CONSUMER_SCALE_INTERVAL)
+
+            if v_queue_abandoned or time.time() - v_check_time < CONSUMER_SCALE_INTERVAL:
+                continue
+
+            v_check_time = time.time()
+
+            if all([v_result.ready() for v_result in v_consumers_result_list]):
+                print('No consumer subprocess is left, so further messages are discarded.')
+                v_queue.abandon()
+                v_queue_abandoned = True
+
+                continue
+
+            if v_options.consumer_mode == 'fixed':
+                continue
+
+            v_queue_depth = v_queue.qsize()
+
+            if v_queue_depth > v_active_consumer_count * CONSUMER_SCALE_DEPTH and v_active_consumer_count < v_consumer_count:
+                v_consumers_result_list.append(
+                    v_consumers_process_pool.apply_async(
+                        func=consumer_worker,
+                        kwds=dict(v_consumer_kwds, p_consumer_index=len(v_consumers_result_list))
+                    )
+                )
+
+                v_active_consumer_count += 1
+
+            v_idle_check_count = v_idle_check_count + 1 if v_queue_depth == 0 else 0
+
+            if v_idle_check_count >= CONSUMER_RETIRE_CHECKS and v_active_consumer_count > 1:
+                v_queue.put(None)
+                v_active_consumer_count -= 1
+                v_idle_check_count = 0
+
         v_producers_process_pool.join()
 
+        v_producers_elapsed_time = time.time() - v_start_time
+
+        #Producers are done, so let's tell each consumer to finish after remaining messages
+        for i in range(v_active_consumer_count):
+            v_queue.put(None)
+
         v_consumers_process_pool.close()
         v_consumers_process_pool.join()
 
+        v_elapsed_time = time.time() - v_start_time
+        v_message_count = sum([v_result.get() for v_result in v_consumers_result_list if v_result.successful()])
+
+        print('{p_count} messages sent by producers in {p_time:.1f} seconds ({p_rate:.0f} messages/s), written by {p_consumers} consumers.'.format(
+            p_count=v_message_count,
+            p_time=v_elapsed_time,
+            p_rate=v_message_count / max(v_elapsed_time, 0.001),
+            p_consumers=len(v_consumers_result_list)
+        ))
+
+        v_queue_stats = v_queue.get_stats()
+
+        print('Messages queue peak: {p_items} blocks, {p_size:.1f} MB in memory, {p_spilled} blocks spilled to disk.'.format(
+            p_items=v_queue_stats['peak_items'],
+            p_size=v_queue_stats['peak_size'] / 1024 / 1024,
+            p_spilled=v_queue_stats['spilled_items']
+        ))
+
+        #Predict durations of tasks from their costs, at the rate measured for tasks with a cost, and durations of other tasks from their mean
+        v_duration_list = [v_result.get() if v_result.successful() else 0.0 for v_result in v_producers_result_list]
+        v_cost_list = [v_task.get('cost', DEFAULT_TASK_COST) for v_task in v_producers_task_list]
+        v_cost_duration_list = [v_duration for v_duration, v_cost in zip(v_duration_list, v_cost_list) if v_cost > DEFAULT_TASK_COST]
+        v_other_duration_list = [v_duration for v_duration, v_cost in zip(v_duration_list, v_cost_list) if v_cost <= DEFAULT_TASK_COST]
+        v_rate = sum(v_cost_duration_list) / max(sum([v_cost for v_cost in v_cost_list if v_cost > DEFAULT_TASK_COST]), 1)
+        v_other_duration = sum(v_other_duration_list) / max(len(v_other_duration_list), 1)
+
+        print('Producers makespan: {p_actual:.1f} seconds, {p_predicted:.1f} seconds predicted from tables sizes ({p_count} tasks in {p_processes} processes, largest first).'.format(
+            p_actual=v_producers_elapsed_time,
+            p_predicted=workers.utils.get_makespan(
+                p_duration_list=[v_cost * v_rate if v_cost > DEFAULT_TASK_COST else v_other_duration for v_cost in v_cost_list],
+                p_worker_count=v_producer_count
+            ),
+            p_count=len(v_producers_task_list),
+            p_processes=v_producer_count
+        ))
+
+        #Watermarks of tables are saved just if every task of the table succeeded, so failed ranges are compared again by next comparison
+        v_watermark_list = []
+        v_failed_table_list = []
+
+        for v_task, v_result in zip(v_producers_task_list, v_producers_result_list):
+            if 'watermark' not in v_task:
+                continue
+
+            v_table = (v_task['watermark']['schema_name'], v_task['watermark']['table_name'])
+
+            if not v_result.successful():
+                v_failed_table_list.append(v_table)
+            elif v_task['watermark'] not in v_watermark_list:
+                v_watermark_list.append(v_task['watermark'])
+
+        v_watermark_list = [
+            v_watermark
+            for v_watermark in v_watermark_list
+            if (v_watermark['schema_name'], v_watermark['table_name']) not in v_failed_table_list
+        ]
+
+        if len(v_watermark_list) > 0:
+            write_tables_data_watermarks(
+                p_output_database=Spartacus.Database.PostgreSQL(
+                    p_host=v_output_params[0],
+                    p_port=v_output_params[1],
+                    p_service=v_output_params[2],
+                    p_user=v_output_params[3],
+                    p_password=v_output_params[4],
+                    p_application_name='compare_databases'
+                ),
+                p_watermark_list=v_watermark_list
+            )
+
+            print('{p_count} tables data watermarks saved.'.format(p_count=len(v_watermark_list)))
+
+        #Patch files of all tables are applied by a single script
+        if v_options.output_format == 'patch':
+            v_table_list = []
+
+            for v_task in v_producers_task_list:
+                if v_task['function'] == workers.compare_tables_data.compare_tables_data:
+                    v_table = [v_task['kwds']['p_schema'], v_task['kwds']['p_table'], v_task['kwds']['p_key'], v_task['kwds']['p_compared_columns']]
+
+                    #Tables compared in ranges have a task per range
+                    if v_table not in v_table_list:
+                        v_table_list.append(v_table)
+
+            v_table_count = write_patch_script(
+                p_database=Spartacus.Database.PostgreSQL(
+                    p_host=v_target_params[0],
+                    p_port=v_target_params[1],
+                    p_service=v_target_params[2],
+                    p_user=v_target_params[3],
+                    p_password=v_target_params[4],
+                    p_application_name='compare_databases'
+                ),
+                p_output_directory=v_options.output_directory,
+                p_table_list=v_table_list,
+                p_consumer_count=len(v_consumers_result_list),
+                p_output_compression=v_options.output_compression
+            )
+
+            print('{p_count} tables patched by {p_path}.'.format(
+                p_count=v_table_count,
+                p_path=os.path.join(v_options.output_directory, 'tables_data_patch.sql')
+            ))
+
         #If any exception in any producer task
         if not all([v_result.successful() for v_result in v_producers_result_list]):
             print('Some exception has occurred in the comparer subprocesses. Please, check the exceptions below:')
@@ -0,0 +1,377 @@
+import asyncio
+import psycopg2
+import psycopg2.extras
+import psycopg2.extensions
+import Spartacus.Database
+
+from .import custom_exceptions
+
+
+#Asynchronous connections kept by this process between queries, by connection string, so each query does not pay a new connection handshake
+v_process_connection_dict = {}
+
+
+async def wait(p_connection=None):
+    """Wait for an asynchronous psycopg2 connection to finish its current operation, without blocking the event loop.
+
+        Args:
+            p_connection (psycopg2.extensions.connection): the asynchronous connection. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            psycopg2.Error: if the operation failed.
+    """
+
+    if not isinstance(p_connection, psycopg2.extensions.connection):
+        raise custom_exceptions.InvalidParameterTypeException('"p_connection" parameter must be a "psycopg2.extensions.connection" instance.', p_connection)
+
+    v_loop = asyncio.get_running_loop()
+
+    while True:
+        v_state = p_connection.poll()
+
+        if v_state == psycopg2.extensions.POLL_OK:
+            return
+
+        v_future = v_loop.create_future()
+        v_callback = lambda: None if v_future.done() else v_future.set_result(None)
+
+        if v_state == psycopg2.extensions.POLL_READ:
+            v_loop.add_reader(p_connection.fileno(), v_callback)
+
+            try:
+                await v_future
+            finally:
+                v_loop.remove_reader(p_connection.fileno())
+        elif v_state == psycopg2.extensions.POLL_WRITE:
+            v_loop.add_writer(p_connection.fileno(), v_callback)
+
+            try:
+                await v_future
+            finally:
+                v_loop.remove_writer(p_connection.fileno())
+        else:
+            raise psycopg2.OperationalError('Unexpected poll state: {0}.'.format(v_state))
+
+
+async def connect(p_database=None):
+    """Get an asynchronous connection to a database, reusing the one kept by this process if it is still healthy.
+    The connection is taken from the kept ones until it is given back by "release", so concurrent queries never share it.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database. Just its connection parameters are used. Defaults to None.
+
+        Returns:
+            psycopg2.extensions.connection: the asynchronous connection, idle and outside any transaction.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            psycopg2.Error: if the connection failed.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    v_connection = v_process_connection_dict.pop(p_database.GetConnectionString(), None)
+
+    if v_connection is not None:
+        #Server may have dropped the kept connection meanwhile, so it is checked before use
+        try:
+            v_cursor = v_connection.cursor()
+            v_cursor.execute('SELECT 1')
+            await wait(p_connection=v_connection)
+
+            return v_connection
+        except psycopg2.Error:
+            v_connection.close()
+        except BaseException:
+            v_connection.close()
+            raise
+
+    v_connection = psycopg2.connect(
+        p_database.GetConnectionString(),
+        cursor_factory=psycopg2.extras.DictCursor,
+        async_=1
+    )
+
+    try:
+        await wait(p_connection=v_connection)
+    except BaseException:
+        v_connection.close()
+        raise
+
+    return v_connection
+
+
+async def release(p_database=None, p_connection=None):
+    """Give back an asynchronous connection got from "connect", discarding its transaction. It is kept for next queries, unless
+    this process already keeps one to the same database, or it is busy or broken, as when a query was cancelled while running.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database of the connection. Defaults to None.
+            p_connection (psycopg2.extensions.connection): the asynchronous connection. Defaults to None.
+    """
+
+    v_connection_string = p_database.GetConnectionString()
+
+    if p_connection.closed != 0 or p_connection.isexecuting() or v_connection_string in v_process_connection_dict:
+        p_connection.close()
+
+        return
+
+    try:
+        v_cursor = p_connection.cursor()
+        v_cursor.execute('ROLLBACK')
+        await wait(p_connection=p_connection)
+    except psycopg2.Error:
+        p_connection.close()
+
+        return
+    except BaseException:
+        p_connection.close()
+        raise
+
+    v_process_connection_dict[v_connection_string] = p_connection
+
+
+def release_process_connections():
+    """Close asynchronous connections kept by this process.
+    """
+
+    for v_connection in v_process_connection_dict.values():
+        v_connection.close()
+
+    v_process_connection_dict.clear()
+
+
+async def fetch_blocks(p_database=None, p_sql=None, p_block_size=None):
+    """Asynchronous generator of blocks of records returned by a query, fetched through an asynchronous connection kept by this process.
+    Records are read by a cursor inside a transaction, just like "Spartacus.Database.PostgreSQL.QueryBlock" does.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database. Just its connection parameters are used. Defaults to None.
+            p_sql (str): the sql query to be executed. Defaults to None.
+            p_block_size (int): Number of data records in each block. Defaults to None.
+
+        Yields:
+            Spartacus.Database.DataTable: next block of records. At least one block is yielded, even if empty.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+            Spartacus.Database.Exception: if any database operation failed.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_sql, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_sql" parameter must be a "str" instance.', p_sql)
+
+    if not isinstance(p_block_size, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_block_size" parameter must be an "int" instance.', p_block_size)
+
+    if p_block_size < 1:
+        raise custom_exceptions.InvalidParameterValueException('"p_block_size" parameter must be a positive "int" instance.', p_block_size)
+
+    v_connection = None
+
+    try:
+        try:
+            v_connection = await connect(p_database=p_database)
+            v_cursor = v_connection.cursor()
+
+            #Asynchronous connections are always in autocommit mode, so the transaction is handled explicitly
+            v_cursor.execute(
+                '''
+                    BEGIN;
+                    DECLARE data_comparer_cursor NO SCROLL CURSOR FOR {p_sql}
+                '''.format(
+                    p_sql=p_sql
+                )
+            )
+
+            await wait(p_connection=v_connection)
+        except psycopg2.Error as exc:
+            raise Spartacus.Database.Exception(str(exc))
+
+        v_has_more_data = True
+
+        while v_has_more_data:
+            try:
+                v_cursor.execute('FETCH FORWARD {p_block_size} FROM data_comparer_cursor'.format(p_block_size=p_block_size))
+                await wait(p_connection=v_connection)
+
+                v_table = Spartacus.Database.DataTable()
+                v_table.Columns = [v_column[0] for v_column in v_cursor.description]
+                v_table.Rows = v_cursor.fetchall()
+            except psycopg2.Error as exc:
+                raise Spartacus.Database.Exception(str(exc))
+
+            v_has_more_data = len(v_table.Rows) == p_block_size
+
+            yield v_table
+    finally:
+        if v_connection is not None:
+            await release(p_database=p_database, p_connection=v_connection)
+
+
+async def get_next_block(p_blocks=None):
+    """Get next block of an asynchronous generator of blocks.
+
+        Args:
+            p_blocks (async_generator): generator of blocks, as returned by "fetch_blocks". Defaults to None.
+
+        Returns:
+            Spartacus.Database.DataTable: next block of records. None if there are no more blocks.
+    """
+
+    try:
+        return await p_blocks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class ConcurrentBlocks(object):
+    """Fetches blocks of records returned by a query in many databases at the same time, through a single event loop.
+    Each database has always its next block being fetched, so round trips to all databases overlap with each other
+    and with the use of current blocks. At most two blocks per database are kept in memory.
+    Blocks are read by synchronous iterators, returned by "get_blocks", so they can feed the usual merge loop.
+
+        Args:
+            p_database_list (list): list of Spartacus.Database.PostgreSQL instances. Just their connection parameters are used. Defaults to None.
+            p_sql (str): the sql query to be executed in every database. Defaults to None.
+            p_block_size (int): Number of data records in each block. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    def __init__(self, p_database_list=None, p_sql=None, p_block_size=None):
+        if not isinstance(p_database_list, list):
+            raise custom_exceptions.InvalidParameterTypeException('"p_database_list" parameter must be a "list" instance.', p_database_list)
+
+        self.v_loop = asyncio.new_event_loop()
+        self.v_open_count = len(p_database_list)
+
+        self.v_blocks_list = [
+            fetch_blocks(p_database=v_database, p_sql=p_sql, p_block_size=p_block_size)
+            for v_database in p_database_list
+        ]
+
+        self.v_task_list = [None] * len(p_database_list)
+
+        #First blocks of every database are requested at once
+        for v_index in range(len(p_database_list)):
+            self.request(p_index=v_index)
+
+    def request(self, p_index=None):
+        """Start fetching next block of a database, and let it send its request before returning.
+
+            Args:
+                p_index (int): the database index. Defaults to None.
+        """
+
+        self.v_task_list[p_index] = self.v_loop.create_task(get_next_block(p_blocks=self.v_blocks_list[p_index]))
+        self.v_loop.run_until_complete(asyncio.sleep(0))
+
+    def finish(self, p_index=None):
+        """Stop fetching blocks of a database and give back its connection. The event loop is closed after the last database.
+
+            Args:
+                p_index (int): the database index. Defaults to None.
+        """
+
+        v_task = self.v_task_list[p_index]
+
+        #Block being fetched is awaited instead of cancelled, so the connection is left idle and kept for next queries
+        if v_task is not None:
+            self.v_loop.run_until_complete(asyncio.gather(v_task, return_exceptions=True))
+
+        self.v_loop.run_until_complete(self.v_blocks_list[p_index].aclose())
+        self.v_task_list[p_index] = None
+        self.v_open_count -= 1
+
+        if self.v_open_count == 0:
+            self.v_loop.close()
+
+    def get_block(self, p_index=None):
+        """Get next block of a database, and start fetching the following one.
+
+            Args:
+                p_index (int): the database index. Defaults to None.
+
+            Returns:
+                Spartacus.Database.DataTable: next block of records. None if there are no more blocks.
+        """
+
+        v_block = self.v_loop.run_until_complete(self.v_task_list[p_index])
+
+        if v_block is not None:
+            #Fetch next block while this one is being used
+            self.request(p_index=p_index)
+
+        return v_block
+
+    def get_blocks(self, p_index=None):
+        """Get iterator of blocks of a database.
+
+            Args:
+                p_index (int): the database index, as in "p_database_list". Defaults to None.
+
+            Returns:
+                BlockIterator: the iterator.
+        """
+
+        return BlockIterator(p_concurrent_blocks=self, p_index=p_index)
+
+
+class BlockIterator(object):
+    """Iterator of blocks of a database fetched by a ConcurrentBlocks instance. Exceptions raised while fetching are raised again by "next".
+    Unlike generators, closing it stops fetching and gives back the connection even if it was never iterated.
+
+        Args:
+            p_concurrent_blocks (ConcurrentBlocks): the instance that fetches the blocks. Defaults to None.
+            p_index (int): the database index. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    def __init__(self, p_concurrent_blocks=None, p_index=None):
+        if not isinstance(p_concurrent_blocks, ConcurrentBlocks):
+            raise custom_exceptions.InvalidParameterTypeException('"p_concurrent_blocks" parameter must be a "ConcurrentBlocks" instance.', p_concurrent_blocks)
+
+        if not isinstance(p_index, int):
+            raise custom_exceptions.InvalidParameterTypeException('"p_index" parameter must be an "int" instance.', p_index)
+
+        self.v_concurrent_blocks = p_concurrent_blocks
+        self.v_index = p_index
+        self.v_finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.v_finished:
+            raise StopIteration
+
+        try:
+            v_block = self.v_concurrent_blocks.get_block(p_index=self.v_index)
+        except BaseException:
+            self.close()
+            raise
+
+        if v_block is None:
+            self.close()
+            raise StopIteration
+
+        return v_block
+
+    def close(self):
+        """Stop fetching blocks and give back the connection, if not done yet.
+        """
+
+        if not self.v_finished:
+            self.v_finished = True
+            self.v_concurrent_blocks.finish(p_index=self.v_index)
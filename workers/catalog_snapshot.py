@@ -0,0 +1,320 @@
+import gzip
+import json
+import types
+import psycopg2.extras
+import Spartacus.Database
+
+from .import custom_exceptions
+
+
+#Version of catalog snapshot files format. Files of other versions are refused
+CATALOG_SNAPSHOT_FILE_VERSION = 2
+
+#Catalog tables read by comparers. Each one is copied just once per database, and comparers read the copy
+CATALOG_TABLE_LIST = [
+    'pg_attrdef',
+    'pg_attribute',
+    'pg_class',
+    'pg_collation',
+    'pg_constraint',
+    'pg_database',
+    'pg_depend',
+    'pg_enum',
+    'pg_foreign_server',
+    'pg_foreign_table',
+    'pg_index',
+    'pg_inherits',
+    'pg_namespace',
+    'pg_proc',
+    'pg_trigger',
+    'pg_type'
+]
+
+
+def get_json_value(p_value=None):
+    """Get a JSON representation of a query result value without a JSON type. Used while saving catalog snapshot files.
+
+        Args:
+            p_value (object): the value. Defaults to None.
+
+        Returns:
+            str: the value as text, like PostgreSQL outputs it for binary strings.
+    """
+
+    if isinstance(p_value, (bytes, memoryview)):
+        return '\\x{0}'.format(bytes(p_value).hex())
+
+    return str(p_value)
+
+
+class CatalogSnapshot(Spartacus.Database.PostgreSQL):
+    """PostgreSQL connection shared by catalog comparers. All queries run in a single repeatable read transaction, so every
+    comparer sees the same snapshot of the catalog, and each query runs just once, being its results kept in memory.
+    When the transaction starts, each table of "CATALOG_TABLE_LIST" is read once into a temporary table of the same name, that
+    shadows the catalog table in the search path, so comparers read those copies instead of scanning the catalog again.
+    Catalog views and functions, like "pg_roles" or "pg_get_indexdef", still read the catalog itself. Catalog names cast to "regclass"
+    must be qualified with "pg_catalog", or they would get the oid of the copy.
+    Open and Close calls done by comparers are ignored: the connection is opened when first needed and closed by "Release".
+    A snapshot may also be saved to a file and loaded later, so catalogs can be compared without connecting to the database.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database whose catalog will be read. Just its connection parameters are used. Defaults to None.
+            p_file_path (str): path of a snapshot file, as written by "Save", to load results from. If "p_database" is None, queries not found in the file raise an exception. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    def __init__(self, p_database=None, p_file_path=None):
+        if p_database is not None and not isinstance(p_database, Spartacus.Database.PostgreSQL):
+            raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be None or a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+        if p_file_path is not None and not isinstance(p_file_path, str):
+            raise custom_exceptions.InvalidParameterTypeException('"p_file_path" parameter must be None or a "str" instance.', p_file_path)
+
+        if p_database is None and p_file_path is None:
+            raise custom_exceptions.InvalidParameterValueException('"p_database" or "p_file_path" parameter must be given.', p_database)
+
+        if p_database is not None:
+            super(CatalogSnapshot, self).__init__(
+                p_host=p_database.v_host,
+                p_port=p_database.v_port,
+                p_service=p_database.v_service,
+                p_user=p_database.v_user,
+                p_password=p_database.v_password,
+                p_application_name=p_database.v_application_name
+            )
+        else:
+            super(CatalogSnapshot, self).__init__()
+
+        self.v_offline = p_database is None
+        self.v_result_dict = {}
+        self.v_error_dict = {}
+        self.v_position_dict = {}
+
+        if p_file_path is not None:
+            self.Load(p_file_path=p_file_path)
+
+    def Load(self, p_file_path=None):
+        """Load query results from a snapshot file. Files hold just JSON data, which is checked before any result is used.
+
+            Args:
+                p_file_path (str): path of the snapshot file. Defaults to None.
+
+            Raises:
+                custom_exceptions.InvalidParameterTypeException.
+                custom_exceptions.InvalidParameterValueException: if it is not a valid snapshot file of a supported version.
+        """
+
+        if not isinstance(p_file_path, str):
+            raise custom_exceptions.InvalidParameterTypeException('"p_file_path" parameter must be a "str" instance.', p_file_path)
+
+        try:
+            with gzip.open(p_file_path, 'rt', encoding='utf-8') as v_file:
+                v_snapshot = json.load(v_file)
+        except (OSError, EOFError, ValueError) as exc:
+            raise custom_exceptions.InvalidParameterValueException('"p_file_path" parameter must be a catalog snapshot file: {0}'.format(exc), p_file_path)
+
+        if not isinstance(v_snapshot, dict) or v_snapshot.get('version') != CATALOG_SNAPSHOT_FILE_VERSION:
+            raise custom_exceptions.InvalidParameterValueException('"p_file_path" parameter must be a catalog snapshot file of version {0}.'.format(CATALOG_SNAPSHOT_FILE_VERSION), p_file_path)
+
+        if not isinstance(v_snapshot.get('result_dict'), dict) or not isinstance(v_snapshot.get('error_dict'), dict):
+            raise custom_exceptions.InvalidParameterValueException('"p_file_path" parameter must be a catalog snapshot file with results and errors.', p_file_path)
+
+        v_result_dict = {}
+
+        for v_sql, v_result in v_snapshot['result_dict'].items():
+            if not isinstance(v_result, dict) or not isinstance(v_result.get('columns'), list) or not isinstance(v_result.get('rows'), list):
+                raise custom_exceptions.InvalidParameterValueException('"p_file_path" parameter must be a catalog snapshot file whose results have columns and rows.', p_file_path)
+
+            if not all([isinstance(v_column, str) for v_column in v_result['columns']]):
+                raise custom_exceptions.InvalidParameterValueException('"p_file_path" parameter must be a catalog snapshot file whose result columns are names.', p_file_path)
+
+            if not all([isinstance(v_row, list) and len(v_row) == len(v_result['columns']) for v_row in v_result['rows']]):
+                raise custom_exceptions.InvalidParameterValueException('"p_file_path" parameter must be a catalog snapshot file whose result rows have a value for each column.', p_file_path)
+
+            #Records are rebuilt just like the ones queried, readable by column name or position
+            v_cursor = types.SimpleNamespace(index={v_column: v_index for v_index, v_column in enumerate(v_result['columns'])}, description=v_result['columns'])
+            v_table = Spartacus.Database.DataTable()
+            v_table.Columns = list(v_result['columns'])
+
+            for v_values in v_result['rows']:
+                v_row = psycopg2.extras.DictRow(v_cursor)
+                v_row[:] = v_values
+                v_table.Rows.append(v_row)
+
+            v_result_dict[v_sql] = v_table
+
+        if not all([isinstance(v_error, str) for v_error in v_snapshot['error_dict'].values()]):
+            raise custom_exceptions.InvalidParameterValueException('"p_file_path" parameter must be a catalog snapshot file whose errors are messages.', p_file_path)
+
+        self.v_result_dict.update(v_result_dict)
+        self.v_error_dict.update(v_snapshot['error_dict'])
+
+    def Save(self, p_file_path=None):
+        """Save all query results and errors got so far to a snapshot file, as JSON compressed with gzip.
+        Values without a JSON type, like dates or numerics, are saved as their text, so they are read back as strings.
+
+            Args:
+                p_file_path (str): path of the snapshot file. Defaults to None.
+
+            Raises:
+                custom_exceptions.InvalidParameterTypeException.
+        """
+
+        if not isinstance(p_file_path, str):
+            raise custom_exceptions.InvalidParameterTypeException('"p_file_path" parameter must be a "str" instance.', p_file_path)
+
+        with gzip.open(p_file_path, 'wt', encoding='utf-8') as v_file:
+            json.dump(
+                {
+                    'version': CATALOG_SNAPSHOT_FILE_VERSION,
+                    'result_dict': {
+                        v_sql: {
+                            'columns': list(v_table.Columns),
+                            'rows': [list(v_row) for v_row in v_table.Rows]
+                        }
+                        for v_sql, v_table in self.v_result_dict.items()
+                    },
+                    'error_dict': self.v_error_dict
+                },
+                v_file,
+                default=get_json_value
+            )
+
+    def Open(self, p_autocommit=True, p_datetime_as_string=False, p_json_as_string=False, p_async=False):
+        """Open the connection, start the snapshot transaction and copy catalog tables, if not done yet.
+        """
+
+        if self.v_con is None and not self.v_offline:
+            super(CatalogSnapshot, self).Open(p_autocommit=False)
+            self.v_con.set_session(isolation_level='REPEATABLE READ')
+
+            try:
+                self.LoadCatalog()
+            except Spartacus.Database.Exception:
+                #Temporary tables cannot be created in hot standby servers, so comparers read the catalog itself there
+                self.v_con.rollback()
+                self.v_con.set_session(isolation_level='REPEATABLE READ', readonly=True)
+
+    def LoadCatalog(self):
+        """Copy each table of "CATALOG_TABLE_LIST" that the user may read to a temporary table, and put temporary tables first in
+        the search path of the snapshot transaction. Copies get an index by "oid", if the catalog table has that column.
+
+            Raises:
+                Spartacus.Database.Exception: if copies could not be created.
+        """
+
+        #Before PostgreSQL 12, "oid" was a system column, with a negative number. Columns of pseudo types cannot be stored, so they are kept as text
+        v_table = super(CatalogSnapshot, self).Query(
+            p_sql='''
+                SELECT c.relname AS table_name,
+                       STRING_AGG(
+                           CASE WHEN t.typtype = 'p'
+                                THEN FORMAT('%I::text AS %I', a.attname, a.attname)
+                                ELSE QUOTE_IDENT(a.attname)
+                           END,
+                           ', '
+                           ORDER BY a.attnum
+                       ) AS column_list,
+                       BOOL_OR(a.attname = 'oid') AS has_oid
+                FROM pg_catalog.pg_class c
+                INNER JOIN pg_catalog.pg_namespace n
+                        ON c.relnamespace = n.oid
+                INNER JOIN pg_catalog.pg_attribute a
+                        ON c.oid = a.attrelid
+                       AND (a.attnum > 0 OR a.attname = 'oid')
+                       AND NOT a.attisdropped
+                INNER JOIN pg_catalog.pg_type t
+                        ON a.atttypid = t.oid
+                WHERE n.nspname = 'pg_catalog'
+                  AND c.relname IN ({p_tables})
+                  AND has_table_privilege(c.oid, 'select')
+                GROUP BY c.relname
+            '''.format(
+                p_tables=', '.join([
+                    "'{p_table}'".format(
+                        p_table=v_table
+                    )
+                    for v_table in CATALOG_TABLE_LIST
+                ])
+            )
+        )
+
+        self.Execute(p_sql="SELECT set_config('search_path', 'pg_temp, pg_catalog, ' || current_setting('search_path'), true)")
+
+        for v_row in v_table.Rows:
+            self.Execute(
+                p_sql='''
+                    CREATE TEMPORARY TABLE {p_table} ON COMMIT DROP AS
+                    SELECT {p_columns}
+                    FROM pg_catalog.{p_table}
+                '''.format(
+                    p_table=v_row['table_name'],
+                    p_columns=v_row['column_list']
+                )
+            )
+
+            if v_row['has_oid']:
+                self.Execute(p_sql='CREATE INDEX ON pg_temp.{p_table} (oid)'.format(p_table=v_row['table_name']))
+
+            self.Execute(p_sql='ANALYZE pg_temp.{p_table}'.format(p_table=v_row['table_name']))
+
+    def Close(self, p_commit=True):
+        """Keep the snapshot open for other comparers.
+        """
+
+        pass
+
+    def Release(self):
+        """Finish the snapshot transaction and close the connection.
+        """
+
+        super(CatalogSnapshot, self).Close(p_commit=False)
+
+    def Query(self, p_sql, p_alltypesstr=False, p_simple=False, p_datetime_as_string=False, p_json_as_string=True):
+        """Get results of a query, running it just the first time. A failed query does not abort the snapshot transaction,
+        and its error is kept too, so it is raised again by snapshots loaded from file.
+        """
+
+        if p_sql in self.v_error_dict:
+            raise Spartacus.Database.Exception(self.v_error_dict[p_sql])
+
+        if p_sql not in self.v_result_dict:
+            if self.v_offline:
+                raise Spartacus.Database.Exception('Query not found in catalog snapshot file. It may have been saved by another version of the comparer.')
+
+            self.Open()
+            self.v_cur.execute('SAVEPOINT catalog_snapshot')
+
+            try:
+                self.v_result_dict[p_sql] = super(CatalogSnapshot, self).Query(p_sql=p_sql)
+            except Spartacus.Database.Exception as exc:
+                self.v_cur.execute('ROLLBACK TO SAVEPOINT catalog_snapshot')
+                self.v_error_dict[p_sql] = str(exc)
+                raise
+
+            self.v_cur.execute('RELEASE SAVEPOINT catalog_snapshot')
+
+        return self.v_result_dict[p_sql]
+
+    def QueryBlock(self, p_sql, p_blocksize, p_alltypesstr=False, p_simple=False):
+        """Get next block of results of a query from memory. Sets "v_start" attribute when there are no more blocks, just like its parent.
+        """
+
+        v_table = self.Query(p_sql=p_sql)
+        v_position = self.v_position_dict.get(p_sql, 0)
+
+        v_block = Spartacus.Database.DataTable()
+        v_block.Columns = v_table.Columns
+        v_block.Rows = v_table.Rows[v_position:v_position + p_blocksize]
+
+        if len(v_block.Rows) < p_blocksize:
+            self.v_position_dict.pop(p_sql, None)
+            self.v_start = True
+        else:
+            self.v_position_dict[p_sql] = v_position + p_blocksize
+            self.v_start = False
+
+        return v_block
@@ -0,0 +1,188 @@
+import traceback
+import multiprocessing
+import concurrent.futures
+import Spartacus.Database
+
+from .import custom_exceptions
+from .import utils
+from .import catalog_snapshot
+
+
+def compare_catalog(p_database_1=None, p_database_2=None, p_block_size=None, p_queue=None, p_worker_index=None, p_task_list=None, p_snapshot_file_1=None, p_save_snapshot_file_1=None, p_fetch_mode='thread'):
+    """Used to run many catalog comparers in this process, all of them sharing the same catalog snapshot of each database.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database. May be None if "p_snapshot_file_1" is given. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
+            p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
+            p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
+            p_worker_index (int): the worker sub process index. Defaults to None.
+            p_task_list (list): list of catalog comparer tasks, as returned by their "get_compare_*_tasks" functions. Defaults to None.
+            p_snapshot_file_1 (str): path of a catalog snapshot file to read the first database catalog from, instead of querying it. Defaults to None.
+            p_save_snapshot_file_1 (str): path of a file to save the first database catalog snapshot to, after comparing. Defaults to None.
+            p_fetch_mode (str): how blocks of records are fetched. Check "utils.fetch_block_pair" for allowed values. Defaults to 'thread'.
+                Notes: snapshots keep query results in memory, so comparers always read their blocks serially.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+            Exception: if any comparer failed. Other comparers are run anyway.
+    """
+
+    if p_snapshot_file_1 is not None and not isinstance(p_snapshot_file_1, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_snapshot_file_1" parameter must be None or a "str" instance.', p_snapshot_file_1)
+
+    if p_save_snapshot_file_1 is not None and not isinstance(p_save_snapshot_file_1, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_save_snapshot_file_1" parameter must be None or a "str" instance.', p_save_snapshot_file_1)
+
+    if p_snapshot_file_1 is None and not isinstance(p_database_1, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database_1" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database_1)
+
+    if not isinstance(p_database_2, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database_2" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database_2)
+
+    if not isinstance(p_block_size, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_block_size" parameter must be an "int" instance.', p_block_size)
+
+    if p_block_size < 1:
+        raise custom_exceptions.InvalidParameterValueException('"p_block_size" parameter must be a positive "int" instance.', p_block_size)
+
+    if not isinstance(p_queue, multiprocessing.managers.BaseProxy):
+        raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "multiprocessing.managers.BaseProxy" instance.', p_queue)
+
+    if not isinstance(p_worker_index, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_worker_index" parameter must be an "int" instance.', p_worker_index)
+
+    if p_worker_index < 0:
+        raise custom_exceptions.InvalidParameterTypeException('"p_worker_index" parameter must be an "int" instance greater than or equal to 0.', p_worker_index)
+
+    if not isinstance(p_task_list, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_task_list" parameter must be a "list" instance.', p_task_list)
+
+    if p_fetch_mode not in utils.FETCH_MODE_LIST:
+        raise custom_exceptions.InvalidParameterValueException('"p_fetch_mode" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(utils.FETCH_MODE_LIST)), p_fetch_mode)
+
+    v_snapshot_1 = catalog_snapshot.CatalogSnapshot(p_database=p_database_1 if p_snapshot_file_1 is None else None, p_file_path=p_snapshot_file_1)
+    v_snapshot_2 = catalog_snapshot.CatalogSnapshot(p_database=p_database_2)
+    v_error_list = []
+
+    try:
+        #Each snapshot copies its catalog tables when opened, so both databases copy them at the same time
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as v_executor:
+            v_future = v_executor.submit(v_snapshot_1.Open)
+            v_snapshot_2.Open()
+            v_future.result()
+
+        for v_task in p_task_list:
+            try:
+                v_task['function'](
+                    p_database_1=v_snapshot_1,
+                    p_database_2=v_snapshot_2,
+                    p_block_size=p_block_size,
+                    p_queue=p_queue,
+                    p_worker_index=p_worker_index,
+                    p_fetch_mode='serial',
+                    **v_task['kwds']
+                )
+            except Exception:
+                v_error_list.append(traceback.format_exc())
+
+        if p_save_snapshot_file_1 is not None:
+            v_snapshot_1.Save(p_file_path=p_save_snapshot_file_1)
+    finally:
+        v_snapshot_1.Release()
+        v_snapshot_2.Release()
+
+    if len(v_error_list) > 0:
+        raise Exception('\n'.join(v_error_list))
+
+
+def get_catalog_page_count(p_database=None):
+    """Get number of pages of the catalog tables read into a catalog snapshot. Check "catalog_snapshot.CATALOG_TABLE_LIST".
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database. Defaults to None.
+
+        Returns:
+            int: the number of pages, by the current size of the tables.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    p_database.Open(p_autocommit=True)
+
+    try:
+        return int(
+            p_database.Query(
+                p_sql='''
+                    SELECT COALESCE(SUM(CEIL(PG_RELATION_SIZE(c.oid) / CURRENT_SETTING('block_size')::NUMERIC)), 0)::BIGINT AS page_count
+                    FROM pg_class c
+                    WHERE c.relnamespace = 'pg_catalog'::REGNAMESPACE
+                      AND c.relname IN (
+                          {p_tables}
+                      )
+                '''.format(
+                    p_tables=',\n'.join(["'{0}'".format(v_table) for v_table in catalog_snapshot.CATALOG_TABLE_LIST])
+                )
+            ).Rows[0]['page_count']
+        )
+    finally:
+        p_database.Close(p_commit=False)
+
+
+def get_compare_catalog_tasks(p_task_list=None, p_snapshot_file_1=None, p_save_snapshot_file_1=None, p_database_1=None, p_database_2=None):
+    """Get list of tasks that will run given catalog comparers in a single process, sharing the same catalog snapshot.
+    The task is estimated to cost the pages of the catalog tables of both databases once for each comparer, as each one reads their copies,
+    so it is scheduled among tables data tasks of about the same size instead of after all of them.
+
+        Args:
+            p_task_list (list): list of catalog comparer tasks, as returned by their "get_compare_*_tasks" functions. Defaults to None.
+            p_snapshot_file_1 (str): path of a catalog snapshot file to read the first database catalog from. Defaults to None.
+            p_save_snapshot_file_1 (str): path of a file to save the first database catalog snapshot to. Defaults to None.
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database, used to estimate the task cost. None if its catalog is read from "p_snapshot_file_1". Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database, used to estimate the task cost. Defaults to None.
+
+        Returns:
+            list: list of tasks to be executed in a process pool. Each item is a dict instance with following strucutre:
+                {
+                    'function' (function): the function to be executed.
+                    'kwds': keyworded args to be passed to the function.
+                    'cost' (int): estimated cost of the task, in table pages, used to schedule larger tasks first.
+                }
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_task_list, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_task_list" parameter must be a "list" instance.', p_task_list)
+
+    if p_snapshot_file_1 is not None and not isinstance(p_snapshot_file_1, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_snapshot_file_1" parameter must be None or a "str" instance.', p_snapshot_file_1)
+
+    if p_save_snapshot_file_1 is not None and not isinstance(p_save_snapshot_file_1, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_save_snapshot_file_1" parameter must be None or a "str" instance.', p_save_snapshot_file_1)
+
+    if p_database_1 is not None and not isinstance(p_database_1, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database_1" parameter must be None or a "Spartacus.Database.PostgreSQL" instance.', p_database_1)
+
+    if not isinstance(p_database_2, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database_2" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database_2)
+
+    #A catalog loaded from a file is not read from the database, but its copies are still read by every comparer, so it costs as much as the other one
+    v_page_count = get_catalog_page_count(p_database=p_database_2)
+    v_page_count += get_catalog_page_count(p_database=p_database_1) if p_database_1 is not None else v_page_count
+
+    return [{
+        'function': compare_catalog,
+        'kwds': {
+            'p_task_list': p_task_list,
+            'p_snapshot_file_1': p_snapshot_file_1,
+            'p_save_snapshot_file_1': p_save_snapshot_file_1
+        },
+        'cost': max(v_page_count * (len(p_task_list) + 1), 1)
+    }]
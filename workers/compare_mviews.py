@@ -11,7 +11,7 @@ def inserted_callback(p_queue=None, p_columns=None, p_row=None, p_key=None):
     """Callback executed when a mview was created in second database. Sends a row by queue to master process.
 
         Args:
-            p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
             p_columns (list): list of columns that are present in p_row parameter.
             p_row (list): the row that was inserted in the database 2.
             p_key (list): the key used for comparison.
@@ -20,8 +20,8 @@ def inserted_callback(p_queue=None, p_columns=None, p_row=None, p_key=None):
             custom_exceptions.InvalidParameterTypeException.
     """
 
-    if not isinstance(p_queue, multiprocessing.managers.BaseProxy):
-        raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "multiprocessing.managers.BaseProxy" instance.', p_queue)
+    if not isinstance(p_queue, utils.QueueBuffer):
+        raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be an "utils.QueueBuffer" instance.', p_queue)
 
     if not isinstance(p_columns, list):
         raise custom_exceptions.InvalidParameterTypeException('"p_columns" parameter must be a "list" instance.', p_columns)
@@ -47,7 +47,7 @@ def updated_callback(p_queue=None, p_columns=None, p_row_1=None, p_row_2=None, p
     """Callback executed when a mview was updated in second database. Sends a row by queue to master process.
 
         Args:
-            p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
             p_columns (list): list of columns that are present in p_row_1 and p_row_2 parameters.
             p_row_1 (list): the row as it is in database 1.
             p_row_2 (list): the row as it is in database 2.
@@ -63,8 +63,8 @@ def updated_callback(p_queue=None, p_columns=None, p_row_1=None, p_row_2=None, p
             custom_exceptions.InvalidParameterTypeException.
     """
 
-    if not isinstance(p_queue, multiprocessing.managers.BaseProxy):
-        raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "multiprocessing.managers.BaseProxy" instance.', p_queue)
+    if not isinstance(p_queue, utils.QueueBuffer):
+        raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be an "utils.QueueBuffer" instance.', p_queue)
 
     if not isinstance(p_columns, list):
         raise custom_exceptions.InvalidParameterTypeException('"p_columns" parameter must be a "list" instance.', p_columns)
@@ -106,7 +106,7 @@ def deleted_callback(p_queue=None, p_columns=None, p_row=None, p_key=None):
     """Callback executed when a mview was dropped from second database. Sends a row by queue to master process.
 
         Args:
-            p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
             p_columns (list): list of columns that are present in p_row parameter.
             p_row (list): the row that was inserted in the database 2.
             p_key (list): the key used for comparison.
@@ -115,8 +115,8 @@ def deleted_callback(p_queue=None, p_columns=None, p_row=None, p_key=None):
             custom_exceptions.InvalidParameterTypeException.
     """
 
-    if not isinstance(p_queue, multiprocessing.managers.BaseProxy):
-        raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "multiprocessing.managers.BaseProxy" instance.', p_queue)
+    if not isinstance(p_queue, utils.QueueBuffer):
+        raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be an "utils.QueueBuffer" instance.', p_queue)
 
     if not isinstance(p_columns, list):
         raise custom_exceptions.InvalidParameterTypeException('"p_columns" parameter must be a "list" instance.', p_columns)
@@ -138,7 +138,7 @@ def deleted_callback(p_queue=None, p_columns=None, p_row=None, p_key=None):
     })
 
 
-def compare_mviews(p_database_1=None, p_database_2=None, p_block_size=None, p_queue=None, p_is_sending_data_array=None, p_worker_index=None):
+def compare_mviews(p_database_1=None, p_database_2=None, p_block_size=None, p_queue=None, p_worker_index=None, p_fetch_mode='thread'):
     """Used to compare mviews between databases.
 
         Args:
@@ -146,14 +146,16 @@ def compare_mviews(p_database_1=None, p_database_2=None, p_block_size=None, p_qu
             p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
             p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
             p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
-            p_is_sending_data_array (multiprocessing.managers.ArrayProxy): array used to control process that are still sending data. Defaults to None.
             p_worker_index (int): the worker sub process index. Defaults to None.
+            p_fetch_mode (str): how blocks of records are fetched. Check "utils.fetch_block_pair" for allowed values. Defaults to 'thread'.
 
         Raises:
             custom_exceptions.InvalidParameterTypeException.
             custom_exceptions.InvalidParameterValueException
     """
 
+    v_queue_buffer = None
+
     try:
         if not isinstance(p_database_1, Spartacus.Database.PostgreSQL):
             raise custom_exceptions.InvalidParameterTypeException('"p_database_1" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database_1)
@@ -170,15 +172,17 @@ def compare_mviews(p_database_1=None, p_database_2=None, p_block_size=None, p_qu
         if not isinstance(p_queue, multiprocessing.managers.BaseProxy):
             raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "multiprocessing.managers.BaseProxy" instance.', p_queue)
 
-        if not isinstance(p_is_sending_data_array, multiprocessing.managers.ArrayProxy):
-            raise custom_exceptions.InvalidParameterTypeException('"p_is_sending_data_array" parameter must be an "multiprocessing.managers.ArrayProxy" instance.', p_is_sending_data_array)
-
         if not isinstance(p_worker_index, int):
             raise custom_exceptions.InvalidParameterTypeException('"p_worker_index" parameter must be an "int" instance.', p_worker_index)
 
         if p_worker_index < 0:
             raise custom_exceptions.InvalidParameterTypeException('"p_worker_index" parameter must be an "int" instance greater than or equal to 0.', p_worker_index)
 
+        if p_fetch_mode not in utils.FETCH_MODE_LIST:
+            raise custom_exceptions.InvalidParameterValueException('"p_fetch_mode" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(utils.FETCH_MODE_LIST)), p_fetch_mode)
+
+        v_queue_buffer = utils.QueueBuffer(p_queue=p_queue, p_block_size=p_block_size)
+
         #Prepare table query
         v_sql = '''\
             SELECT n.nspname AS mview_schema,
@@ -218,13 +222,14 @@ def compare_mviews(p_database_1=None, p_database_2=None, p_block_size=None, p_qu
             p_block_size=p_block_size,
             p_key=['mview_schema', 'mview_name'],
             p_sql=v_sql,
-            p_inserted_callback=lambda p_columns, p_row, p_key: inserted_callback(p_queue=p_queue, p_columns=p_columns, p_row=p_row, p_key=p_key),
-            p_updated_callback=lambda p_columns, p_row_1, p_row_2, p_key, p_all_diffs: updated_callback(p_queue=p_queue, p_columns=p_columns, p_row_1=p_row_1, p_row_2=p_row_2, p_key=p_key, p_all_diffs=p_all_diffs),
-            p_deleted_callback=lambda p_columns, p_row, p_key: deleted_callback(p_queue=p_queue, p_columns=p_columns, p_row=p_row, p_key=p_key)
+            p_inserted_callback=lambda p_columns, p_row, p_key: inserted_callback(p_queue=v_queue_buffer, p_columns=p_columns, p_row=p_row, p_key=p_key),
+            p_updated_callback=lambda p_columns, p_row_1, p_row_2, p_key, p_all_diffs: updated_callback(p_queue=v_queue_buffer, p_columns=p_columns, p_row_1=p_row_1, p_row_2=p_row_2, p_key=p_key, p_all_diffs=p_all_diffs),
+            p_deleted_callback=lambda p_columns, p_row, p_key: deleted_callback(p_queue=v_queue_buffer, p_columns=p_columns, p_row=p_row, p_key=p_key),
+            p_fetch_mode=p_fetch_mode
         )
     finally:
-        p_queue.put(None)
-        p_is_sending_data_array[p_worker_index] = False
+        if v_queue_buffer is not None:
+            v_queue_buffer.flush()
 
 
 def get_compare_mviews_tasks():
@@ -1,13 +1,2425 @@
 import os
+import json
+import fnmatch
 import inspect
+import itertools
 import multiprocessing
 import Spartacus.Database
 
 from .import custom_exceptions
 from .import utils
+from .import copy_fetch
+
+
+#Ways tables data can be compared
+COMPARISON_MODE_LIST = [
+    'rows',
+    'checksum',
+    'hash'
+]
+
+#Ways data of tables without primary key can be compared
+KEYLESS_COMPARISON_MODE_LIST = [
+    'rows',
+    'multiset'
+]
+
+#Ways records are read when compared row by row
+ROW_READER_LIST = [
+    'query',
+    'copy'
+]
+
+#Ways tables data differences are reported
+DATA_FORMAT_LIST = [
+    'statements',
+    'patch'
+]
+
+#Records of tables without primary key are grouped in hash buckets of about block size divided by this, so that buckets
+#that differ hold few equal records, and just a bucket of each database is kept in memory while compared
+MULTISET_BUCKETS_PER_BLOCK = 16
+
+#Minimum number of hash buckets of tables without primary key, so a wrong estimate of their records does not put them all in a single bucket
+MULTISET_MIN_BUCKET_COUNT = 1024
+
+#Data types whose values are ordered according to a collation
+COLLATABLE_TYPE_LIST = [
+    'text',
+    'character varying',
+    'character'
+]
+
+#Data types whose values are ordered by the database just like python orders them, as fetched
+ORDERED_TYPE_LIST = [
+    'smallint',
+    'integer',
+    'bigint',
+    'numeric',
+    'real',
+    'double precision',
+    'boolean',
+    'date',
+    'time without time zone',
+    'time with time zone',
+    'timestamp without time zone',
+    'timestamp with time zone',
+    'uuid',
+    'bytea',
+    'oid'
+]
+
+#Data types whose values are ordered by the database by their text, normalized as "jsonb"
+JSON_TYPE_LIST = [
+    'json',
+    'jsonb'
+]
+
+
+def get_sql_value(p_value=None, p_type=None):
+    """Get SQL representation of a record value, casted to its column data type.
 
+        Args:
+            p_value (object): the value. Defaults to None.
+            p_type (str): the column data type. Defaults to None.
+
+        Returns:
+            str: the SQL representation of the value.
+    """
+
+    return '{p_value}::{p_type}'.format(
+        p_value='$data_comparer${p_value}$data_comparer$'.format(p_value=get_sql_text(p_value=p_value)) if p_value is not None else 'NULL',
+        p_type=p_type
+    )
+
+
+def get_sql_text(p_value=None):
+    """Get text representation of a record value, as read by the input function of its column data type.
+
+        Args:
+            p_value (object): the value, not None. Defaults to None.
+
+        Returns:
+            str: the text representation of the value.
+    """
+
+    #Arrays are fetched as lists, whose python representation is not an array literal
+    if isinstance(p_value, list):
+        return get_array_literal(p_value=p_value)
+
+    return str(p_value)
+
+
+def get_array_literal(p_value=None):
+    """Get PostgreSQL array literal of a list of values, as fetched from an array column. Every element is quoted, so it is cast to the array element type.
+
+        Args:
+            p_value (list): the list of values, maybe nested. Defaults to None.
+
+        Returns:
+            str: the array literal.
+    """
+
+    return '{{{p_elements}}}'.format(
+        p_elements=','.join([
+            'NULL' if v_element is None
+            else get_array_literal(p_value=v_element) if isinstance(v_element, list)
+            else '"{p_element}"'.format(p_element=str(v_element).replace('\\', '\\\\').replace('"', '\\"'))
+            for v_element in p_value
+        ])
+    )
+
+
+def get_copy_value(p_value=None, p_type=None):
+    """Get representation of a record value in COPY text format. Unlike SQL literals, a single bad value makes a whole COPY fail,
+    so binary, json and array values are written in their PostgreSQL input formats.
+
+        Args:
+            p_value (object): the value. Defaults to None.
+            p_type (str): the column data type. Defaults to None.
+
+        Returns:
+            str: the escaped value.
+    """
+
+    if p_value is None:
+        return '\\N'
+
+    if isinstance(p_value, (memoryview, bytes)):
+        v_text = '\\x' + bytes(p_value).hex()
+    elif p_type is not None and p_type.strip() in ['json', 'jsonb'] and not isinstance(p_value, str):
+        v_text = json.dumps(p_value)
+    elif isinstance(p_value, list):
+        v_text = get_array_literal(p_value=p_value)
+    else:
+        v_text = str(p_value)
+
+    return v_text.translate(copy_fetch.COPY_ESCAPE_TABLE)
+
+
+def get_sql_key_condition(p_column_type_dict=None, p_columns=None, p_row=None, p_key=None):
+    """Get SQL condition that matches a record by its key.
+
+        Args:
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_columns (list): list of columns that are present in p_row parameter. Defaults to None.
+            p_row (list): the record. Defaults to None.
+            p_key (list): the key used for comparison. Defaults to None.
+
+        Returns:
+            str: the SQL condition.
+    """
+
+    return ' AND '.join([
+        '{p_column} = {p_value}'.format(
+            p_column=v_column,
+            p_value=get_sql_value(p_value=p_row[p_columns.index(v_column)], p_type=p_column_type_dict[v_column])
+        )
+        for v_column in p_key
+    ])
+
+
+class DmlTemplates(object):
+    """SQL statements reporting changed records of a table, compiled once per comparison task: table name, column lists, casts and key condition
+    are formatted when first used, so statements of each record are built just by joining its values to precompiled pieces.
+    Pieces are compiled again whenever records come with different columns or key. Values are represented as by "get_sql_value".
+
+        Args:
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    def __init__(self, p_schema=None, p_table=None, p_column_type_dict=None):
+        if not isinstance(p_schema, str):
+            raise custom_exceptions.InvalidParameterTypeException('"p_schema" parameter must be a "str" instance.', p_schema)
+
+        if not isinstance(p_table, str):
+            raise custom_exceptions.InvalidParameterTypeException('"p_table" parameter must be a "str" instance.', p_table)
+
+        if not isinstance(p_column_type_dict, dict):
+            raise custom_exceptions.InvalidParameterTypeException('"p_column_type_dict" parameter must be a "dict" instance.', p_column_type_dict)
+
+        self.v_schema = p_schema
+        self.v_table = p_table
+        self.v_column_type_dict = p_column_type_dict
+        self.v_columns = None
+        self.v_key = None
+
+    def compile(self, p_columns=None, p_key=None):
+        """Compile statement pieces for records with given columns and key, unless they are already compiled.
+
+            Args:
+                p_columns (list): list of columns that are present in records. Defaults to None.
+                p_key (list): the key used for comparison. Defaults to None.
+        """
+
+        #Blocks of a table usually share their columns list, so identity is checked first
+        if (p_columns is self.v_columns or p_columns == self.v_columns) and (p_key is self.v_key or p_key == self.v_key):
+            self.v_columns = p_columns
+            self.v_key = p_key
+
+            return
+
+        v_table_name = '{p_schema}.{p_table}'.format(p_schema=self.v_schema, p_table=self.v_table)
+
+        #Pieces of values are compiled when first needed, as records may have columns that are never reported, like hashes
+        self.v_value_list = None
+        self.v_assignment_dict = {}
+
+        self.v_key_list = [
+            (p_columns.index(v_column), ) + self.get_assignment(p_column=v_column)
+            for v_column in p_key
+        ]
+
+        self.v_insert_prefix = 'INSERT INTO {p_table} (\n    {p_columns}\n) VALUES (\n    '.format(p_table=v_table_name, p_columns=','.join(p_columns))
+        self.v_update_prefix = 'UPDATE {p_table}\nSET '.format(p_table=v_table_name)
+        self.v_delete_prefix = 'DELETE\nFROM {p_table}\nWHERE '.format(p_table=v_table_name)
+        self.v_columns = p_columns
+        self.v_key = p_key
+
+    def get_assignment(self, p_column=None):
+        """Get compiled pieces of "column = value" expressions of a column.
+
+            Args:
+                p_column (str): the column name. Defaults to None.
+
+            Returns:
+                tuple: prefix and suffix that surround non NULL values, and the whole expression for NULL values.
+        """
+
+        if p_column not in self.v_assignment_dict:
+            self.v_assignment_dict[p_column] = (
+                '{p_column} = $data_comparer$'.format(p_column=p_column),
+                '$data_comparer$::{p_type}'.format(p_type=self.v_column_type_dict[p_column]),
+                '{p_column} = NULL::{p_type}'.format(p_column=p_column, p_type=self.v_column_type_dict[p_column])
+            )
+
+        return self.v_assignment_dict[p_column]
+
+    def get_key_condition(self, p_row=None):
+        """Get SQL condition that matches a record by its key. Pieces must be already compiled.
+
+            Args:
+                p_row (list): the record. Defaults to None.
+
+            Returns:
+                str: the SQL condition.
+        """
+
+        return ' AND '.join([
+            v_null if p_row[v_index] is None else v_prefix + get_sql_text(p_value=p_row[v_index]) + v_suffix
+            for v_index, v_prefix, v_suffix, v_null in self.v_key_list
+        ])
+
+    def get_insert_sql(self, p_columns=None, p_row=None, p_key=None):
+        """Get INSERT statement of a record.
+
+            Args:
+                p_columns (list): list of columns that are present in p_row parameter. Defaults to None.
+                p_row (list): the record. Defaults to None.
+                p_key (list): the key used for comparison. Defaults to None.
+
+            Returns:
+                str: the statement.
+        """
+
+        self.compile(p_columns=p_columns, p_key=p_key)
+
+        #Each value is '$data_comparer$' + value + suffix, or its NULL literal
+        if self.v_value_list is None:
+            self.v_value_list = [
+                (
+                    '$data_comparer$::{p_type}'.format(p_type=self.v_column_type_dict[v_column]),
+                    'NULL::{p_type}'.format(p_type=self.v_column_type_dict[v_column])
+                )
+                for v_column in p_columns
+            ]
+
+        return self.v_insert_prefix + ','.join([
+            v_null if v_value is None else '$data_comparer$' + get_sql_text(p_value=v_value) + v_suffix
+            for v_value, (v_suffix, v_null) in zip(p_row, self.v_value_list)
+        ]) + '\n);'
+
+    def get_update_sql(self, p_columns=None, p_row=None, p_key=None, p_all_diffs=None):
+        """Get UPDATE statement of a record, setting just its changed columns.
+
+            Args:
+                p_columns (list): list of columns that are present in p_row parameter. Defaults to None.
+                p_row (list): the record, as it is in database 2. Defaults to None.
+                p_key (list): the key used for comparison. Defaults to None.
+                p_all_diffs (list): list of diffs. Each item is a dict with 'column', 'old_value' and 'new_value' keys. Defaults to None.
+
+            Returns:
+                str: the statement.
+        """
+
+        self.compile(p_columns=p_columns, p_key=p_key)
+
+        v_assignment_list = []
+
+        for v_diff in p_all_diffs:
+            v_prefix, v_suffix, v_null = self.get_assignment(p_column=v_diff['column'])
+            v_assignment_list.append(v_null if v_diff['new_value'] is None else v_prefix + get_sql_text(p_value=v_diff['new_value']) + v_suffix)
+
+        return self.v_update_prefix + ','.join(v_assignment_list) + '\nWHERE ' + self.get_key_condition(p_row=p_row) + ';'
+
+    def get_delete_sql(self, p_columns=None, p_row=None, p_key=None):
+        """Get DELETE statement of a record.
+
+            Args:
+                p_columns (list): list of columns that are present in p_row parameter. Defaults to None.
+                p_row (list): the record. Defaults to None.
+                p_key (list): the key used for comparison. Defaults to None.
+
+            Returns:
+                str: the statement.
+        """
+
+        self.compile(p_columns=p_columns, p_key=p_key)
+
+        return self.v_delete_prefix + self.get_key_condition(p_row=p_row) + ';'
+
+
+class DmlBatchBuffer(utils.QueueBuffer):
+    """Queue buffer that groups consecutive records inserted into or deleted from the same table, so they are sent as a single
+    multi-row INSERT statement or a single DELETE statement with a list of keys, instead of a statement for each record.
+    Any other message sends the pending statement first, so statements keep their order.
+
+        Args:
+            p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
+            p_block_size (int): maximum number of messages sent at a time. Defaults to None.
+            p_batch_rows (int): maximum number of records of each statement. Defaults to None.
+            p_max_size (int): maximum size of messages sent at a time, in characters of their text values. Defaults to utils.QUEUE_BUFFER_MAX_SIZE.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    def __init__(self, p_queue=None, p_block_size=None, p_batch_rows=None, p_max_size=utils.QUEUE_BUFFER_MAX_SIZE):
+        super(DmlBatchBuffer, self).__init__(p_queue=p_queue, p_block_size=p_block_size, p_max_size=p_max_size)
+
+        if not isinstance(p_batch_rows, int):
+            raise custom_exceptions.InvalidParameterTypeException('"p_batch_rows" parameter must be an "int" instance.', p_batch_rows)
+
+        if p_batch_rows < 1:
+            raise custom_exceptions.InvalidParameterValueException('"p_batch_rows" parameter must be a positive "int" instance.', p_batch_rows)
+
+        self.v_batch_rows = p_batch_rows
+        self.v_batch = None
+        self.v_value_list = []
+        self.v_null_key_condition_list = []
+        self.v_batch_column_list = None
+
+    def add_record(self, p_status=None, p_schema=None, p_table=None, p_column_type_dict=None, p_columns=None, p_row=None, p_key=None):
+        """Add a record to the pending statement, sending it before if it is full or was built for other status or table.
+
+            Args:
+                p_status (str): 'INSERTED' or 'DELETED'. Defaults to None.
+                p_schema (str): the schema name. Defaults to None.
+                p_table (str): the table name. Defaults to None.
+                p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+                p_columns (list): list of columns that are present in p_row parameter. Defaults to None.
+                p_row (list): the record. Defaults to None.
+                p_key (list): the key used for comparison. Defaults to None.
+
+            Raises:
+                custom_exceptions.InvalidParameterValueException.
+        """
+
+        if p_status not in ['INSERTED', 'DELETED']:
+            raise custom_exceptions.InvalidParameterValueException('"p_status" parameter must be one between: INSERTED, DELETED.', p_status)
+
+        v_batch = (p_status, p_schema, p_table, tuple(p_columns), tuple(p_key))
+
+        if v_batch != self.v_batch:
+            self.flush_batch()
+            self.v_batch = v_batch
+
+            #Inserted records hold all their values, deleted ones just their key values. Each value is '$data_comparer$' + value + suffix,
+            #or its NULL literal, so pieces are compiled once per batch
+            self.v_batch_column_list = [
+                (
+                    p_columns.index(v_column),
+                    v_column,
+                    '$data_comparer$::{p_type}'.format(p_type=p_column_type_dict[v_column]),
+                    'NULL::{p_type}'.format(p_type=p_column_type_dict[v_column])
+                )
+                for v_column in (p_columns if p_status == 'INSERTED' else p_key)
+            ]
+
+        v_value_list = [
+            v_null if p_row[v_index] is None else '$data_comparer$' + get_sql_text(p_value=p_row[v_index]) + v_suffix
+            for v_index, v_column, v_suffix, v_null in self.v_batch_column_list
+        ]
+
+        if p_status == 'INSERTED':
+            self.v_value_list.append(','.join(v_value_list))
+        #NULL values never match an IN list, so keys holding them need their own condition
+        elif any([p_row[v_index] is None for v_index, v_column, v_suffix, v_null in self.v_batch_column_list]):
+            self.v_null_key_condition_list.append(
+                '({p_condition})'.format(
+                    p_condition=' AND '.join([
+                        '{p_column} IS NULL'.format(p_column=v_column) if p_row[v_index] is None else '{p_column} = {p_value}'.format(p_column=v_column, p_value=v_value)
+                        for (v_index, v_column, v_suffix, v_null), v_value in zip(self.v_batch_column_list, v_value_list)
+                    ])
+                )
+            )
+        else:
+            self.v_value_list.append(v_value_list[0] if len(v_value_list) == 1 else '({p_values})'.format(p_values=','.join(v_value_list)))
+
+        if len(self.v_value_list) + len(self.v_null_key_condition_list) >= self.v_batch_rows:
+            self.flush_batch()
+
+    def flush_batch(self):
+        """Send the pending statement to the buffer, if any.
+        """
+
+        if self.v_batch is None or len(self.v_value_list) + len(self.v_null_key_condition_list) == 0:
+            return
+
+        v_status, v_schema, v_table, v_columns, v_key = self.v_batch
+
+        if v_status == 'INSERTED':
+            v_sql = inspect.cleandoc(
+                doc='''\
+                    INSERT INTO {p_schema}.{p_table} (
+                        {p_columns}
+                    ) VALUES
+                '''
+            ).format(
+                p_schema=v_schema,
+                p_table=v_table,
+                p_columns=','.join(v_columns)
+            ) + '\n' + ',\n'.join([
+                '({p_values})'.format(p_values=v_values)
+                for v_values in self.v_value_list
+            ]) + ';'
+        else:
+            v_condition_list = []
+
+            if len(self.v_value_list) > 0:
+                v_condition_list.append(
+                    '{p_key} IN (\n'.format(
+                        p_key=v_key[0] if len(v_key) == 1 else '({p_key})'.format(p_key=','.join(v_key))
+                    ) + ',\n'.join([
+                        '    {p_values}'.format(p_values=v_values)
+                        for v_values in self.v_value_list
+                    ]) + '\n)'
+                )
+
+            v_sql = inspect.cleandoc(
+                doc='''\
+                    DELETE
+                    FROM {p_schema}.{p_table}
+                    WHERE {p_condition};
+                '''
+            ).format(
+                p_schema=v_schema,
+                p_table=v_table,
+                p_condition='\n   OR '.join(v_condition_list + self.v_null_key_condition_list)
+            )
+
+        self.v_value_list = []
+        self.v_null_key_condition_list = []
+
+        super(DmlBatchBuffer, self).put({
+            'type': 'tables_data',
+            'row': {
+                'schema_name': v_schema,
+                'table_name': v_table,
+                'status': v_status,
+                'sql': v_sql
+            }
+        })
+
+    def put(self, p_message=None):
+        """Send the pending statement, then add a message to the buffer.
+
+            Args:
+                p_message (dict): the message, with 'type' and 'row' keys. Defaults to None.
+        """
+
+        self.flush_batch()
+        super(DmlBatchBuffer, self).put(p_message=p_message)
+
+    def flush(self):
+        """Send the pending statement and all buffered messages to the queue.
+        """
+
+        self.flush_batch()
+        super(DmlBatchBuffer, self).flush()
+
+
+class PatchBuffer(utils.QueueBuffer):
+    """Queue buffer that sends images of changed records in COPY text format instead of SQL statements, so they can be loaded into
+    staging tables and applied by a few set-based statements. See "compare_databases.write_patch_script".
+    Inserted and updated records are sent with all their values, deleted ones with just their key values.
+
+        Args:
+            p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
+            p_block_size (int): maximum number of messages sent at a time. Defaults to None.
+            p_max_size (int): maximum size of messages sent at a time, in characters of their text values. Defaults to utils.QUEUE_BUFFER_MAX_SIZE.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    def add_record(self, p_status=None, p_schema=None, p_table=None, p_column_type_dict=None, p_columns=None, p_row=None, p_key=None):
+        """Send the image of a changed record.
+
+            Args:
+                p_status (str): 'INSERTED', 'UPDATED' or 'DELETED'. Defaults to None.
+                p_schema (str): the schema name. Defaults to None.
+                p_table (str): the table name. Defaults to None.
+                p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+                p_columns (list): list of columns that are present in p_row parameter. Defaults to None.
+                p_row (list): the record, as it is in database 2 if inserted or updated, or in database 1 if deleted. Defaults to None.
+                p_key (list): the key used for comparison. Defaults to None.
+
+            Raises:
+                custom_exceptions.InvalidParameterValueException.
+        """
+
+        if p_status not in ['INSERTED', 'UPDATED', 'DELETED']:
+            raise custom_exceptions.InvalidParameterValueException('"p_status" parameter must be one between: INSERTED, UPDATED, DELETED.', p_status)
+
+        v_column_list = p_key if p_status == 'DELETED' else p_columns
+
+        self.put({
+            'type': 'tables_data_patch',
+            'row': {
+                'schema_name': p_schema,
+                'table_name': p_table,
+                'status': p_status,
+                'data': '\t'.join([
+                    get_copy_value(p_value=p_row[p_columns.index(v_column)], p_type=p_column_type_dict[v_column])
+                    for v_column in v_column_list
+                ])
+            }
+        })
+
+
+def inserted_callback(p_queue=None, p_schema=None, p_table=None, p_column_type_dict=None, p_columns=None, p_row=None, p_key=None, p_templates=None):
+    """Callback executed when a record was inserted in second database. Sends a row by queue to master process.
+
+        Args:
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. May be a DmlBatchBuffer or PatchBuffer instance. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_columns (list): list of columns that are present in p_row parameter.
+            p_row (list): the row that was inserted in the database 2.
+            p_key (list): the key used for comparison.
+            p_templates (DmlTemplates): statements of the table, compiled once per comparison task. Created for this record if None. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_columns, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_columns" parameter must be a "list" instance.', p_columns)
+
+    if not isinstance(p_row, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_row" parameter must be a "list" instance.', p_row)
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    #Records are grouped with others in a single statement, if batching is enabled, or sent as images for patches
+    if isinstance(p_queue, (DmlBatchBuffer, PatchBuffer)):
+        p_queue.add_record(p_status='INSERTED', p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key)
+
+        return
+
+    if p_templates is None:
+        p_templates = DmlTemplates(p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict)
+
+    p_queue.put({
+        'type': 'tables_data',
+        'row': {
+            'schema_name': p_schema,
+            'table_name': p_table,
+            'status': 'INSERTED',
+            'sql': p_templates.get_insert_sql(p_columns=p_columns, p_row=p_row, p_key=p_key)
+        }
+    })
+
+
+def updated_callback(p_queue=None, p_schema=None, p_table=None, p_column_type_dict=None, p_columns=None, p_row_1=None, p_row_2=None, p_key=None, p_all_diffs=None, p_templates=None):
+    """Callback executed when a record was updated in second database. Sends a row by queue to master process.
+
+        Args:
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. May be a PatchBuffer instance. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_columns (list): list of columns that are present in p_row parameter.
+            p_row_1 (list): the row as it is in database 1.
+            p_row_2 (list): the row as it is in database 2.
+            p_key (list): the key used for comparison.
+            p_all_diffs (list): list of diffs. Each item is a dict with 'column', 'old_value' and 'new_value' keys.
+            p_templates (DmlTemplates): statements of the table, compiled once per comparison task. Created for this record if None. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_columns, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_columns" parameter must be a "list" instance.', p_columns)
+
+    if not isinstance(p_row_1, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_row_1" parameter must be a "list" instance.', p_row_1)
+
+    if not isinstance(p_row_2, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_row_2" parameter must be a "list" instance.', p_row_2)
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    if not isinstance(p_all_diffs, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_all_diffs" parameter must be a "list" instance.', p_all_diffs)
+
+    #Updated records are sent as images for patches
+    if isinstance(p_queue, PatchBuffer):
+        p_queue.add_record(p_status='UPDATED', p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row_2, p_key=p_key)
+
+        return
+
+    if p_templates is None:
+        p_templates = DmlTemplates(p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict)
+
+    p_queue.put({
+        'type': 'tables_data',
+        'row': {
+            'schema_name': p_schema,
+            'table_name': p_table,
+            'status': 'UPDATED',
+            'sql': p_templates.get_update_sql(p_columns=p_columns, p_row=p_row_2, p_key=p_key, p_all_diffs=p_all_diffs)
+        }
+    })
+
+
+def deleted_callback(p_queue=None, p_schema=None, p_table=None, p_column_type_dict=None, p_columns=None, p_row=None, p_key=None, p_templates=None):
+    """Callback executed when a record was deleted from second database. Sends a row by queue to master process.
+
+        Args:
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. May be a DmlBatchBuffer or PatchBuffer instance. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_columns (list): list of columns that are present in p_row parameter.
+            p_row (list): the row that was deleted from the database 2.
+            p_key (list): the key used for comparison.
+            p_templates (DmlTemplates): statements of the table, compiled once per comparison task. Created for this record if None. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_columns, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_columns" parameter must be a "list" instance.', p_columns)
+
+    if not isinstance(p_row, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_row" parameter must be a "list" instance.', p_row)
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    #Records are grouped with others in a single statement, if batching is enabled, or sent as images for patches
+    if isinstance(p_queue, (DmlBatchBuffer, PatchBuffer)):
+        p_queue.add_record(p_status='DELETED', p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key)
+
+        return
+
+    if p_templates is None:
+        p_templates = DmlTemplates(p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict)
+
+    p_queue.put({
+        'type': 'tables_data',
+        'row': {
+            'schema_name': p_schema,
+            'table_name': p_table,
+            'status': 'DELETED',
+            'sql': p_templates.get_delete_sql(p_columns=p_columns, p_row=p_row, p_key=p_key)
+        }
+    })
+
+
+def get_key_expression_list(p_key=None, p_key_order_dict=None):
+    """Get SQL expressions used to order and compare table records by key.
+
+        Args:
+            p_key (list): list of columns that form the table records key. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+
+        Returns:
+            list: list of SQL expressions, one for each key column.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    if not isinstance(p_key_order_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_order_dict" parameter must be a "dict" instance.', p_key_order_dict)
+
+    return [
+        p_key_order_dict[v_column][0].format(p_column=v_column)
+        for v_column in p_key
+    ]
+
+
+def get_sort_key_dict(p_key_order_dict=None):
+    """Get sort key functions of the key columns whose values python must map before comparing them. Check "utils.get_key_function".
+
+        Args:
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+
+        Returns:
+            dict: key/value pairs of key column names and their sort key functions.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_key_order_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_order_dict" parameter must be a "dict" instance.', p_key_order_dict)
+
+    return {
+        v_column: v_sort_key
+        for v_column, (v_expression, v_sort_key) in p_key_order_dict.items()
+        if v_sort_key is not None
+    }
+
+
+def get_column_type_dict(p_database=None, p_schema=None, p_table=None):
+    """Get data types of the columns of a given table.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database, already opened. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+
+        Returns:
+            dict: key/value pairs of column names and their data types.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_schema, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_schema" parameter must be a "str" instance.', p_schema)
+
+    if not isinstance(p_table, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_table" parameter must be a "str" instance.', p_table)
+
+    #Types are named as in SQL casts, so enums, domains and arrays are cast to themselves
+    v_table = p_database.Query(
+        p_sql='''
+            SELECT a.attname AS column_name,
+                   FORMAT_TYPE(a.atttypid, a.atttypmod) AS data_type
+            FROM pg_attribute a
+            INNER JOIN pg_class c
+                    ON a.attrelid = c.oid
+            INNER JOIN pg_namespace n
+                    ON c.relnamespace = n.oid
+            WHERE QUOTE_IDENT(n.nspname) = '{p_schema}'
+              AND QUOTE_IDENT(c.relname) = '{p_table}'
+              AND a.attnum > 0
+              AND NOT a.attisdropped
+        '''.format(
+            p_schema=p_schema,
+            p_table=p_table
+        )
+    )
+
+    v_column_type_dict = {}
+
+    for v_row in v_table.Rows:
+        v_column_type_dict[v_row['column_name']] = v_row['data_type']
+
+    return v_column_type_dict
+
+
+def get_key_order_dict(p_database_1=None, p_database_2=None, p_schema=None, p_table=None, p_key=None):
+    """Get how table records are ordered by each key column, so that databases order them just like python compares their keys.
+    Columns keep their own order where python can follow it, so key indexes are still used:
+        - text columns in "C" collation, or in a deterministic libc collation with the same locale in both databases, available to python.
+          Just one such locale is followed for a table. See "utils.get_collation_sort_key".
+        - enum columns whose labels are sorted the same way in both databases, compared by label position.
+        - columns of types in ORDERED_TYPE_LIST, and arrays of them or of intervals.
+    Other text columns, as in ICU or nondeterministic collations, are ordered in "C" collation. json columns are ordered by their text
+    as "jsonb", and columns of other types, like citext, intervals or enums sorted differently in each database, by their text, both in
+    "C" collation. python maps their fetched values back to that text. See "utils.get_json_sort_key" and "utils.get_text_sort_key".
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database, already opened. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database, already opened. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (list): list of columns that form the table records key. Defaults to None.
+
+        Returns:
+            dict: key/value pairs of key column names and pairs of the SQL expression template of the column, formatted with
+                "p_column", and the python sort key function of its non NULL values, or None if they are compared as fetched.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_database_1, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database_1" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database_1)
+
+    if not isinstance(p_database_2, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database_2" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database_2)
+
+    if not isinstance(p_schema, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_schema" parameter must be a "str" instance.', p_schema)
+
+    if not isinstance(p_table, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_table" parameter must be a "str" instance.', p_table)
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    #Domains are ordered as their base types. Columns of the default collation follow the database locale
+    v_sql = '''
+        SELECT QUOTE_IDENT(a.attname) AS column_name,
+               FORMAT_TYPE(b.oid, NULL) AS type_name,
+               (CASE WHEN b.typcategory = 'A'
+                     THEN FORMAT_TYPE(b.typelem, NULL)
+                END) AS element_type_name,
+               (SELECT ARRAY_AGG(e.enumlabel::TEXT ORDER BY e.enumsortorder)
+                FROM pg_enum e
+                WHERE e.enumtypid = b.oid
+               ) AS enum_labels,
+               (CASE WHEN co.collprovider = 'd'
+                     THEN COALESCE(TO_JSONB(d) ->> 'datlocprovider', 'c')
+                     ELSE co.collprovider::TEXT
+                END) AS collation_provider,
+               (CASE WHEN co.collprovider = 'd'
+                     THEN d.datcollate::TEXT
+                     ELSE co.collcollate::TEXT
+                END) AS collation_locale,
+               COALESCE((TO_JSONB(co) ->> 'collisdeterministic')::BOOLEAN, TRUE) AS collation_deterministic
+        FROM pg_attribute a
+        INNER JOIN pg_class c
+                ON a.attrelid = c.oid
+        INNER JOIN pg_namespace n
+                ON c.relnamespace = n.oid
+        INNER JOIN pg_type t
+                ON a.atttypid = t.oid
+        INNER JOIN pg_type b
+                ON b.oid = (CASE WHEN t.typtype = 'd' THEN t.typbasetype ELSE t.oid END)
+        INNER JOIN pg_database d
+                ON d.datname = CURRENT_DATABASE()
+        LEFT JOIN pg_collation co
+               ON a.attcollation = co.oid
+        WHERE QUOTE_IDENT(n.nspname) = '{p_schema}'
+          AND QUOTE_IDENT(c.relname) = '{p_table}'
+          AND a.attnum > 0
+          AND NOT a.attisdropped
+    '''.format(
+        p_schema=p_schema,
+        p_table=p_table
+    )
+
+    v_row_dict_2 = {
+        v_row['column_name']: v_row
+        for v_row in p_database_2.Query(p_sql=v_sql).Rows
+    }
+
+    #Table may not exist in database 1, so database 2 alone decides the order
+    v_row_dict_1 = {
+        v_row['column_name']: v_row
+        for v_row in p_database_1.Query(p_sql=v_sql).Rows
+    }
+
+    v_locale = None
+    v_key_order_dict = {}
+
+    for v_column in p_key:
+        v_row_2 = v_row_dict_2[v_column]
+        v_row_1 = v_row_dict_1.get(v_column, v_row_2)
+        v_type = v_row_2['type_name']
+        v_element_type = v_row_2['element_type_name']
+
+        if v_row_2['enum_labels'] is not None:
+            if v_row_1['enum_labels'] == v_row_2['enum_labels']:
+                v_position_dict = {v_label: v_index for v_index, v_label in enumerate(v_row_2['enum_labels'])}
+                v_key_order_dict[v_column] = ('{p_column}', v_position_dict.__getitem__)
+            else:
+                v_key_order_dict[v_column] = ('{p_column}::TEXT COLLATE "C"', utils.get_text_sort_key)
+        elif v_type in COLLATABLE_TYPE_LIST or v_element_type in COLLATABLE_TYPE_LIST:
+            v_collation = (v_row_2['collation_provider'], v_row_2['collation_locale'], v_row_2['collation_deterministic'])
+            v_sort_key = None
+
+            if v_collation == (v_row_1['collation_provider'], v_row_1['collation_locale'], v_row_1['collation_deterministic']) and v_collation[0] == 'c' and v_collation[2]:
+                if v_collation[1] in ['C', 'POSIX']:
+                    v_key_order_dict[v_column] = ('{p_column}', None)
+
+                    continue
+
+                #Elements of arrays are not mapped, so arrays just keep "C" collation
+                if v_element_type is None and v_locale in [None, v_collation[1]]:
+                    v_sort_key = utils.get_collation_sort_key(p_locale=v_collation[1])
+
+            if v_sort_key is not None:
+                v_locale = v_collation[1]
+                v_key_order_dict[v_column] = ('{p_column}', v_sort_key)
+            else:
+                v_key_order_dict[v_column] = ('{p_column} COLLATE "C"', None)
+        #Intervals are fetched as text, but elements of interval arrays are fetched as "timedelta", that python orders like the database
+        elif v_type in ORDERED_TYPE_LIST or v_element_type in ORDERED_TYPE_LIST + ['interval']:
+            v_key_order_dict[v_column] = ('{p_column}', None)
+        elif v_type in JSON_TYPE_LIST:
+            v_key_order_dict[v_column] = ('{p_column}::JSONB::TEXT COLLATE "C"', utils.get_json_sort_key)
+        else:
+            v_key_order_dict[v_column] = ('{p_column}::TEXT COLLATE "C"', utils.get_text_sort_key)
+
+    return v_key_order_dict
+
+
+def get_key_bounds(p_database=None, p_schema=None, p_table=None, p_key=None, p_column_type_dict=None, p_key_order_dict=None, p_row_count=None, p_range_count=None):
+    """Get key values that split a table in ranges holding about the same number of records.
+    Uses planner statistics histogram when the key has a single column, else a sample of table records.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database, already opened. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (list): list of columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+            p_row_count (int): estimated number of records in the table. Defaults to None.
+            p_range_count (int): number of wanted ranges. Defaults to None.
+
+        Returns:
+            list: sorted list of bounds. Each bound is a list of key values, as text.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_schema, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_schema" parameter must be a "str" instance.', p_schema)
+
+    if not isinstance(p_table, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_table" parameter must be a "str" instance.', p_table)
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    if not isinstance(p_column_type_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_column_type_dict" parameter must be a "dict" instance.', p_column_type_dict)
+
+    if not isinstance(p_key_order_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_order_dict" parameter must be a "dict" instance.', p_key_order_dict)
+
+    if not isinstance(p_row_count, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_row_count" parameter must be an "int" instance.', p_row_count)
+
+    if not isinstance(p_range_count, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_range_count" parameter must be an "int" instance.', p_range_count)
+
+    if p_range_count < 1:
+        raise custom_exceptions.InvalidParameterValueException('"p_range_count" parameter must be a positive "int" instance.', p_range_count)
+
+    v_table = None
+
+    if len(p_key) == 1:
+        v_table = p_database.Query(
+            p_sql='''
+                SELECT x.bound::TEXT AS key_0,
+                       x.bound
+                FROM (
+                    SELECT UNNEST(histogram_bounds::TEXT::{p_type}[]) AS bound
+                    FROM pg_stats
+                    WHERE QUOTE_IDENT(schemaname) = '{p_schema}'
+                      AND QUOTE_IDENT(tablename) = '{p_table}'
+                      AND QUOTE_IDENT(attname) = '{p_column}'
+                ) x
+                ORDER BY {p_order}
+            '''.format(
+                p_order=get_key_expression_list(p_key=['x.bound'], p_key_order_dict={'x.bound': p_key_order_dict[p_key[0]]})[0],
+                p_type=p_column_type_dict[p_key[0]],
+                p_schema=p_schema,
+                p_table=p_table,
+                p_column=p_key[0]
+            )
+        )
+
+    #Statistics are not available or are not enough to get wanted ranges, so let's sample the table
+    if v_table is None or len(v_table.Rows) <= p_range_count:
+        v_table = p_database.Query(
+            p_sql='''
+                SELECT {p_columns}
+                FROM {p_schema}.{p_table} TABLESAMPLE SYSTEM ({p_percent})
+                ORDER BY {p_order}
+            '''.format(
+                p_columns=','.join([
+                    '{p_column}::TEXT AS key_{p_index}'.format(
+                        p_column=v_column,
+                        p_index=v_index
+                    )
+                    for v_index, v_column in enumerate(p_key)
+                ]),
+                p_schema=p_schema,
+                p_table=p_table,
+                p_percent=min(100.0, max(0.0001, 100.0 * p_range_count * 100 / max(p_row_count, 1))),
+                p_order=','.join(get_key_expression_list(p_key=p_key, p_key_order_dict=p_key_order_dict))
+            )
+        )
+
+    v_bound_list = []
+
+    for v_index in range(1, p_range_count):
+        v_row = v_table.Rows[v_index * len(v_table.Rows) // p_range_count] if len(v_table.Rows) > 0 else None
+
+        if v_row is None:
+            break
+
+        v_bound = [
+            v_row['key_{p_index}'.format(p_index=v_key_index)]
+            for v_key_index in range(len(p_key))
+        ]
+
+        if len(v_bound_list) == 0 or v_bound_list[-1] != v_bound:
+            v_bound_list.append(v_bound)
+
+    return v_bound_list
+
+
+def get_key_condition(p_key=None, p_column_type_dict=None, p_key_order_dict=None, p_lower_bound=None, p_upper_bound=None):
+    """Get SQL condition that restricts table records to a given key range.
+
+        Args:
+            p_key (list): list of columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+            p_lower_bound (list): key values, as text, of the range lower bound, inclusive. Defaults to None.
+                Notes: None means the range has no lower bound.
+            p_upper_bound (list): key values, as text, of the range upper bound, exclusive. Defaults to None.
+                Notes: None means the range has no upper bound.
+
+        Returns:
+            str: the SQL condition.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    if not isinstance(p_column_type_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_column_type_dict" parameter must be a "dict" instance.', p_column_type_dict)
+
+    if not isinstance(p_key_order_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_order_dict" parameter must be a "dict" instance.', p_key_order_dict)
+
+    if p_lower_bound is not None and not isinstance(p_lower_bound, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_lower_bound" parameter must be a "list" instance.', p_lower_bound)
+
+    if p_upper_bound is not None and not isinstance(p_upper_bound, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_upper_bound" parameter must be a "list" instance.', p_upper_bound)
+
+    v_condition_list = []
+
+    for v_operator, v_bound in [('>=', p_lower_bound), ('<', p_upper_bound)]:
+        if v_bound is not None:
+            v_condition_list.append(
+                '({p_columns}) {p_operator} ({p_values})'.format(
+                    p_columns=','.join(get_key_expression_list(p_key=p_key, p_key_order_dict=p_key_order_dict)),
+                    p_operator=v_operator,
+                    #Bound values are turned into the same expressions as key columns, so both are compared alike
+                    p_values=','.join([
+                        p_key_order_dict[v_column][0].format(
+                            p_column='{p_value}::{p_type}'.format(
+                                p_value='$data_comparer${p_value}$data_comparer$'.format(p_value=v_value) if v_value is not None else 'NULL',
+                                p_type=p_column_type_dict[v_column]
+                            )
+                        )
+                        for v_column, v_value in zip(p_key, v_bound)
+                    ])
+                )
+            )
+
+    if len(v_condition_list) == 0:
+        return 'TRUE'
+
+    return ' AND '.join(v_condition_list)
+
+
+def get_filtered_condition(p_condition=None, p_row_filter=None):
+    """Get SQL condition restricted by a row filter.
+
+        Args:
+            p_condition (str): the SQL condition. Defaults to None.
+            p_row_filter (str): SQL predicate that restricts the compared records of the table, or None to compare all of them. Defaults to None.
+
+        Returns:
+            str: the SQL condition.
+    """
+
+    if p_row_filter is None:
+        return p_condition
+
+    if p_condition == 'TRUE':
+        return '({p_row_filter})'.format(p_row_filter=p_row_filter)
+
+    return '({p_condition}) AND ({p_row_filter})'.format(p_condition=p_condition, p_row_filter=p_row_filter)
+
+
+def get_select_list(p_compared_columns=None, p_alias=None):
+    """Get SQL select list of the compared columns of a table.
+
+        Args:
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are selected if None. Defaults to None.
+            p_alias (str): alias of the table in the query, or None if it has no alias. Defaults to None.
+
+        Returns:
+            str: the select list.
+    """
+
+    v_prefix = '' if p_alias is None else p_alias + '.'
+
+    if p_compared_columns is None:
+        return v_prefix + '*'
+
+    return ','.join([
+        v_prefix + v_column
+        for v_column in p_compared_columns.split(',')
+    ])
+
+
+def get_record_expression(p_compared_columns=None, p_alias=None):
+    """Get SQL expression of the compared part of a table record, used to compute its hash.
+
+        Args:
+            p_compared_columns (str): list of comma separated columns that are compared. The whole record is used if None. Defaults to None.
+            p_alias (str): alias of the table in the query. Defaults to None.
+
+        Returns:
+            str: the expression.
+    """
+
+    #Whole records keep the same hashes as always
+    if p_compared_columns is None:
+        return p_alias
+
+    return 'ROW({p_columns})'.format(p_columns=get_select_list(p_compared_columns=p_compared_columns, p_alias=p_alias))
+
+
+def get_range_checksum(p_database=None, p_schema=None, p_table=None, p_condition=None, p_compared_columns=None):
+    """Get an order independent checksum of the table records that match a given condition. Computed in the database server.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database, already opened. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_condition (str): the SQL condition that restricts table records. Defaults to None.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+
+        Returns:
+            tuple: pair of records count and the sum of records hashes, both as "int" instances.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_schema, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_schema" parameter must be a "str" instance.', p_schema)
+
+    if not isinstance(p_table, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_table" parameter must be a "str" instance.', p_table)
+
+    if not isinstance(p_condition, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_condition" parameter must be a "str" instance.', p_condition)
+
+    v_table = p_database.Query(
+        p_sql='''
+            SELECT COUNT(*) AS row_count,
+                   COALESCE(SUM(('x' || SUBSTR(MD5({p_record}::TEXT), 1, 16))::BIT(64)::BIGINT), 0)::TEXT AS row_hash
+            FROM {p_schema}.{p_table} t
+            WHERE {p_condition}
+        '''.format(
+            p_record=get_record_expression(p_compared_columns=p_compared_columns, p_alias='t'),
+            p_schema=p_schema,
+            p_table=p_table,
+            p_condition=p_condition
+        )
+    )
+
+    return (int(v_table.Rows[0]['row_count']), int(v_table.Rows[0]['row_hash']))
+
+
+def get_range_split(p_database=None, p_schema=None, p_table=None, p_key=None, p_key_order_dict=None, p_condition=None, p_offset=None):
+    """Get the key of the record found at a given position of a key range. Used to bisect the range.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database, already opened. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (list): list of columns that form the table records key. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+            p_condition (str): the SQL condition that restricts table records to the range. Defaults to None.
+            p_offset (int): the position of the record inside the range. Defaults to None.
+
+        Returns:
+            list: key values of the found record, as text. None if there is no record in the given position.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_schema, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_schema" parameter must be a "str" instance.', p_schema)
+
+    if not isinstance(p_table, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_table" parameter must be a "str" instance.', p_table)
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    if not isinstance(p_key_order_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_order_dict" parameter must be a "dict" instance.', p_key_order_dict)
+
+    if not isinstance(p_condition, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_condition" parameter must be a "str" instance.', p_condition)
+
+    if not isinstance(p_offset, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_offset" parameter must be an "int" instance.', p_offset)
+
+    if p_offset < 0:
+        raise custom_exceptions.InvalidParameterValueException('"p_offset" parameter must be an "int" instance greater than or equal to 0.', p_offset)
+
+    v_table = p_database.Query(
+        p_sql='''
+            SELECT {p_columns}
+            FROM {p_schema}.{p_table}
+            WHERE {p_condition}
+            ORDER BY {p_order}
+            OFFSET {p_offset}
+            LIMIT 1
+        '''.format(
+            p_columns=','.join([
+                '{p_column}::TEXT AS key_{p_index}'.format(
+                    p_column=v_column,
+                    p_index=v_index
+                )
+                for v_index, v_column in enumerate(p_key)
+            ]),
+            p_schema=p_schema,
+            p_table=p_table,
+            p_condition=p_condition,
+            p_order=','.join(get_key_expression_list(p_key=p_key, p_key_order_dict=p_key_order_dict)),
+            p_offset=p_offset
+        )
+    )
+
+    if len(v_table.Rows) == 0:
+        return None
+
+    return [
+        v_table.Rows[0]['key_{p_index}'.format(p_index=v_index)]
+        for v_index in range(len(p_key))
+    ]
+
+
+def compare_tables_data_rows(p_database_1=None, p_database_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_column_type_dict=None, p_key_order_dict=None, p_condition=None, p_queue=None, p_fetch_mode='thread', p_row_reader='query', p_compared_columns=None, p_row_filter=None):
+    """Used to compare tables data records between databases, row by row. Both databases must be already opened.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
+            p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (str): list of comma separated columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+            p_condition (str): the SQL condition that restricts the compared records. Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
+            p_fetch_mode (str): how blocks of records are fetched. Check "utils.fetch_block_pair" for allowed values. Defaults to 'thread'.
+            p_row_reader (str): how records are read when compared row by row. Check "compare_tables_data" for allowed values. Defaults to 'query'.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+            p_row_filter (str): SQL predicate that restricts the compared records of the table, or None to compare all of them. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_column_type_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_column_type_dict" parameter must be a "dict" instance.', p_column_type_dict)
+
+    if not isinstance(p_key_order_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_order_dict" parameter must be a "dict" instance.', p_key_order_dict)
+
+    if not isinstance(p_condition, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_condition" parameter must be a "str" instance.', p_condition)
+
+    #Set comparison key
+    v_key = p_key.split(',')
+
+    #Prepare table query SQL
+    v_sql = '''
+        SELECT {p_columns}
+        FROM {p_schema}.{p_table}
+        WHERE {p_condition}
+        ORDER BY {p_order}
+    '''.format(
+        p_columns=get_select_list(p_compared_columns=p_compared_columns),
+        p_schema=p_schema,
+        p_table=p_table,
+        p_condition=get_filtered_condition(p_condition=p_condition, p_row_filter=p_row_filter),
+        p_order=','.join(get_key_expression_list(p_key=v_key, p_key_order_dict=p_key_order_dict))
+    )
+
+    v_templates = DmlTemplates(p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict)
+    v_inserted_callback = lambda p_columns, p_row, p_key: inserted_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key, p_templates=v_templates)
+    v_updated_callback = lambda p_columns, p_row_1, p_row_2, p_key, p_all_diffs: updated_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row_1=p_row_1, p_row_2=p_row_2, p_key=p_key, p_all_diffs=p_all_diffs, p_templates=v_templates)
+    v_deleted_callback = lambda p_columns, p_row, p_key: deleted_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key, p_templates=v_templates)
+
+    #Stream raw records of both databases, each one by a thread of its own, so fetch mode does not apply
+    if p_row_reader == 'copy':
+        copy_fetch.compare_copy_streams(
+            p_database_1=p_database_1,
+            p_database_2=p_database_2,
+            p_block_size=p_block_size,
+            p_key=v_key,
+            p_sql=v_sql,
+            p_inserted_callback=v_inserted_callback,
+            p_updated_callback=v_updated_callback,
+            p_deleted_callback=v_deleted_callback,
+            p_sort_key_dict=get_sort_key_dict(p_key_order_dict=p_key_order_dict)
+        )
+
+        return
+
+    #Query first block of table in each database
+    v_blocks_1, v_blocks_2 = utils.fetch_block_pair(
+        p_database_1=p_database_1,
+        p_database_2=p_database_2,
+        p_sql=v_sql,
+        p_block_size=p_block_size,
+        p_fetch_mode=p_fetch_mode
+    )
+
+    try:
+        v_table_2 = next(v_blocks_2)
+
+        try:
+            v_table_1 = next(v_blocks_1)
+        except Spartacus.Database.Exception:
+            #Table does not exist in database 1, let's create a fake one just for comparison
+            v_table_1 = Spartacus.Database.DataTable()
+
+            for v_column in v_table_2.Columns:
+                v_table_1.AddColumn(p_columnname=v_column)
+
+        if v_table_1.Columns != v_table_2.Columns:
+            raise Exception('Cannot compare table with different columns: {p_schema}.{p_table}.'.format(p_schema=p_schema, p_table=p_table))
+
+        utils.compare_blocks(
+            p_blocks_1=itertools.chain([v_table_1], v_blocks_1),
+            p_blocks_2=itertools.chain([v_table_2], v_blocks_2),
+            p_key=v_key,
+            p_inserted_callback=v_inserted_callback,
+            p_updated_callback=v_updated_callback,
+            p_deleted_callback=v_deleted_callback,
+            p_sort_key_dict=get_sort_key_dict(p_key_order_dict=p_key_order_dict)
+        )
+    finally:
+        utils.close_blocks(p_blocks=v_blocks_1)
+        utils.close_blocks(p_blocks=v_blocks_2)
+
+
+def get_key_list_condition(p_key=None, p_column_type_dict=None, p_key_list=None):
+    """Get SQL condition that restricts table records to a given list of keys.
+
+        Args:
+            p_key (list): list of columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_key_list (list): list of keys. Each key is a tuple of values, in the same order of p_key columns. Defaults to None.
+
+        Returns:
+            str: the SQL condition.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    if not isinstance(p_column_type_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_column_type_dict" parameter must be a "dict" instance.', p_column_type_dict)
+
+    if not isinstance(p_key_list, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_list" parameter must be a "list" instance.', p_key_list)
+
+    v_condition_list = []
+    v_value_list = []
+
+    for v_key_values in p_key_list:
+        #NULL values never match an IN list, so such keys need their own condition
+        if None in v_key_values:
+            v_condition_list.append(
+                '({p_condition})'.format(
+                    p_condition=' AND '.join([
+                        '{p_column} IS NULL'.format(p_column=v_column) if v_value is None else '{p_column} = {p_value}'.format(
+                            p_column=v_column,
+                            p_value=get_sql_value(p_value=v_value, p_type=p_column_type_dict[v_column])
+                        )
+                        for v_column, v_value in zip(p_key, v_key_values)
+                    ])
+                )
+            )
+        else:
+            v_value_list.append(
+                '({p_values})'.format(
+                    p_values=','.join([
+                        get_sql_value(p_value=v_value, p_type=p_column_type_dict[v_column])
+                        for v_column, v_value in zip(p_key, v_key_values)
+                    ])
+                )
+            )
+
+    if len(v_value_list) > 0:
+        v_condition_list.append(
+            '({p_columns}) IN ({p_values})'.format(
+                p_columns=','.join(p_key),
+                p_values=','.join(v_value_list)
+            )
+        )
+
+    if len(v_condition_list) == 0:
+        return 'FALSE'
+
+    return ' OR '.join(v_condition_list)
+
+
+def compare_tables_data_key_list(p_database_1=None, p_database_2=None, p_schema=None, p_table=None, p_key=None, p_column_type_dict=None, p_key_order_dict=None, p_key_list=None, p_queue=None, p_compared_columns=None, p_row_filter=None):
+    """Used to compare tables data records of a given list of keys between databases. Both databases must be already opened.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (str): list of comma separated columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+            p_key_list (list): list of keys to be compared. Each key is a tuple of values, in the same order of p_key columns. Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+            p_row_filter (str): SQL predicate that restricts the compared records of the table, or None to compare all of them. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_key_list, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_list" parameter must be a "list" instance.', p_key_list)
+
+    if len(p_key_list) == 0:
+        return
+
+    v_key = p_key.split(',')
+
+    v_sql = '''
+        SELECT {p_columns}
+        FROM {p_schema}.{p_table}
+        WHERE {p_condition}
+        ORDER BY {p_order}
+    '''.format(
+        p_columns=get_select_list(p_compared_columns=p_compared_columns),
+        p_schema=p_schema,
+        p_table=p_table,
+        p_condition=get_filtered_condition(p_condition=get_key_list_condition(p_key=v_key, p_column_type_dict=p_column_type_dict, p_key_list=p_key_list), p_row_filter=p_row_filter),
+        p_order=','.join(get_key_expression_list(p_key=v_key, p_key_order_dict=p_key_order_dict))
+    )
+
+    v_templates = DmlTemplates(p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict)
+
+    utils.compare_blocks(
+        p_blocks_1=[p_database_1.Query(p_sql=v_sql)],
+        p_blocks_2=[p_database_2.Query(p_sql=v_sql)],
+        p_key=v_key,
+        p_inserted_callback=lambda p_columns, p_row, p_key: inserted_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key, p_templates=v_templates),
+        p_updated_callback=lambda p_columns, p_row_1, p_row_2, p_key, p_all_diffs: updated_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row_1=p_row_1, p_row_2=p_row_2, p_key=p_key, p_all_diffs=p_all_diffs, p_templates=v_templates),
+        p_deleted_callback=lambda p_columns, p_row, p_key: deleted_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key, p_templates=v_templates),
+        p_sort_key_dict=get_sort_key_dict(p_key_order_dict=p_key_order_dict)
+    )
+
+
+def compare_tables_data_hash(p_database_1=None, p_database_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_column_type_dict=None, p_key_order_dict=None, p_condition=None, p_queue=None, p_fetch_mode='thread', p_row_reader='query', p_compared_columns=None, p_row_filter=None):
+    """Used to compare tables data records between databases by their keys and hashes. Both databases must be already opened.
+    Full records are fetched just for keys whose hashes differ or that exist only in second database.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
+            p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (str): list of comma separated columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+            p_condition (str): the SQL condition that restricts the compared records. Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
+            p_fetch_mode (str): how blocks of records are fetched. Check "utils.fetch_block_pair" for allowed values. Defaults to 'thread'.
+            p_row_reader (str): how records are read when compared row by row. Check "compare_tables_data" for allowed values. Defaults to 'query'.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+            p_row_filter (str): SQL predicate that restricts the compared records of the table, or None to compare all of them. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_column_type_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_column_type_dict" parameter must be a "dict" instance.', p_column_type_dict)
+
+    if not isinstance(p_key_order_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_order_dict" parameter must be a "dict" instance.', p_key_order_dict)
+
+    if not isinstance(p_condition, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_condition" parameter must be a "str" instance.', p_condition)
+
+    v_key = p_key.split(',')
+
+    v_sql = '''
+        SELECT {p_columns},
+               MD5({p_record}::TEXT) AS data_comparer_hash
+        FROM {p_schema}.{p_table} t
+        WHERE {p_condition}
+        ORDER BY {p_order}
+    '''.format(
+        p_columns=','.join([
+            't.{p_column}'.format(p_column=v_column)
+            for v_column in v_key
+        ]),
+        p_record=get_record_expression(p_compared_columns=p_compared_columns, p_alias='t'),
+        p_schema=p_schema,
+        p_table=p_table,
+        p_condition=get_filtered_condition(p_condition=p_condition, p_row_filter=p_row_filter),
+        p_order=','.join(get_key_expression_list(p_key=v_key, p_key_order_dict=p_key_order_dict))
+    )
+
+    #Blocks are not prefetched by threads, as records that differ are fetched through the same connections while comparing.
+    #Asynchronous fetching is fine, as it has connections of its own
+    v_blocks_1, v_blocks_2 = utils.fetch_block_pair(
+        p_database_1=p_database_1,
+        p_database_2=p_database_2,
+        p_sql=v_sql,
+        p_block_size=p_block_size,
+        p_fetch_mode='asyncio' if p_fetch_mode == 'asyncio' else 'serial'
+    )
+
+    try:
+        v_table_1 = next(v_blocks_1)
+    except Spartacus.Database.Exception:
+        #Table does not exist in database 1, so every record must be fetched anyway. Database 2 records are fetched again,
+        #so its hashes are not fetched at all
+        v_blocks_2.close()
+
+        compare_tables_data_rows(
+            p_database_1=p_database_1,
+            p_database_2=p_database_2,
+            p_block_size=p_block_size,
+            p_schema=p_schema,
+            p_table=p_table,
+            p_key=p_key,
+            p_column_type_dict=p_column_type_dict,
+            p_key_order_dict=p_key_order_dict,
+            p_condition=p_condition,
+            p_queue=p_queue,
+            p_fetch_mode=p_fetch_mode,
+            p_row_reader=p_row_reader,
+            p_compared_columns=p_compared_columns,
+            p_row_filter=p_row_filter
+        )
+
+        return
+
+    try:
+        v_table_2 = next(v_blocks_2)
+        v_key_list = []
+
+        def add_key(p_columns=None, p_row=None):
+            v_key_list.append(tuple(p_row[0:len(v_key)]))
+
+            #Full records are fetched by batches, while keys and hashes are still being streamed
+            if len(v_key_list) >= p_block_size:
+                compare_tables_data_key_list(
+                    p_database_1=p_database_1,
+                    p_database_2=p_database_2,
+                    p_schema=p_schema,
+                    p_table=p_table,
+                    p_key=p_key,
+                    p_column_type_dict=p_column_type_dict,
+                    p_key_order_dict=p_key_order_dict,
+                    p_key_list=v_key_list,
+                    p_queue=p_queue,
+                    p_compared_columns=p_compared_columns,
+                    p_row_filter=p_row_filter
+                )
+
+                v_key_list.clear()
+
+        v_templates = DmlTemplates(p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict)
+
+        utils.compare_blocks(
+            p_blocks_1=itertools.chain([v_table_1], v_blocks_1),
+            p_blocks_2=itertools.chain([v_table_2], v_blocks_2),
+            p_key=v_key,
+            p_inserted_callback=lambda p_columns, p_row, p_key: add_key(p_columns=p_columns, p_row=p_row),
+            p_updated_callback=lambda p_columns, p_row_1, p_row_2, p_key, p_all_diffs: add_key(p_columns=p_columns, p_row=p_row_2),
+            #Key is enough to build the delete statement
+            p_deleted_callback=lambda p_columns, p_row, p_key: deleted_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key, p_templates=v_templates),
+            p_sort_key_dict=get_sort_key_dict(p_key_order_dict=p_key_order_dict)
+        )
+    finally:
+        utils.close_blocks(p_blocks=v_blocks_1)
+        utils.close_blocks(p_blocks=v_blocks_2)
+
+    compare_tables_data_key_list(
+        p_database_1=p_database_1,
+        p_database_2=p_database_2,
+        p_schema=p_schema,
+        p_table=p_table,
+        p_key=p_key,
+        p_column_type_dict=p_column_type_dict,
+        p_key_order_dict=p_key_order_dict,
+        p_key_list=v_key_list,
+        p_queue=p_queue,
+        p_compared_columns=p_compared_columns,
+        p_row_filter=p_row_filter
+    )
+
+
+def compare_tables_data_checksum(p_database_1=None, p_database_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_column_type_dict=None, p_key_order_dict=None, p_lower_bound=None, p_upper_bound=None, p_queue=None, p_fetch_mode='thread', p_row_reader='query', p_compared_columns=None, p_row_filter=None):
+    """Used to compare tables data between databases by key range checksums. Both databases must be already opened.
+    Ranges whose checksums differ are bisected until they hold at most p_block_size records, then compared row by row.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
+            p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (str): list of comma separated columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+            p_lower_bound (list): key values, as text, of the compared range lower bound, inclusive. Defaults to None.
+            p_upper_bound (list): key values, as text, of the compared range upper bound, exclusive. Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
+            p_fetch_mode (str): how blocks of records are fetched. Check "utils.fetch_block_pair" for allowed values. Defaults to 'thread'.
+            p_row_reader (str): how records are read when compared row by row. Check "compare_tables_data" for allowed values. Defaults to 'query'.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+            p_row_filter (str): SQL predicate that restricts the compared records of the table, or None to compare all of them. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_column_type_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_column_type_dict" parameter must be a "dict" instance.', p_column_type_dict)
+
+    if not isinstance(p_key_order_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_order_dict" parameter must be a "dict" instance.', p_key_order_dict)
+
+    v_key = p_key.split(',')
+
+    v_condition = get_filtered_condition(p_condition=get_key_condition(p_key=v_key, p_column_type_dict=p_column_type_dict, p_key_order_dict=p_key_order_dict, p_lower_bound=p_lower_bound, p_upper_bound=p_upper_bound), p_row_filter=p_row_filter)
+
+    try:
+        v_checksum_1 = get_range_checksum(p_database=p_database_1, p_schema=p_schema, p_table=p_table, p_condition=v_condition, p_compared_columns=p_compared_columns)
+    except Spartacus.Database.Exception:
+        #Table does not exist in database 1, so every record must be compared
+        compare_tables_data_rows(
+            p_database_1=p_database_1,
+            p_database_2=p_database_2,
+            p_block_size=p_block_size,
+            p_schema=p_schema,
+            p_table=p_table,
+            p_key=p_key,
+            p_column_type_dict=p_column_type_dict,
+            p_key_order_dict=p_key_order_dict,
+            p_condition=v_condition,
+            p_queue=p_queue,
+            p_fetch_mode=p_fetch_mode,
+            p_row_reader=p_row_reader,
+            p_compared_columns=p_compared_columns
+        )
+
+        return
+
+    v_checksum_2 = get_range_checksum(p_database=p_database_2, p_schema=p_schema, p_table=p_table, p_condition=v_condition, p_compared_columns=p_compared_columns)
+
+    #Each item is a range still to be checked: (lower bound, upper bound, checksum in database 1, checksum in database 2)
+    v_range_list = [(p_lower_bound, p_upper_bound, v_checksum_1, v_checksum_2)]
+
+    while len(v_range_list) > 0:
+        v_lower_bound, v_upper_bound, v_checksum_1, v_checksum_2 = v_range_list.pop()
+
+        if v_checksum_1 == v_checksum_2:
+            continue
+
+        v_condition = get_filtered_condition(p_condition=get_key_condition(p_key=v_key, p_column_type_dict=p_column_type_dict, p_key_order_dict=p_key_order_dict, p_lower_bound=v_lower_bound, p_upper_bound=v_upper_bound), p_row_filter=p_row_filter)
+        v_count = max(v_checksum_1[0], v_checksum_2[0])
+        v_split = None
+
+        if v_count > p_block_size:
+            #Bisect using the database that holds more records in the range
+            v_split = get_range_split(
+                p_database=p_database_1 if v_checksum_1[0] >= v_checksum_2[0] else p_database_2,
+                p_schema=p_schema,
+                p_table=p_table,
+                p_key=v_key,
+                p_key_order_dict=p_key_order_dict,
+                p_condition=v_condition,
+                p_offset=v_count // 2
+            )
+
+        if v_split is None or v_split == v_lower_bound:
+            compare_tables_data_rows(
+                p_database_1=p_database_1,
+                p_database_2=p_database_2,
+                p_block_size=p_block_size,
+                p_schema=p_schema,
+                p_table=p_table,
+                p_key=p_key,
+                p_column_type_dict=p_column_type_dict,
+                p_key_order_dict=p_key_order_dict,
+                p_condition=v_condition,
+                p_queue=p_queue,
+                p_fetch_mode=p_fetch_mode,
+                p_row_reader=p_row_reader,
+                p_compared_columns=p_compared_columns
+            )
+
+            continue
+
+        v_condition = get_filtered_condition(p_condition=get_key_condition(p_key=v_key, p_column_type_dict=p_column_type_dict, p_key_order_dict=p_key_order_dict, p_lower_bound=v_lower_bound, p_upper_bound=v_split), p_row_filter=p_row_filter)
+        v_left_checksum_1 = get_range_checksum(p_database=p_database_1, p_schema=p_schema, p_table=p_table, p_condition=v_condition, p_compared_columns=p_compared_columns)
+        v_left_checksum_2 = get_range_checksum(p_database=p_database_2, p_schema=p_schema, p_table=p_table, p_condition=v_condition, p_compared_columns=p_compared_columns)
+
+        #Checksums are additive, so the right half is derived from its parent without querying again
+        v_range_list.append((
+            v_split,
+            v_upper_bound,
+            (v_checksum_1[0] - v_left_checksum_1[0], v_checksum_1[1] - v_left_checksum_1[1]),
+            (v_checksum_2[0] - v_left_checksum_2[0], v_checksum_2[1] - v_left_checksum_2[1])
+        ))
+
+        v_range_list.append((v_lower_bound, v_split, v_left_checksum_1, v_left_checksum_2))
+
+
+def get_page_range_condition(p_page_range=None):
+    """Get SQL condition that restricts table records to the ones stored in a range of pages, by their "ctid". Scanned by a TID range scan in PostgreSQL 14 or later.
+    Records of a table may lie in different pages of each database, so ranges of a table without primary key are not compared on their own:
+    differences between their bucket checksums are summed before buckets are compared. See "utils.BucketChecksumStore".
+
+        Args:
+            p_page_range (list): the first page of the range, its last page, exclusive, or None if unbounded, and the number of ranges of the table. Defaults to None.
+                Notes: None means the whole table.
+
+        Returns:
+            str: the SQL condition.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if p_page_range is None:
+        return 'TRUE'
+
+    if not isinstance(p_page_range, list) or len(p_page_range) != 3:
+        raise custom_exceptions.InvalidParameterTypeException('"p_page_range" parameter must be None or a "list" instance with first page, last page and count.', p_page_range)
+
+    v_condition = "t.ctid >= '({p_page},0)'::TID".format(p_page=p_page_range[0])
+
+    if p_page_range[1] is not None:
+        v_condition += " AND t.ctid < '({p_page},0)'::TID".format(p_page=p_page_range[1])
+
+    return v_condition
+
+
+def get_multiset_bucket_count(p_row_count=None, p_block_size=None):
+    """Get number of hash buckets records of a table are grouped in when compared as a multiset, so each bucket holds a small part of a block.
+
+        Args:
+            p_row_count (int): estimated number of records of the table. Defaults to None.
+            p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
+
+        Returns:
+            int: the number of buckets.
+    """
+
+    return max(MULTISET_MIN_BUCKET_COUNT, -(-p_row_count * MULTISET_BUCKETS_PER_BLOCK // p_block_size))
+
+
+def get_bucket_expression(p_hash=None, p_bucket_count=None):
+    """Get SQL expression of the bucket a record belongs to, taken from bits of its hash not used by checksums.
+
+        Args:
+            p_hash (str): SQL expression of the record MD5 hash. Defaults to None.
+            p_bucket_count (int): number of buckets. Defaults to None.
+
+        Returns:
+            str: the SQL expression, that results in an integer between 0 and p_bucket_count - 1.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_hash, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_hash" parameter must be a "str" instance.', p_hash)
+
+    if not isinstance(p_bucket_count, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_bucket_count" parameter must be an "int" instance.', p_bucket_count)
+
+    if p_bucket_count < 1:
+        raise custom_exceptions.InvalidParameterValueException('"p_bucket_count" parameter must be a positive "int" instance.', p_bucket_count)
+
+    return "('x' || SUBSTR({p_hash}, 17, 8))::BIT(32)::BIGINT % {p_bucket_count}".format(
+        p_hash=p_hash,
+        p_bucket_count=p_bucket_count
+    )
+
+
+def get_bucket_checksum_sql(p_schema=None, p_table=None, p_bucket_count=None, p_condition=None, p_compared_columns=None):
+    """Get SQL query of order independent checksums of the table records, grouped in buckets by their hash. Computed in the database server
+    by a single scan, with no sort of records: just the checksums are ordered by bucket, so both databases can be merged while fetched.
+
+        Args:
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_bucket_count (int): number of buckets. Defaults to None.
+            p_condition (str): the SQL condition that restricts the compared records. Defaults to None.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+
+        Returns:
+            str: the query, which returns bucket numbers, records counts and records hashes sums, as in "get_range_checksum". Empty buckets are missing.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_schema, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_schema" parameter must be a "str" instance.', p_schema)
+
+    if not isinstance(p_table, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_table" parameter must be a "str" instance.', p_table)
+
+    if not isinstance(p_condition, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_condition" parameter must be a "str" instance.', p_condition)
+
+    return '''
+        SELECT {p_bucket} AS bucket,
+               COUNT(*) AS row_count,
+               SUM(('x' || SUBSTR(h.row_md5, 1, 16))::BIT(64)::BIGINT)::TEXT AS row_hash
+        FROM (
+            SELECT MD5({p_record}::TEXT) AS row_md5
+            FROM {p_schema}.{p_table} t
+            WHERE {p_condition}
+            --Keeps the hash from being computed again for each expression that uses it
+            OFFSET 0
+        ) h
+        GROUP BY 1
+        ORDER BY 1
+    '''.format(
+        p_record=get_record_expression(p_compared_columns=p_compared_columns, p_alias='t'),
+        p_bucket=get_bucket_expression(p_hash='h.row_md5', p_bucket_count=p_bucket_count),
+        p_schema=p_schema,
+        p_table=p_table,
+        p_condition=p_condition
+    )
+
+
+def get_bucket_groups(p_blocks=None):
+    """Generator of records of blocks grouped by bucket, that is their first column. Records must be ordered by bucket.
+
+        Args:
+            p_blocks (iterator): blocks of records. Each item is a Spartacus.Database.DataTable instance. Defaults to None.
+
+        Yields:
+            tuple: the bucket and the list of its records.
+    """
+
+    for v_bucket, v_rows in itertools.groupby((v_row for v_table in p_blocks for v_row in v_table.Rows), key=lambda v_row: v_row[0]):
+        yield (v_bucket, list(v_rows))
+
+
+def merge_bucket_groups(p_blocks_1=None, p_blocks_2=None):
+    """Generator of buckets of records of both databases, merged as they are fetched, so just a bucket of each database is kept in memory.
+    Records of both databases must be ordered by bucket, that is their first column.
+
+        Args:
+            p_blocks_1 (iterator): blocks of records of the first database. Each item is a Spartacus.Database.DataTable instance. Defaults to None.
+            p_blocks_2 (iterator): blocks of records of the second database. Each item is a Spartacus.Database.DataTable instance. Defaults to None.
+
+        Yields:
+            tuple: the bucket, the list of its records in the first database and the list of its records in the second database. Any list may be empty.
+    """
+
+    v_groups_1 = get_bucket_groups(p_blocks=p_blocks_1)
+    v_groups_2 = get_bucket_groups(p_blocks=p_blocks_2)
+    v_group_1 = next(v_groups_1, None)
+    v_group_2 = next(v_groups_2, None)
+
+    while v_group_1 is not None or v_group_2 is not None:
+        if v_group_2 is None or (v_group_1 is not None and v_group_1[0] < v_group_2[0]):
+            yield (v_group_1[0], v_group_1[1], [])
+            v_group_1 = next(v_groups_1, None)
+        elif v_group_1 is None or v_group_2[0] < v_group_1[0]:
+            yield (v_group_2[0], [], v_group_2[1])
+            v_group_2 = next(v_groups_2, None)
+        else:
+            yield (v_group_1[0], v_group_1[1], v_group_2[1])
+            v_group_1 = next(v_groups_1, None)
+            v_group_2 = next(v_groups_2, None)
+
+
+def compare_tables_data_buckets(p_database_1=None, p_database_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_column_type_dict=None, p_bucket_count=None, p_bucket_list=None, p_condition=None, p_queue=None, p_fetch_mode='thread', p_compared_columns=None):
+    """Used to compare, as multisets, the records of some hash buckets of a table. Both databases must be already opened.
+    All buckets are fetched by a single scan of each table, ordered by bucket, and compared a bucket at a time.
+    Records are counted by their hash, so no other order is needed, and each extra copy of a record is reported.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
+            p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (str): list of comma separated columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_bucket_count (int): number of buckets. Defaults to None.
+            p_bucket_list (list): list of buckets to be compared. Defaults to None.
+            p_condition (str): the SQL condition that restricts the compared records. Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
+            p_fetch_mode (str): how blocks of records are fetched. Check "utils.fetch_block_pair" for allowed values. Defaults to 'thread'.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_key, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "str" instance.', p_key)
+
+    if not isinstance(p_column_type_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_column_type_dict" parameter must be a "dict" instance.', p_column_type_dict)
+
+    if not isinstance(p_bucket_list, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_bucket_list" parameter must be a "list" instance.', p_bucket_list)
+
+    if not isinstance(p_condition, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_condition" parameter must be a "str" instance.', p_condition)
+
+    if not isinstance(p_queue, utils.QueueBuffer):
+        raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "utils.QueueBuffer" instance.', p_queue)
+
+    v_key = p_key.split(',')
+
+    #Wanted buckets are hashed by the database server, so the scan checks each record against them at once
+    v_sql = '''
+        SELECT r.*
+        FROM (
+            SELECT {p_bucket} AS data_comparer_bucket,
+                   h.*
+            FROM (
+                SELECT MD5({p_record}::TEXT) AS data_comparer_hash,
+                       {p_columns}
+                FROM {p_schema}.{p_table} t
+                WHERE {p_condition}
+                OFFSET 0
+            ) h
+        ) r
+        WHERE r.data_comparer_bucket IN (
+            SELECT UNNEST('{{{p_bucket_list}}}'::BIGINT[])
+        )
+        ORDER BY r.data_comparer_bucket
+    '''.format(
+        p_condition=p_condition,
+        p_record=get_record_expression(p_compared_columns=p_compared_columns, p_alias='t'),
+        p_columns=get_select_list(p_compared_columns=p_compared_columns, p_alias='t'),
+        p_schema=p_schema,
+        p_table=p_table,
+        p_bucket=get_bucket_expression(p_hash='h.data_comparer_hash', p_bucket_count=p_bucket_count),
+        p_bucket_list=','.join([str(v_bucket) for v_bucket in p_bucket_list])
+    )
+
+    v_blocks_1, v_blocks_2 = utils.fetch_block_pair(
+        p_database_1=p_database_1,
+        p_database_2=p_database_2,
+        p_sql=v_sql,
+        p_block_size=p_block_size,
+        p_fetch_mode=p_fetch_mode
+    )
+
+    try:
+        #First blocks are always fetched, even if empty, so they tell the columns of records
+        v_table_1 = next(v_blocks_1)
+        v_table_2 = next(v_blocks_2)
+        v_columns = v_table_2.Columns[2:]
+        v_templates = DmlTemplates(p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict)
+
+        for v_bucket, v_rows_1, v_rows_2 in merge_bucket_groups(p_blocks_1=itertools.chain([v_table_1], v_blocks_1), p_blocks_2=itertools.chain([v_table_2], v_blocks_2)):
+            #Records count in database 2 minus records count in database 1, by record hash
+            v_count_dict = {}
+            v_row_dict = {}
+
+            for v_rows, v_sign in [(v_rows_1, -1), (v_rows_2, 1)]:
+                for v_row in v_rows:
+                    v_hash = v_row[1]
+                    v_count_dict[v_hash] = v_count_dict.get(v_hash, 0) + v_sign
+
+                    if v_hash not in v_row_dict:
+                        v_row_dict[v_hash] = v_row[2:]
+
+            for v_hash, v_count in v_count_dict.items():
+                if v_count < 0:
+                    for v_index in range(-v_count):
+                        deleted_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=v_columns, p_row=v_row_dict[v_hash], p_key=v_key, p_templates=v_templates)
+                elif v_count > 0:
+                    for v_index in range(v_count):
+                        inserted_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=v_columns, p_row=v_row_dict[v_hash], p_key=v_key, p_templates=v_templates)
+    finally:
+        utils.close_blocks(p_blocks=v_blocks_1)
+        utils.close_blocks(p_blocks=v_blocks_2)
+
+
+def compare_tables_data_multiset(p_database_1=None, p_database_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_column_type_dict=None, p_key_order_dict=None, p_queue=None, p_fetch_mode='thread', p_row_reader='query', p_compared_columns=None, p_row_filter=None, p_page_range=None, p_bucket_count=None, p_bucket_store=None):
+    """Used to compare data of tables without primary key between databases, as multisets of records. Both databases must be already opened.
+    Records are grouped in small hash buckets, whose checksums are computed by a single scan of each table and merged as they are fetched.
+    Then buckets whose checksums differ are fetched by another single scan of each table and compared. Just records of those buckets are sorted, by bucket.
+    Big tables are split in ranges of pages, whose checksums are computed by different producers and summed before buckets are compared, by the last one of them.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
+            p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (str): list of comma separated columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
+            p_fetch_mode (str): how blocks of records are fetched. Check "utils.fetch_block_pair" for allowed values. Defaults to 'thread'.
+            p_row_reader (str): how records are read when compared row by row. Check "compare_tables_data" for allowed values. Defaults to 'query'.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+            p_row_filter (str): SQL predicate that restricts the compared records of the table, or None to compare all of them. Defaults to None.
+            p_page_range (list): the range of pages of the table whose checksums are computed. Check "get_page_range_condition". Defaults to None.
+            p_bucket_count (int): number of buckets, the same for every range of the table, or None to size them by the estimated number of records. Defaults to None.
+            p_bucket_store (multiprocessing.managers.BaseProxy): store of bucket checksums of ranges, required if "p_page_range" is given. Created from a "utils.QueueManager" instance. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_block_size, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_block_size" parameter must be an "int" instance.', p_block_size)
+
+    if p_page_range is not None and not isinstance(p_bucket_count, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_bucket_count" parameter must be an "int" instance when "p_page_range" is given.', p_bucket_count)
+
+    if p_page_range is not None and not isinstance(p_bucket_store, multiprocessing.managers.BaseProxy):
+        raise custom_exceptions.InvalidParameterTypeException('"p_bucket_store" parameter must be a "multiprocessing.managers.BaseProxy" instance when "p_page_range" is given.', p_bucket_store)
+
+    v_condition = get_filtered_condition(p_condition='TRUE', p_row_filter=p_row_filter)
+
+    #Estimated number of records in each database, used to size buckets by the bigger one. Just like the planner does, statistics are
+    #scaled to the current table size, as they may be stale after bulk loads. Tables never analyzed, or estimated empty, are counted
+    v_row_count_list = []
+
+    for v_database in [p_database_1, p_database_2]:
+        v_table = v_database.Query(
+            p_sql='''
+                SELECT (CASE WHEN c.reltuples > 0 AND c.relpages > 0
+                             THEN c.reltuples / c.relpages * CEIL(PG_RELATION_SIZE(c.oid) / CURRENT_SETTING('block_size')::NUMERIC)
+                             ELSE c.reltuples
+                        END)::BIGINT AS row_count
+                FROM pg_class c
+                WHERE c.oid = TO_REGCLASS('{p_name}')
+            '''.format(
+                p_name='{0}.{1}'.format(p_schema, p_table).replace("'", "''")
+            )
+        )
+
+        if len(v_table.Rows) == 0:
+            v_row_count_list.append(None)
+        elif int(v_table.Rows[0]['row_count']) <= 0:
+            v_row_count_list.append(int(v_database.Query(p_sql='SELECT COUNT(*) AS row_count FROM {p_schema}.{p_table}'.format(p_schema=p_schema, p_table=p_table)).Rows[0]['row_count']))
+        else:
+            v_row_count_list.append(int(v_table.Rows[0]['row_count']))
+
+    if v_row_count_list[0] is None:
+        #Table does not exist in database 1, so every record must be compared, just once by the first range
+        if p_page_range is not None and p_page_range[0] > 0:
+            return
+
+        compare_tables_data_rows(
+            p_database_1=p_database_1,
+            p_database_2=p_database_2,
+            p_block_size=p_block_size,
+            p_schema=p_schema,
+            p_table=p_table,
+            p_key=p_key,
+            p_column_type_dict=p_column_type_dict,
+            p_key_order_dict=p_key_order_dict,
+            p_condition='TRUE',
+            p_queue=p_queue,
+            p_fetch_mode=p_fetch_mode,
+            p_row_reader=p_row_reader,
+            p_compared_columns=p_compared_columns,
+            p_row_filter=p_row_filter
+        )
+
+        return
+
+    v_bucket_count = p_bucket_count if p_bucket_count is not None else get_multiset_bucket_count(p_row_count=max(v_row_count_list), p_block_size=p_block_size)
+
+    v_blocks_1, v_blocks_2 = utils.fetch_block_pair(
+        p_database_1=p_database_1,
+        p_database_2=p_database_2,
+        p_sql=get_bucket_checksum_sql(
+            p_schema=p_schema,
+            p_table=p_table,
+            p_bucket_count=v_bucket_count,
+            p_condition=get_filtered_condition(p_condition=get_page_range_condition(p_page_range=p_page_range), p_row_filter=p_row_filter),
+            p_compared_columns=p_compared_columns
+        ),
+        p_block_size=p_block_size,
+        p_fetch_mode=p_fetch_mode
+    )
+
+    #Just differences of buckets that differ are kept, as records count and hashes sum of database 2 minus the ones of database 1
+    try:
+        v_difference_dict = {}
+
+        for v_bucket, v_rows_1, v_rows_2 in merge_bucket_groups(p_blocks_1=v_blocks_1, p_blocks_2=v_blocks_2):
+            v_difference = (
+                sum([int(v_row['row_count']) for v_row in v_rows_2]) - sum([int(v_row['row_count']) for v_row in v_rows_1]),
+                sum([int(v_row['row_hash']) for v_row in v_rows_2]) - sum([int(v_row['row_hash']) for v_row in v_rows_1])
+            )
+
+            if v_difference != (0, 0):
+                v_difference_dict[v_bucket] = v_difference
+    finally:
+        utils.close_blocks(p_blocks=v_blocks_1)
+        utils.close_blocks(p_blocks=v_blocks_2)
+
+    if p_page_range is None:
+        v_bucket_list = sorted(v_difference_dict.keys())
+    else:
+        #Just the last range of the table to finish gets the buckets that differ in the whole table, and compares them
+        v_bucket_list = p_bucket_store.add(p_name='{0}.{1}'.format(p_schema, p_table), p_range_count=p_page_range[2], p_difference_dict=v_difference_dict)
+
+        if v_bucket_list is None:
+            return
+
+    if len(v_bucket_list) == 0:
+        return
+
+    compare_tables_data_buckets(
+        p_database_1=p_database_1,
+        p_database_2=p_database_2,
+        p_block_size=p_block_size,
+        p_schema=p_schema,
+        p_table=p_table,
+        p_key=p_key,
+        p_column_type_dict=p_column_type_dict,
+        p_bucket_count=v_bucket_count,
+        p_bucket_list=v_bucket_list,
+        p_condition=v_condition,
+        p_queue=p_queue,
+        p_fetch_mode=p_fetch_mode,
+        p_compared_columns=p_compared_columns
+    )
+
+
+def get_watermark(p_database=None, p_schema=None, p_table=None, p_column=None):
+    """Get the watermark of a table, that is the greatest value of its watermark column. The database must be already opened.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_column (str): the watermark column, like an update timestamp or a row version, that grows whenever a record changes. Defaults to None.
+
+        Returns:
+            tuple: the watermark value and its text representation, or None values if the table is empty.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_column, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_column" parameter must be a "str" instance.', p_column)
+
+    v_table = p_database.Query(
+        p_sql='''
+            SELECT MAX({p_column}) AS watermark,
+                   MAX({p_column})::TEXT AS watermark_text
+            FROM {p_schema}.{p_table}
+        '''.format(
+            p_column=p_column,
+            p_schema=p_schema,
+            p_table=p_table
+        )
+    )
+
+    return v_table.Rows[0]['watermark'], v_table.Rows[0]['watermark_text']
+
+
+def compare_tables_data_incremental(p_database_1=None, p_database_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_column_type_dict=None, p_key_order_dict=None, p_condition=None, p_watermark_column=None, p_watermark=None, p_queue=None, p_fetch_mode='thread', p_compared_columns=None, p_row_filter=None):
+    """Used to compare tables data records changed since a watermark between databases. Both databases must be already opened.
+    Keys of every record are fetched with a flag that tells if the record changed since the watermark. Full records are fetched just for keys
+    that changed in any database or that exist only in second database. Keys that exist only in first database are deleted without fetching them.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
+            p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_key (str): list of comma separated columns that form the table records key. Defaults to None.
+            p_column_type_dict (dict): key/value pairs of column names and their data types. Defaults to None.
+            p_key_order_dict (dict): how records are ordered by each key column, as returned by "get_key_order_dict". Defaults to None.
+            p_condition (str): the SQL condition that restricts the compared records. Defaults to None.
+            p_watermark_column (str): the watermark column. Check "get_watermark". Defaults to None.
+            p_watermark (str): text representation of the watermark of the last comparison. Records whose watermark column is greater or equal, as ties may have been committed after it was read, or NULL are compared. Defaults to None.
+            p_queue (utils.QueueBuffer): buffer of messages sent to parent process. Defaults to None.
+            p_fetch_mode (str): how blocks of records are fetched. Check "utils.fetch_block_pair" for allowed values. Defaults to 'thread'.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+            p_row_filter (str): SQL predicate that restricts the compared records of the table, or None to compare all of them. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_column_type_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_column_type_dict" parameter must be a "dict" instance.', p_column_type_dict)
+
+    if not isinstance(p_key_order_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key_order_dict" parameter must be a "dict" instance.', p_key_order_dict)
+
+    if not isinstance(p_condition, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_condition" parameter must be a "str" instance.', p_condition)
+
+    if not isinstance(p_watermark_column, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_watermark_column" parameter must be a "str" instance.', p_watermark_column)
+
+    if not isinstance(p_watermark, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_watermark" parameter must be a "str" instance.', p_watermark)
+
+    v_key = p_key.split(',')
+
+    v_sql = '''
+        SELECT {p_columns},
+               COALESCE(t.{p_watermark_column} >= {p_watermark}, TRUE) AS data_comparer_changed
+        FROM {p_schema}.{p_table} t
+        WHERE {p_condition}
+        ORDER BY {p_order}
+    '''.format(
+        p_columns=','.join([
+            't.{p_column}'.format(p_column=v_column)
+            for v_column in v_key
+        ]),
+        p_watermark_column=p_watermark_column,
+        p_watermark=get_sql_value(p_value=p_watermark, p_type=p_column_type_dict[p_watermark_column]),
+        p_schema=p_schema,
+        p_table=p_table,
+        p_condition=get_filtered_condition(p_condition=p_condition, p_row_filter=p_row_filter),
+        p_order=','.join(get_key_expression_list(p_key=v_key, p_key_order_dict=p_key_order_dict))
+    )
+
+    #Blocks are not prefetched by threads, as changed records are fetched through the same connections while comparing.
+    #Asynchronous fetching is fine, as it has connections of its own
+    v_blocks_1, v_blocks_2 = utils.fetch_block_pair(
+        p_database_1=p_database_1,
+        p_database_2=p_database_2,
+        p_sql=v_sql,
+        p_block_size=p_block_size,
+        p_fetch_mode='asyncio' if p_fetch_mode == 'asyncio' else 'serial'
+    )
+
+    try:
+        v_table_1 = next(v_blocks_1)
+    except Spartacus.Database.Exception:
+        #Table does not exist in database 1, so every record must be fetched anyway
+        v_blocks_2.close()
+
+        compare_tables_data_rows(
+            p_database_1=p_database_1,
+            p_database_2=p_database_2,
+            p_block_size=p_block_size,
+            p_schema=p_schema,
+            p_table=p_table,
+            p_key=p_key,
+            p_column_type_dict=p_column_type_dict,
+            p_key_order_dict=p_key_order_dict,
+            p_condition=p_condition,
+            p_queue=p_queue,
+            p_fetch_mode=p_fetch_mode,
+            p_compared_columns=p_compared_columns,
+            p_row_filter=p_row_filter
+        )
+
+        return
+
+    try:
+        v_table_2 = next(v_blocks_2)
+        v_key_list = []
+
+        def add_key(p_columns=None, p_row=None):
+            v_key_list.append(tuple(p_row[0:len(v_key)]))
+
+            #Full records are fetched by batches, while keys are still being streamed
+            if len(v_key_list) >= p_block_size:
+                compare_tables_data_key_list(
+                    p_database_1=p_database_1,
+                    p_database_2=p_database_2,
+                    p_schema=p_schema,
+                    p_table=p_table,
+                    p_key=p_key,
+                    p_column_type_dict=p_column_type_dict,
+                    p_key_order_dict=p_key_order_dict,
+                    p_key_list=v_key_list,
+                    p_queue=p_queue,
+                    p_compared_columns=p_compared_columns,
+                    p_row_filter=p_row_filter
+                )
+
+                v_key_list.clear()
+
+        def add_changed_key(p_columns=None, p_row=None):
+            if p_row[len(v_key)]:
+                add_key(p_columns=p_columns, p_row=p_row)
+
+        v_templates = DmlTemplates(p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict)
+
+        utils.compare_blocks(
+            p_blocks_1=itertools.chain([v_table_1], v_blocks_1),
+            p_blocks_2=itertools.chain([v_table_2], v_blocks_2),
+            p_key=v_key,
+            p_inserted_callback=lambda p_columns, p_row, p_key: add_key(p_columns=p_columns, p_row=p_row),
+            #Flags differ, so the record changed just in one of the databases
+            p_updated_callback=lambda p_columns, p_row_1, p_row_2, p_key, p_all_diffs: add_key(p_columns=p_columns, p_row=p_row_2),
+            #Key is enough to build the delete statement
+            p_deleted_callback=lambda p_columns, p_row, p_key: deleted_callback(p_queue=p_queue, p_schema=p_schema, p_table=p_table, p_column_type_dict=p_column_type_dict, p_columns=p_columns, p_row=p_row, p_key=p_key, p_templates=v_templates),
+            p_equal_callback=lambda p_columns, p_row, p_key: add_changed_key(p_columns=p_columns, p_row=p_row),
+            p_sort_key_dict=get_sort_key_dict(p_key_order_dict=p_key_order_dict)
+        )
+    finally:
+        utils.close_blocks(p_blocks=v_blocks_1)
+        utils.close_blocks(p_blocks=v_blocks_2)
+
+    compare_tables_data_key_list(
+        p_database_1=p_database_1,
+        p_database_2=p_database_2,
+        p_schema=p_schema,
+        p_table=p_table,
+        p_key=p_key,
+        p_column_type_dict=p_column_type_dict,
+        p_key_order_dict=p_key_order_dict,
+        p_key_list=v_key_list,
+        p_queue=p_queue,
+        p_compared_columns=p_compared_columns,
+        p_row_filter=p_row_filter
+    )
 
-def compare_tables_data(p_database_1=None, p_database_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_queue=None, p_is_sending_data_array=None, p_worker_index=None):
+
+def compare_tables_data(p_database_1=None, p_database_2=None, p_block_size=None, p_schema=None, p_table=None, p_key=None, p_queue=None, p_worker_index=None, p_comparison_mode='rows', p_lower_bound=None, p_upper_bound=None, p_fetch_mode='thread', p_row_reader='query', p_dml_batch_rows=1, p_data_format='statements', p_compared_columns=None, p_row_filter=None, p_watermark_column=None, p_watermark=None, p_page_range=None, p_bucket_count=None, p_bucket_store=None):
     """Used to compare tables data between databases.
 
         Args:
@@ -18,14 +2430,44 @@ def compare_tables_data(p_database_1=None, p_database_2=None, p_block_size=None,
             p_table (str): the table name. Defaults to None.
             p_key (str): list of comma separated columns that form the table records key. Defaults to None.
             p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
-            p_is_sending_data_array (multiprocessing.managers.ArrayProxy): array used to control process that are still sending data. Defaults to None.
             p_worker_index (int): the worker sub process index. Defaults to None.
+            p_comparison_mode (str): how tables data is compared. Defaults to 'rows'.
+                Notes: must be one of:
+                    - rows: every record is fetched from both databases and compared.
+                    - checksum: databases compute checksums of key ranges, and just ranges that differ are fetched and compared.
+                    - hash: keys and hashes of every record are fetched and compared, and just records that differ are fetched.
+                    - multiset: for tables without primary key. Databases compute checksums of hash buckets, and just buckets that differ are fetched and compared.
+            p_lower_bound (list): key values, as text, of the compared range lower bound, inclusive. Defaults to None.
+                Notes: None means the range has no lower bound.
+            p_upper_bound (list): key values, as text, of the compared range upper bound, exclusive. Defaults to None.
+                Notes: None means the range has no upper bound.
+            p_fetch_mode (str): how blocks of records are fetched. Check "utils.fetch_block_pair" for allowed values. Defaults to 'thread'.
+            p_row_reader (str): how records are read when compared row by row. Defaults to 'query'.
+                Notes: must be one of:
+                    - query: records are fetched by blocks through a cursor, as set by "p_fetch_mode".
+                    - copy: records are streamed by "COPY ... TO STDOUT" in text format, and just decoded when they differ. See "copy_fetch.compare_copy_streams".
+            p_dml_batch_rows (int): maximum number of inserted or deleted records of each reported statement. Defaults to 1.
+                Notes: 1 reports a statement for each record. Greater values group consecutive records in multi-row INSERT and keyed IN-list DELETE statements.
+            p_data_format (str): how differences are reported. Defaults to 'statements'.
+                Notes: must be one of:
+                    - statements: as SQL statements, grouped as set by "p_dml_batch_rows".
+                    - patch: as images of changed records in COPY text format, to be applied by a patch script. See "PatchBuffer". "p_dml_batch_rows" is ignored.
+            p_compared_columns (str): list of comma separated columns that are compared. All columns are compared if None. Defaults to None.
+            p_row_filter (str): SQL predicate that restricts the compared records of the table, or None to compare all of them. Defaults to None.
+            p_watermark_column (str): the watermark column of the table. Check "get_watermark". Defaults to None.
+            p_watermark (str): text representation of the watermark of the last comparison, or None to compare all records. Defaults to None.
+                Notes: if given, just records changed since the watermark are compared, whatever "p_comparison_mode" is. See "compare_tables_data_incremental".
+            p_page_range (list): the range of pages of the table whose bucket checksums are computed, when "p_comparison_mode" is multiset. Check "get_page_range_condition". Defaults to None.
+            p_bucket_count (int): number of buckets of every range of the table, when "p_page_range" is given. Defaults to None.
+            p_bucket_store (multiprocessing.managers.BaseProxy): store of bucket checksums of ranges, when "p_page_range" is given. Check "utils.BucketChecksumStore". Defaults to None.
 
         Raises:
             custom_exceptions.InvalidParameterTypeException.
             custom_exceptions.InvalidParameterValueException.
     """
 
+    v_queue_buffer = None
+
     try:
         if not isinstance(p_database_1, Spartacus.Database.PostgreSQL):
             raise custom_exceptions.InvalidParameterTypeException('"p_database_1" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database_1)
@@ -51,313 +2493,258 @@ def compare_tables_data(p_database_1=None, p_database_2=None, p_block_size=None,
         if not isinstance(p_queue, multiprocessing.managers.BaseProxy):
             raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "multiprocessing.managers.BaseProxy" instance.', p_queue)
 
-        if not isinstance(p_is_sending_data_array, multiprocessing.managers.ArrayProxy):
-            raise custom_exceptions.InvalidParameterTypeException('"p_is_sending_data_array" parameter must be an "multiprocessing.managers.ArrayProxy" instance.', p_is_sending_data_array)
-
         if not isinstance(p_worker_index, int):
             raise custom_exceptions.InvalidParameterTypeException('"p_worker_index" parameter must be an "int" instance.', p_worker_index)
 
         if p_worker_index < 0:
             raise custom_exceptions.InvalidParameterTypeException('"p_worker_index" parameter must be an "int" instance greater than or equal to 0.', p_worker_index)
 
+        if p_comparison_mode not in COMPARISON_MODE_LIST + KEYLESS_COMPARISON_MODE_LIST:
+            raise custom_exceptions.InvalidParameterValueException('"p_comparison_mode" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(COMPARISON_MODE_LIST + ['multiset'])), p_comparison_mode)
+
+        if p_lower_bound is not None and not isinstance(p_lower_bound, list):
+            raise custom_exceptions.InvalidParameterTypeException('"p_lower_bound" parameter must be a "list" instance.', p_lower_bound)
+
+        if p_upper_bound is not None and not isinstance(p_upper_bound, list):
+            raise custom_exceptions.InvalidParameterTypeException('"p_upper_bound" parameter must be a "list" instance.', p_upper_bound)
+
+        if p_fetch_mode not in utils.FETCH_MODE_LIST:
+            raise custom_exceptions.InvalidParameterValueException('"p_fetch_mode" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(utils.FETCH_MODE_LIST)), p_fetch_mode)
+
+        if p_row_reader not in ROW_READER_LIST:
+            raise custom_exceptions.InvalidParameterValueException('"p_row_reader" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(ROW_READER_LIST)), p_row_reader)
+
+        if not isinstance(p_dml_batch_rows, int):
+            raise custom_exceptions.InvalidParameterTypeException('"p_dml_batch_rows" parameter must be an "int" instance.', p_dml_batch_rows)
+
+        if p_dml_batch_rows < 1:
+            raise custom_exceptions.InvalidParameterValueException('"p_dml_batch_rows" parameter must be a positive "int" instance.', p_dml_batch_rows)
+
+        if p_data_format not in DATA_FORMAT_LIST:
+            raise custom_exceptions.InvalidParameterValueException('"p_data_format" parameter must be one between: {p_formats}.'.format(p_formats=', '.join(DATA_FORMAT_LIST)), p_data_format)
+
+        if p_watermark_column is not None and not isinstance(p_watermark_column, str):
+            raise custom_exceptions.InvalidParameterTypeException('"p_watermark_column" parameter must be a "str" instance.', p_watermark_column)
+
+        if p_watermark is not None and not isinstance(p_watermark, str):
+            raise custom_exceptions.InvalidParameterTypeException('"p_watermark" parameter must be a "str" instance.', p_watermark)
+
+        if p_page_range is not None and not isinstance(p_page_range, list):
+            raise custom_exceptions.InvalidParameterTypeException('"p_page_range" parameter must be None or a "list" instance.', p_page_range)
+
+        if p_data_format == 'patch':
+            v_queue_buffer = PatchBuffer(p_queue=p_queue, p_block_size=p_block_size)
+        elif p_dml_batch_rows > 1:
+            v_queue_buffer = DmlBatchBuffer(p_queue=p_queue, p_block_size=p_block_size, p_batch_rows=p_dml_batch_rows)
+        else:
+            v_queue_buffer = utils.QueueBuffer(p_queue=p_queue, p_block_size=p_block_size)
+
         p_database_1.Open(p_autocommit=False)
         p_database_2.Open(p_autocommit=False)
 
-        #Get columns types
-        v_table = p_database_2.Query(
-            p_sql='''
-                SELECT column_name,
-                       FORMAT(
-                           '%s %s',
-                           data_type,
-                           (CASE WHEN character_maximum_length IS NOT NULL
-                                 THEN FORMAT(
-                                          '(%s)',
-                                          character_maximum_length
-                                      )
-                                 WHEN numeric_precision IS NOT NULL AND NULLIF(numeric_scale, 0) IS NOT NULL
-                                 THEN FORMAT(
-                                          '(%s, %s)',
-                                          numeric_precision,
-                                          numeric_scale
-                                      )
-                                 ELSE ''
-                            END)
-                       ) AS data_type
-                FROM information_schema.columns
-                WHERE table_schema = '{p_schema}'
-                  AND table_name = '{p_table}'
-            '''.format(
+        v_column_type_dict = get_column_type_dict(p_database=p_database_2, p_schema=p_schema, p_table=p_table)
+        v_key_order_dict = get_key_order_dict(p_database_1=p_database_1, p_database_2=p_database_2, p_schema=p_schema, p_table=p_table, p_key=p_key.split(','))
+
+        if p_watermark_column is not None and p_watermark is not None:
+            compare_tables_data_incremental(
+                p_database_1=p_database_1,
+                p_database_2=p_database_2,
+                p_block_size=p_block_size,
                 p_schema=p_schema,
-                p_table=p_table
+                p_table=p_table,
+                p_key=p_key,
+                p_column_type_dict=v_column_type_dict,
+                p_key_order_dict=v_key_order_dict,
+                p_condition=get_key_condition(
+                    p_key=p_key.split(','),
+                    p_column_type_dict=v_column_type_dict,
+                    p_key_order_dict=v_key_order_dict,
+                    p_lower_bound=p_lower_bound,
+                    p_upper_bound=p_upper_bound
+                ),
+                p_watermark_column=p_watermark_column,
+                p_watermark=p_watermark,
+                p_queue=v_queue_buffer,
+                p_fetch_mode=p_fetch_mode,
+                p_compared_columns=p_compared_columns,
+                p_row_filter=p_row_filter
             )
-        )
+        elif p_comparison_mode == 'multiset':
+            compare_tables_data_multiset(
+                p_database_1=p_database_1,
+                p_database_2=p_database_2,
+                p_block_size=p_block_size,
+                p_schema=p_schema,
+                p_table=p_table,
+                p_key=p_key,
+                p_column_type_dict=v_column_type_dict,
+                p_key_order_dict=v_key_order_dict,
+                p_queue=v_queue_buffer,
+                p_fetch_mode=p_fetch_mode,
+                p_row_reader=p_row_reader,
+                p_compared_columns=p_compared_columns,
+                p_row_filter=p_row_filter,
+                p_page_range=p_page_range,
+                p_bucket_count=p_bucket_count,
+                p_bucket_store=p_bucket_store
+            )
+        elif p_comparison_mode == 'checksum':
+            compare_tables_data_checksum(
+                p_database_1=p_database_1,
+                p_database_2=p_database_2,
+                p_block_size=p_block_size,
+                p_schema=p_schema,
+                p_table=p_table,
+                p_key=p_key,
+                p_column_type_dict=v_column_type_dict,
+                p_key_order_dict=v_key_order_dict,
+                p_lower_bound=p_lower_bound,
+                p_upper_bound=p_upper_bound,
+                p_queue=v_queue_buffer,
+                p_fetch_mode=p_fetch_mode,
+                p_row_reader=p_row_reader,
+                p_compared_columns=p_compared_columns,
+                p_row_filter=p_row_filter
+            )
+        else:
+            v_function = compare_tables_data_hash if p_comparison_mode == 'hash' else compare_tables_data_rows
 
-        v_column_type_dict = {}
+            v_function(
+                p_database_1=p_database_1,
+                p_database_2=p_database_2,
+                p_block_size=p_block_size,
+                p_schema=p_schema,
+                p_table=p_table,
+                p_key=p_key,
+                p_column_type_dict=v_column_type_dict,
+                p_key_order_dict=v_key_order_dict,
+                p_condition=get_key_condition(
+                    p_key=p_key.split(','),
+                    p_column_type_dict=v_column_type_dict,
+                    p_key_order_dict=v_key_order_dict,
+                    p_lower_bound=p_lower_bound,
+                    p_upper_bound=p_upper_bound
+                ),
+                p_queue=v_queue_buffer,
+                p_fetch_mode=p_fetch_mode,
+                p_row_reader=p_row_reader,
+                p_compared_columns=p_compared_columns,
+                p_row_filter=p_row_filter
+            )
 
-        for v_row in v_table.Rows:
-            v_column_type_dict[v_row['column_name']] = v_row['data_type']
+        p_database_1.Close(p_commit=False)
+        p_database_2.Close(p_commit=False)
+    finally:
+        if v_queue_buffer is not None:
+            v_queue_buffer.flush()
 
-        #Prepare table query SQL
-        v_sql = '''
-            SELECT *
-            FROM {p_schema}.{p_table}
-            ORDER BY {p_order}
-        '''.format(
-            p_schema=p_schema,
-            p_table=p_table,
-            p_order=p_key
+
+def match_column_pattern(p_pattern=None, p_schema=None, p_table=None, p_column=None):
+    """Check if a column matches a pattern of column include or exclude lists. Names are matched as quoted by QUOTE_IDENT, with shell-style wildcards.
+
+        Args:
+            p_pattern (str): the pattern. Defaults to None.
+                Notes: must be one of:
+                    - column: matches columns of any table.
+                    - table.column: matches columns of a table of public schema.
+                    - schema.table.column: matches columns of a table of a given schema.
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_column (str): the column name. Just schema and table are matched if None. Defaults to None.
+
+        Returns:
+            bool: True if the column matches.
+    """
+
+    v_part_list = p_pattern.split('.')
+
+    if len(v_part_list) == 1:
+        v_part_list = ['*', '*'] + v_part_list
+    elif len(v_part_list) == 2:
+        v_part_list = ['public'] + v_part_list
+
+    return all([
+        fnmatch.fnmatchcase(v_name, v_part)
+        for v_name, v_part in zip([p_schema, p_table, p_column], v_part_list)
+        if v_name is not None
+    ])
+
+
+def get_compared_columns(p_schema=None, p_table=None, p_columns=None, p_key=None, p_include_columns=None, p_exclude_columns=None):
+    """Get columns of a table that are compared, according to column include and exclude lists. Key columns are always compared.
+
+        Args:
+            p_schema (str): the schema name. Defaults to None.
+            p_table (str): the table name. Defaults to None.
+            p_columns (list): list of all columns of the table, in their order. Defaults to None.
+            p_key (list): list of columns that form the table records key. Defaults to None.
+            p_include_columns (list): patterns of columns to be compared. If any pattern applies to the table, just the matching columns are compared. Check "match_column_pattern". Defaults to None.
+            p_exclude_columns (list): patterns of columns not to be compared. Check "match_column_pattern". Defaults to None.
+
+        Returns:
+            list: list of compared columns, in table order.
+    """
+
+    v_include_list = [
+        v_pattern
+        for v_pattern in p_include_columns or []
+        if match_column_pattern(p_pattern=v_pattern, p_schema=p_schema, p_table=p_table)
+    ]
+
+    return [
+        v_column
+        for v_column in p_columns
+        if v_column in p_key or (
+            (len(v_include_list) == 0 or any([match_column_pattern(p_pattern=v_pattern, p_schema=p_schema, p_table=p_table, p_column=v_column) for v_pattern in v_include_list]))
+            and not any([match_column_pattern(p_pattern=v_pattern, p_schema=p_schema, p_table=p_table, p_column=v_column) for v_pattern in p_exclude_columns or []])
         )
+    ]
 
-        #Query first block of table in each database
-        v_table_1 = None
-        v_table_2 = p_database_2.QueryBlock(p_sql=v_sql, p_blocksize=p_block_size)
 
-        try:
-            v_table_1 = p_database_1.QueryBlock(p_sql=v_sql, p_blocksize=p_block_size)
-        except Spartacus.Database.Exception:
-            #Table does not exist in database 1, let's create a fake one just for comparison
-            v_table_1 = Spartacus.Database.DataTable()
+def split_table_name(p_name=None):
+    """Split a table name as given in command line options in its schema and table names.
 
-            for v_column in v_table_2.Columns:
-                v_table_1.AddColumn(p_columnname=v_column)
+        Args:
+            p_name (str): the table name, as "schema.table" or just "table" for tables of public schema. Defaults to None.
 
-        if v_table_1.Columns != v_table_2.Columns:
-            raise Exception('Cannot compare table with different columns: {p_schema}.{p_table}.'.format(p_schema=p_schema, p_table=p_table))
+        Returns:
+            tuple: schema and table names.
+    """
 
-        #Set comparison key
-        v_key = p_key.split(',')
-
-        v_has_more_data_1 = True
-        v_has_more_data_2 = True
-        v_index_1 = 0
-        v_index_2 = 0
-
-        #Main loop, compare tables data
-        while v_has_more_data_1 or v_has_more_data_2:
-            while v_index_1 < len(v_table_1.Rows) and v_index_2 < len(v_table_2.Rows):
-                v_row_1 = v_table_1.Rows[v_index_1]
-                v_row_2 = v_table_2.Rows[v_index_2]
-
-                v_record_1_pk = '_'.join(
-                    [
-                        str(v_row_1[v_column])
-                        for v_column in v_key
-                    ]
-                )
+    if '.' in p_name:
+        return tuple(p_name.split('.', 1))
 
-                v_record_2_pk = '_'.join(
-                    [
-                        str(v_row_2[v_column])
-                        for v_column in v_key
-                    ]
-                )
+    return ('public', p_name)
 
-                #Record in both databases
-                if v_record_1_pk == v_record_2_pk:
-                    v_all_match = True
-                    v_output_row = []
-                    v_all_diffs = []
-
-                    for v_column in v_table_1.Columns:
-                        if not v_table_1.Equal(v_row_1[v_column], v_row_2[v_column]):
-                            v_all_diffs.append({
-                                'column': v_column,
-                                'old_value': v_row_1[v_column],
-                                'new_value': v_row_2[v_column]
-                            })
-                            v_all_match = False
-
-                    if not v_all_match:
-                        p_queue.put({
-                            'type': 'tables_data',
-                            'row': {
-                                'schema_name': p_schema,
-                                'table_name': p_table,
-                                'status': 'UPDATED',
-                                'sql': inspect.cleandoc(
-                                    doc='''\
-                                        UPDATE {p_schema}.{p_table}
-                                        SET {p_set}
-                                        WHERE {p_condition};
-                                    '''.format(
-                                        p_schema=p_schema,
-                                        p_table=p_table,
-                                        p_set=','.join([
-                                            '{p_column} = {p_value}::{p_type}'.format(
-                                                p_column=v_diff['column'],
-                                                p_value='$data_comparer${p_value}$data_comparer$'.format(p_value=str(v_diff['new_value'])) if v_diff['new_value'] is not None else 'NULL',
-                                                p_type=v_column_type_dict[v_diff['column']]
-                                            )
-                                            for v_diff in v_all_diffs
-                                        ]),
-                                        p_condition=' AND '.join([
-                                            '{p_column} = {p_value}::{p_type}'.format(
-                                                p_column=v_column,
-                                                p_value='$data_comparer${p_value}$data_comparer$'.format(p_value=str(v_row_2[v_column])) if v_row_2[v_column] is not None else 'NULL',
-                                                p_type=v_column_type_dict[v_column]
-                                            )
-                                            for v_column in v_key
-                                        ])
-                                    )
-                                )
-                            }
-                        })
-
-                    v_index_1 += 1
-                    v_index_2 += 1
-                #Record was deleted from second database
-                elif v_record_1_pk < v_record_2_pk:
-                    p_queue.put({
-                        'type': 'tables_data',
-                        'row': {
-                            'schema_name': p_schema,
-                            'table_name': p_table,
-                            'status': 'DELETED',
-                            'sql': inspect.cleandoc(
-                                doc='''\
-                                    DELETE
-                                    FROM {p_schema}.{p_table}
-                                    WHERE {p_condition};
-                                '''.format(
-                                    p_schema=p_schema,
-                                    p_table=p_table,
-                                    p_condition=' AND '.join([
-                                        '{p_column} = {p_value}::{p_type}'.format(
-                                            p_column=v_column,
-                                            p_value='$data_comparer${p_value}$data_comparer$'.format(p_value=str(v_row_1[v_column])) if v_row_1[v_column] is not None else 'NULL',
-                                            p_type=v_column_type_dict[v_column]
-                                        )
-                                        for v_column in v_key
-                                    ])
-                                )
-                            )
-                        }
-                    })
-
-                    v_index_1 += 1
-                #Record was inserted into second database
-                else:
-                    p_queue.put({
-                        'type': 'tables_data',
-                        'row': {
-                            'schema_name': p_schema,
-                            'table_name': p_table,
-                            'status': 'INSERTED',
-                            'sql': inspect.cleandoc(
-                                doc='''\
-                                    INSERT INTO {p_schema}.{p_table} (
-                                        {p_columns}
-                                    ) VALUES (
-                                        {p_values}
-                                    );
-                                '''.format(
-                                    p_schema=p_schema,
-                                    p_table=p_table,
-                                    p_columns=','.join(v_table_2.Columns),
-                                    p_values=','.join([
-                                        '{p_value}::{p_type}'.format(
-                                            p_value='$data_comparer${p_value}$data_comparer$'.format(p_value=str(v_row_2[v_column])) if v_row_2[v_column] is not None else 'NULL',
-                                            p_type=v_column_type_dict[v_column]
-                                        )
-                                        for v_column in v_table_2.Columns
-                                    ])
-                                )
-                            )
-                        }
-                    })
-
-                    v_index_2 += 1
-
-            v_has_more_data_1 = not p_database_1.v_start
-            v_has_more_data_2 = not p_database_2.v_start
-
-            if not v_has_more_data_1:
-                #Data fetch finished on first database, so let's insert remaining rows of table 2, if any
-                while v_index_2 < len(v_table_2.Rows):
-                    v_row_2 = v_table_2.Rows[v_index_2]
-
-                    p_queue.put({
-                        'type': 'tables_data',
-                        'row': {
-                            'schema_name': p_schema,
-                            'table_name': p_table,
-                            'status': 'INSERTED',
-                            'sql': inspect.cleandoc(
-                                doc='''\
-                                    INSERT INTO {p_schema}.{p_table} (
-                                        {p_columns}
-                                    ) VALUES (
-                                        {p_values}
-                                    );
-                                '''.format(
-                                    p_schema=p_schema,
-                                    p_table=p_table,
-                                    p_columns=','.join(v_table_2.Columns),
-                                    p_values=','.join([
-                                        '{p_value}::{p_type}'.format(
-                                            p_value='$data_comparer${p_value}$data_comparer$'.format(p_value=str(v_row_2[v_column])) if v_row_2[v_column] is not None else 'NULL',
-                                            p_type=v_column_type_dict[v_column]
-                                        )
-                                        for v_column in v_table_2.Columns
-                                    ])
-                                )
-                            )
-                        }
-                    })
-
-                    v_index_2 += 1
-
-            if not v_has_more_data_2:
-                #Data fetch finished on second database, so let's insert remaining rows of table 1, if any
-                while v_index_1 < len(v_table_1.Rows):
-                    v_row_1 = v_table_1.Rows[v_index_1]
-
-                    p_queue.put({
-                        'type': 'tables_data',
-                        'row': {
-                            'schema_name': p_schema,
-                            'table_name': p_table,
-                            'status': 'DELETED',
-                            'sql': inspect.cleandoc(
-                                doc='''\
-                                    DELETE
-                                    FROM {p_schema}.{p_table}
-                                    WHERE {p_condition};
-                                '''.format(
-                                    p_schema=p_schema,
-                                    p_table=p_table,
-                                    p_condition=' AND '.join([
-                                        '{p_column} = {p_value}::{p_type}'.format(
-                                            p_column=v_column,
-                                            p_value='$data_comparer${p_value}$data_comparer$'.format(p_value=str(v_row_1[v_column])) if v_row_1[v_column] is not None else 'NULL',
-                                            p_type=v_column_type_dict[v_column]
-                                        )
-                                        for v_column in v_key
-                                    ])
-                                )
-                            )
-                        }
-                    })
 
-                    v_index_1 += 1
+def get_table_option_dict(p_items=None, p_parameter=None):
+    """Get values of a per table option from its items.
 
-            if v_index_1 == len(v_table_1.Rows) and v_has_more_data_1:
-                v_table_1 = p_database_1.QueryBlock(p_sql=v_sql, p_blocksize=p_block_size)
-                v_index_1 = 0
+        Args:
+            p_items (list): list of items, each one as "[schema.]table=value". Defaults to None.
+            p_parameter (str): name of the parameter the items come from, used in error messages. Defaults to None.
 
-            if v_index_2 == len(v_table_2.Rows) and v_has_more_data_2:
-                v_table_2 = p_database_2.QueryBlock(p_sql=v_sql, p_blocksize=p_block_size)
-                v_index_2 = 0
+        Returns:
+            dict: value of each table, keyed by schema and table names tuple.
 
-        p_database_1.Close(p_commit=False)
-        p_database_2.Close(p_commit=False)
-    finally:
-        p_queue.put(None)
-        p_is_sending_data_array[p_worker_index] = False
+        Raises:
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    v_option_dict = {}
+
+    for v_item in p_items or []:
+        v_name, v_separator, v_value = v_item.partition('=')
+
+        if v_separator == '' or v_name.strip() == '' or v_value.strip() == '':
+            raise custom_exceptions.InvalidParameterValueException('"{p_parameter}" parameter items must be in the form "[schema.]table=value".'.format(p_parameter=p_parameter), v_item)
 
+        v_option_dict[split_table_name(p_name=v_name.strip())] = v_value.strip()
 
-def get_compare_tables_data_tasks(p_database_1=None, p_database_2=None, p_block_size=None, p_exclude_tables=None):
+    return v_option_dict
+
+
+def get_compare_tables_data_tasks(p_database_1=None, p_database_2=None, p_block_size=None, p_exclude_tables=None, p_comparison_mode='rows', p_split_rows=0, p_keyless_comparison_mode='rows', p_row_reader='query', p_dml_batch_rows=1, p_data_format='statements', p_include_columns=None, p_exclude_columns=None, p_table_filters=None, p_watermark_columns=None, p_watermark_dict=None):
     """Get list of tasks that will compare tables data between databases.
 
         Args:
@@ -365,12 +2752,33 @@ def get_compare_tables_data_tasks(p_database_1=None, p_database_2=None, p_block_
             p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
             p_block_size (int): Number of data records that the comparer will deal with at the same time. Defaults to None.
             p_exclude_tables (list): list of table to be excluded from tables data comparison process. Defaults to None.
+            p_comparison_mode (str): how tables data is compared. Check "compare_tables_data" for allowed values. Defaults to 'rows'.
+            p_split_rows (int): tables estimated to hold more records than this are split in key ranges of about this size, each one compared by a different task. Defaults to 0.
+                Notes: 0 means tables are never split.
+            p_keyless_comparison_mode (str): how data of tables without primary key is compared. Defaults to 'rows'.
+                Notes: must be one of:
+                    - rows: as any other table, using all columns as key.
+                    - multiset: see "compare_tables_data". Such tables are split in ranges of pages instead of key ranges. See "get_page_range_condition".
+            p_row_reader (str): how records are read when compared row by row. Check "compare_tables_data" for allowed values. Defaults to 'query'.
+            p_dml_batch_rows (int): maximum number of inserted or deleted records of each reported statement. Check "compare_tables_data". Defaults to 1.
+            p_data_format (str): how differences are reported. Check "compare_tables_data" for allowed values. Defaults to 'statements'.
+            p_include_columns (list): patterns of columns to be compared. Check "get_compared_columns". Defaults to None.
+            p_exclude_columns (list): patterns of columns not to be compared. Check "get_compared_columns". Defaults to None.
+                Notes: tables without primary key are keyed by their compared columns.
+            p_table_filters (list): row filters of tables, each one as "[schema.]table=predicate". Just records matching the predicate are compared in both databases. Defaults to None.
+            p_watermark_columns (list): watermark columns of tables, each one as "[schema.]table=column". Check "get_watermark". Defaults to None.
+                Notes: tables without primary key compared as multisets have no watermark.
+            p_watermark_dict (dict): text representation of the watermarks of the last comparison, keyed by schema, table and watermark column names tuple.
+                Records of tables with a watermark are compared incrementally. See "compare_tables_data_incremental". Defaults to None.
 
         Returns:
             list: list of tasks to be executed in a process pool. Each item is a dict instance with following strucutre:
                 {
                     'function' (function): the function to be executed.
                     'kwds': keyworded args to be passed to the function.
+                    'cost' (int): estimated cost of the task, in table pages, used to schedule larger tasks first.
+                    'watermark' (dict): just for tables with a watermark column. Watermark to be saved once every task of the table succeeds,
+                        with 'schema_name', 'table_name', 'column_name' and 'watermark' keys.
                 }
 
         Raises:
@@ -393,6 +2801,48 @@ def get_compare_tables_data_tasks(p_database_1=None, p_database_2=None, p_block_
     if not isinstance(p_exclude_tables, list):
         raise custom_exceptions.InvalidParameterTypeException('"p_exclude_tables" parameter must be a "list" instance.', p_exclude_tables)
 
+    if p_comparison_mode not in COMPARISON_MODE_LIST:
+        raise custom_exceptions.InvalidParameterValueException('"p_comparison_mode" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(COMPARISON_MODE_LIST)), p_comparison_mode)
+
+    if not isinstance(p_split_rows, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_split_rows" parameter must be an "int" instance.', p_split_rows)
+
+    if p_split_rows < 0:
+        raise custom_exceptions.InvalidParameterValueException('"p_split_rows" parameter must be an "int" instance greater than or equal to 0.', p_split_rows)
+
+    if p_keyless_comparison_mode not in KEYLESS_COMPARISON_MODE_LIST:
+        raise custom_exceptions.InvalidParameterValueException('"p_keyless_comparison_mode" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(KEYLESS_COMPARISON_MODE_LIST)), p_keyless_comparison_mode)
+
+    if p_row_reader not in ROW_READER_LIST:
+        raise custom_exceptions.InvalidParameterValueException('"p_row_reader" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(ROW_READER_LIST)), p_row_reader)
+
+    if not isinstance(p_dml_batch_rows, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_dml_batch_rows" parameter must be an "int" instance.', p_dml_batch_rows)
+
+    if p_dml_batch_rows < 1:
+        raise custom_exceptions.InvalidParameterValueException('"p_dml_batch_rows" parameter must be a positive "int" instance.', p_dml_batch_rows)
+
+    if p_data_format not in DATA_FORMAT_LIST:
+        raise custom_exceptions.InvalidParameterValueException('"p_data_format" parameter must be one between: {p_formats}.'.format(p_formats=', '.join(DATA_FORMAT_LIST)), p_data_format)
+
+    if p_include_columns is not None and not isinstance(p_include_columns, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_include_columns" parameter must be a "list" instance.', p_include_columns)
+
+    if p_exclude_columns is not None and not isinstance(p_exclude_columns, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_exclude_columns" parameter must be a "list" instance.', p_exclude_columns)
+
+    if p_table_filters is not None and not isinstance(p_table_filters, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_table_filters" parameter must be a "list" instance.', p_table_filters)
+
+    if p_watermark_columns is not None and not isinstance(p_watermark_columns, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_watermark_columns" parameter must be a "list" instance.', p_watermark_columns)
+
+    if p_watermark_dict is not None and not isinstance(p_watermark_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_watermark_dict" parameter must be a "dict" instance.', p_watermark_dict)
+
+    v_filter_dict = get_table_option_dict(p_items=p_table_filters, p_parameter='p_table_filters')
+    v_watermark_column_dict = get_table_option_dict(p_items=p_watermark_columns, p_parameter='p_watermark_columns')
+
     v_sql = '''
         WITH select_tables AS (
             WITH parents AS (
@@ -575,7 +3025,9 @@ def get_compare_tables_data_tasks(p_database_1=None, p_database_2=None, p_block_
         SELECT st.table_schema,
                st.table_name,
                COALESCE(sp.column_names, sc.column_names) AS table_key,
-               sc.columns_names_types
+               sp.column_names IS NULL AS table_keyless,
+               sc.columns_names_types,
+               sc.column_names AS table_columns
         FROM select_tables st
         LEFT JOIN select_pks sp
                 ON st.table_schema = sp.table_schema
@@ -597,8 +3049,8 @@ def get_compare_tables_data_tasks(p_database_1=None, p_database_2=None, p_block_
             '''.format(
                 p_values=','.join([
                     "('{p_schema}', '{p_table}')".format(
-                        p_schema=v_item.split('.')[0] if '.' in v_item else 'public',
-                        p_table=v_item.split('.')[1] if '.' in v_item else v_item
+                        p_schema=split_table_name(p_name=v_item)[0],
+                        p_table=split_table_name(p_name=v_item)[1]
                     )
                     for v_item in p_exclude_tables
                 ])
@@ -673,14 +3125,173 @@ def get_compare_tables_data_tasks(p_database_1=None, p_database_2=None, p_block_
         p_equal_callback=lambda p_columns, p_row, p_key: local_equal_callback(p_row_list=v_row_list, p_columns=p_columns, p_row=p_row, p_key=p_key)
     )
 
-    return [
-        {
-            'function': compare_tables_data,
-            'kwds': {
-                'p_schema': v_row['table_schema'],
-                'p_table': v_row['table_name'],
-                'p_key': v_row['table_key']
+    v_task_list = []
+
+    v_size_dict = {}
+
+    #Database 1 may lack some tables, so watermark queries run in transactions of their own
+    if len(v_row_list) > 0:
+        p_database_1.Open(p_autocommit=True)
+        p_database_2.Open(p_autocommit=True)
+
+    #Get estimated number of records and pages of each table in both databases, used to split and schedule tasks by the bigger one.
+    #Partitioned tables count their partitions
+    for v_database in [p_database_1, p_database_2] if len(v_row_list) > 0 else []:
+        v_table = v_database.Query(
+            p_sql='''
+                SELECT QUOTE_IDENT(n.nspname) AS table_schema,
+                       QUOTE_IDENT(c.relname) AS table_name,
+                       GREATEST(
+                           c.reltuples,
+                           (SELECT SUM(GREATEST(cc.reltuples, 0))
+                            FROM pg_inherits i
+                            INNER JOIN pg_class cc
+                                    ON cc.oid = i.inhrelid
+                            WHERE i.inhparent = c.oid),
+                           0
+                       )::BIGINT AS row_count,
+                       GREATEST(
+                           c.relpages,
+                           (SELECT SUM(cc.relpages)
+                            FROM pg_inherits i
+                            INNER JOIN pg_class cc
+                                    ON cc.oid = i.inhrelid
+                            WHERE i.inhparent = c.oid),
+                           0
+                       )::BIGINT AS page_count
+                FROM pg_class c
+                INNER JOIN pg_namespace n
+                        ON n.oid = c.relnamespace
+                WHERE c.relkind IN (
+                    'r',
+                    'p'
+                )
+            '''
+        )
+
+        for v_row in v_table.Rows:
+            v_size = v_size_dict.get((v_row['table_schema'], v_row['table_name']), (0, 0))
+            v_size_dict[(v_row['table_schema'], v_row['table_name'])] = (max(v_size[0], int(v_row['row_count'])), max(v_size[1], int(v_row['page_count'])))
+
+    for v_row in v_row_list:
+        v_bound_list = []
+        v_row_count, v_page_count = v_size_dict.get((v_row['table_schema'], v_row['table_name']), (0, 0))
+        v_comparison_mode = p_comparison_mode
+        v_table_key = v_row['table_key']
+        v_column_list = v_row['table_columns'].split(',')
+
+        v_compared_column_list = get_compared_columns(
+            p_schema=v_row['table_schema'],
+            p_table=v_row['table_name'],
+            p_columns=v_column_list,
+            p_key=[] if v_row['table_keyless'] else v_table_key.split(','),
+            p_include_columns=p_include_columns,
+            p_exclude_columns=p_exclude_columns
+        )
+
+        #Tables without primary key are keyed by all their compared columns
+        if v_row['table_keyless']:
+            if len(v_compared_column_list) == 0:
+                continue
+
+            v_table_key = ','.join(v_compared_column_list)
+
+        v_watermark_column = v_watermark_column_dict.get((v_row['table_schema'], v_row['table_name']))
+        v_watermark = None
+        v_next_watermark = None
+
+        if v_row['table_keyless'] and p_keyless_comparison_mode == 'multiset':
+            v_comparison_mode = 'multiset'
+            v_watermark_column = None
+
+        if v_watermark_column is not None:
+            if v_watermark_column not in v_column_list:
+                raise custom_exceptions.InvalidParameterValueException('"p_watermark_columns" parameter refers to a column that does not exist: {p_schema}.{p_table}.{p_column}.'.format(p_schema=v_row['table_schema'], p_table=v_row['table_name'], p_column=v_watermark_column), p_watermark_columns)
+
+            #Watermarks are read before any record is compared, so records changed while comparing are compared again by next comparison
+            v_watermark = (p_watermark_dict or {}).get((v_row['table_schema'], v_row['table_name'], v_watermark_column))
+            v_watermark_list = []
+
+            for v_database in [p_database_1, p_database_2]:
+                try:
+                    v_watermark_list.append(get_watermark(p_database=v_database, p_schema=v_row['table_schema'], p_table=v_row['table_name'], p_column=v_watermark_column))
+                except Spartacus.Database.Exception:
+                    pass
+
+            v_watermark_list = [v_item for v_item in v_watermark_list if v_item[0] is not None]
+
+            #Records changed after the lowest watermark of both databases may still differ
+            if len(v_watermark_list) > 0:
+                v_next_watermark = min(v_watermark_list, key=lambda v_item: v_item[0])[1]
+
+        if v_comparison_mode != 'multiset' and p_split_rows > 0 and v_row_count > p_split_rows:
+            v_key = v_table_key.split(',')
+
+            try:
+                v_bound_list = get_key_bounds(
+                    p_database=p_database_2,
+                    p_schema=v_row['table_schema'],
+                    p_table=v_row['table_name'],
+                    p_key=v_key,
+                    p_column_type_dict=get_column_type_dict(p_database=p_database_2, p_schema=v_row['table_schema'], p_table=v_row['table_name']),
+                    p_key_order_dict=get_key_order_dict(p_database_1=p_database_1, p_database_2=p_database_2, p_schema=v_row['table_schema'], p_table=v_row['table_name'], p_key=v_key),
+                    p_row_count=v_row_count,
+                    p_range_count=-(-v_row_count // p_split_rows)
+                )
+            except Spartacus.Database.Exception:
+                #Key values cannot be read back as bounds, so the table is compared by a single task
+                v_bound_list = []
+
+        #Ranges are closed in lower bound and open in upper bound. First and last ones are unbounded, so all records are covered
+        v_range_list = list(zip([None] + v_bound_list, v_bound_list + [None]))
+        v_page_range_list = [None]
+        v_bucket_count = None
+
+        #Tables without primary key have no key ranges, so they are split in ranges of pages of the bigger database, whose bucket checksums are summed.
+        #Last one is unbounded, so pages added since statistics were taken are covered. Buckets are sized for the whole table, the same for every range
+        if v_comparison_mode == 'multiset' and p_split_rows > 0 and v_row_count > p_split_rows and v_page_count > 0:
+            v_page_range_count = min(-(-v_row_count // p_split_rows), v_page_count)
+            v_page_bound_list = [v_page_count * v_index // v_page_range_count for v_index in range(v_page_range_count)]
+            v_page_range_list = [[v_lower_page, v_upper_page, v_page_range_count] for v_lower_page, v_upper_page in zip(v_page_bound_list, v_page_bound_list[1:] + [None])]
+            v_bucket_count = get_multiset_bucket_count(p_row_count=v_row_count, p_block_size=p_block_size)
+
+        for (v_lower_bound, v_upper_bound), v_page_range in itertools.product(v_range_list, v_page_range_list):
+            v_task = {
+                'function': compare_tables_data,
+                'kwds': {
+                    'p_schema': v_row['table_schema'],
+                    'p_table': v_row['table_name'],
+                    'p_key': v_table_key,
+                    'p_comparison_mode': v_comparison_mode,
+                    'p_lower_bound': v_lower_bound,
+                    'p_upper_bound': v_upper_bound,
+                    'p_row_reader': p_row_reader,
+                    'p_dml_batch_rows': p_dml_batch_rows,
+                    'p_data_format': p_data_format,
+                    #Just the compared columns are read, unless all of them are compared
+                    'p_compared_columns': None if v_compared_column_list == v_column_list else ','.join(v_compared_column_list),
+                    'p_row_filter': v_filter_dict.get((v_row['table_schema'], v_row['table_name'])),
+                    'p_watermark_column': v_watermark_column,
+                    'p_watermark': v_watermark,
+                    'p_page_range': v_page_range,
+                    'p_bucket_count': v_bucket_count
+                },
+                #Key and page ranges are about the same size, so each one costs a share of the table pages
+                'cost': max(v_page_count // (len(v_range_list) * len(v_page_range_list)), 1)
             }
-        }
-        for v_row in v_row_list
-    ]
+
+            if v_next_watermark is not None:
+                v_task['watermark'] = {
+                    'schema_name': v_row['table_schema'],
+                    'table_name': v_row['table_name'],
+                    'column_name': v_watermark_column,
+                    'watermark': v_next_watermark
+                }
+
+            v_task_list.append(v_task)
+
+    if len(v_row_list) > 0:
+        p_database_1.Close(p_commit=False)
+        p_database_2.Close(p_commit=False)
+
+    return v_task_list
@@ -0,0 +1,388 @@
+import re
+import queue
+import threading
+import psycopg2
+import psycopg2.extensions
+import Spartacus.Database
+
+from .import custom_exceptions
+from .import utils
+
+
+#Escape sequences written by COPY in text format. A backslash followed by any other character stands for that character
+COPY_ESCAPE_DICT = {
+    '\\b': '\b',
+    '\\f': '\f',
+    '\\n': '\n',
+    '\\r': '\r',
+    '\\t': '\t',
+    '\\v': '\v',
+    '\\\\': '\\'
+}
+
+#Characters escaped when writing values in COPY text format
+COPY_ESCAPE_TABLE = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r'
+})
+
+#Matches an escape sequence of COPY text format
+COPY_ESCAPE_REGEX = re.compile(r'\\.', re.DOTALL)
+
+#Field that stands for NULL in COPY text format
+COPY_NULL = b'\\N'
+
+#Seconds a COPY thread waits for room in its queue before checking if it must stop
+COPY_PUT_TIMEOUT = 1
+
+
+class CopyStopped(Exception):
+    """Raised inside a COPY thread to abort the COPY command when its records are no longer wanted.
+    """
+
+    pass
+
+
+def get_copy_columns(p_database=None, p_sql=None):
+    """Get columns returned by a query and their data type oids, without fetching any record.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database, already opened. Defaults to None.
+            p_sql (str): the sql query. Defaults to None.
+
+        Returns:
+            tuple: list of column names and list of their data type oids.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            Spartacus.Database.Exception: if the query failed.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_sql, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_sql" parameter must be a "str" instance.', p_sql)
+
+    try:
+        p_database.v_cur.execute(
+            '''
+                SELECT *
+                FROM (
+                    {p_sql}
+                ) data_comparer_rows
+                LIMIT 0
+            '''.format(
+                p_sql=p_sql
+            )
+        )
+    except psycopg2.Error as exc:
+        raise Spartacus.Database.Exception(str(exc))
+
+    return (
+        [v_column[0] for v_column in p_database.v_cur.description],
+        [v_column[1] for v_column in p_database.v_cur.description]
+    )
+
+
+def get_field_decoder(p_database=None, p_oid_list=None):
+    """Get a function that decodes fields of COPY text format into the same python values fetched by "Spartacus.Database.PostgreSQL.QueryBlock".
+    Values are cast by the typecasters of the database cursor, so types registered by Spartacus are honored.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database, already opened. Defaults to None.
+            p_oid_list (list): data type oids of the fields, in order. Defaults to None.
+
+        Returns:
+            function: receives a field index and the raw field, and returns its value.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_oid_list, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_oid_list" parameter must be a "list" instance.', p_oid_list)
+
+    v_encoding = psycopg2.extensions.encodings[p_database.v_con.encoding]
+    v_cast = p_database.v_cur.cast
+    v_unescape = lambda p_match: COPY_ESCAPE_DICT.get(p_match.group(0), p_match.group(0)[1])
+
+    def decode_field(p_index, p_field):
+        if p_field == COPY_NULL:
+            return None
+
+        v_text = p_field.decode(v_encoding)
+
+        if '\\' in v_text:
+            v_text = COPY_ESCAPE_REGEX.sub(v_unescape, v_text)
+
+        return v_cast(p_oid_list[p_index], v_text)
+
+    return decode_field
+
+
+def fetch_lines(p_database=None, p_sql=None, p_block_size=None):
+    """Generator of records returned by a query, as raw lines of COPY text format, streamed by "COPY ... TO STDOUT".
+    The COPY command runs in a thread and hands lines over by blocks, so at most three blocks are kept in memory.
+    The database connection must not be used by anything else until this generator is exhausted or closed, except for
+    casting values with its cursor.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database, already opened. Defaults to None.
+            p_sql (str): the sql query to be executed. Defaults to None.
+            p_block_size (int): Number of records handed over at a time. Defaults to None.
+
+        Yields:
+            bytes: next record, with tab separated fields and no line break.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+            Spartacus.Database.Exception: if the COPY command failed.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_sql, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_sql" parameter must be a "str" instance.', p_sql)
+
+    if not isinstance(p_block_size, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_block_size" parameter must be an "int" instance.', p_block_size)
+
+    if p_block_size < 1:
+        raise custom_exceptions.InvalidParameterValueException('"p_block_size" parameter must be a positive "int" instance.', p_block_size)
+
+    v_block_queue = queue.Queue(maxsize=1)
+    v_stop_event = threading.Event()
+
+    def put(p_item=None):
+        """Hand an item over to the generator, giving up if it was closed.
+        """
+
+        while True:
+            try:
+                v_block_queue.put(p_item, timeout=COPY_PUT_TIMEOUT)
+                return
+            except queue.Full:
+                if v_stop_event.is_set():
+                    raise CopyStopped()
+
+    class BlockWriter(object):
+        """File like object that receives COPY lines, one by each write call, and hands them over by blocks.
+        """
+
+        def __init__(self):
+            self.v_line_list = []
+
+        def write(self, p_data):
+            self.v_line_list.append(p_data[:-1])
+
+            if len(self.v_line_list) >= p_block_size:
+                put(p_item=(self.v_line_list, None))
+                self.v_line_list = []
+
+        def flush(self):
+            if len(self.v_line_list) > 0:
+                put(p_item=(self.v_line_list, None))
+                self.v_line_list = []
+
+    def copy():
+        """Run the COPY command, handing over its lines, then an empty block. Errors are handed over too.
+        """
+
+        v_writer = BlockWriter()
+
+        try:
+            v_cursor = p_database.v_con.cursor()
+            v_cursor.copy_expert(
+                '''
+                    COPY (
+                        {p_sql}
+                    ) TO STDOUT
+                '''.format(
+                    p_sql=p_sql
+                ),
+                v_writer
+            )
+            v_cursor.close()
+
+            v_writer.flush()
+            put(p_item=([], None))
+        except CopyStopped:
+            pass
+        except psycopg2.Error as exc:
+            try:
+                put(p_item=(None, Spartacus.Database.Exception(str(exc))))
+            except CopyStopped:
+                pass
+        except Exception as exc:
+            try:
+                put(p_item=(None, exc))
+            except CopyStopped:
+                pass
+
+    v_thread = threading.Thread(target=copy, daemon=True)
+    v_thread.start()
+
+    try:
+        while True:
+            v_line_list, v_exception = v_block_queue.get()
+
+            if v_exception is not None:
+                raise v_exception
+
+            if len(v_line_list) == 0:
+                return
+
+            yield from v_line_list
+    finally:
+        v_stop_event.set()
+        v_thread.join()
+
+
+def compare_copy_streams(p_database_1=None, p_database_2=None, p_block_size=None, p_key=None, p_sql=None, p_inserted_callback=None, p_updated_callback=None, p_deleted_callback=None, p_sort_key_dict=None):
+    """Used to compare records of a query in both databases, streamed by COPY commands in text format. Records must be ordered by key,
+    as "utils.get_key_function" expects. Just key fields are decoded while merging: records with the same key are compared by their
+    raw lines, and fully decoded only when lines differ. Lines may also differ when values are equal, as with timestamps written in
+    different time zones, so decoded values are compared before reporting an update.
+    If the query fails in database 1, its records are reported as inserted, just like "compare_tables_data_rows" does.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database, already opened. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database, already opened. Defaults to None.
+            p_block_size (int): Number of records handed over at a time by each COPY thread. Defaults to None.
+            p_key (list): list of columns that form the records key. Defaults to None.
+            p_sql (str): the sql query to be executed in both databases. Defaults to None.
+            p_inserted_callback (function): callback executed when an inserted record is found in database 2. Defaults to None.
+                Notes: check "utils.compare_datatables" for its parameters.
+            p_updated_callback (function): callback executed when an updated record is found in database 2. Defaults to None.
+                Notes: check "utils.compare_datatables" for its parameters.
+            p_deleted_callback (function): the callback executed when a deleted record is not found in database 2. Defaults to None.
+                Notes: check "utils.compare_datatables" for its parameters.
+            p_sort_key_dict (dict): sort key functions of key columns. Check "utils.get_key_function". Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            Exception: if the query returns different columns in each database.
+    """
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    v_columns, v_oid_list = get_copy_columns(p_database=p_database_2, p_sql=p_sql)
+
+    try:
+        v_columns_1, v_oid_list_1 = get_copy_columns(p_database=p_database_1, p_sql=p_sql)
+    except Spartacus.Database.Exception:
+        #Query failed in database 1, so all records of database 2 are inserted
+        v_columns_1 = v_columns
+        v_oid_list_1 = None
+
+    if v_columns_1 != v_columns:
+        raise Exception('Cannot compare table with different columns.')
+
+    v_decode_field_1 = get_field_decoder(p_database=p_database_1, p_oid_list=v_oid_list_1) if v_oid_list_1 is not None else None
+    v_decode_field_2 = get_field_decoder(p_database=p_database_2, p_oid_list=v_oid_list)
+    v_key_index_list = [v_columns.index(v_column) for v_column in p_key]
+    v_sort_key_list = [p_sort_key_dict.get(v_column) for v_column in p_key] if p_sort_key_dict else None
+    v_equal = Spartacus.Database.DataTable().Equal
+
+    def get_key(p_decode_field, p_fields):
+        v_key = tuple([p_decode_field(v_index, p_fields[v_index]) for v_index in v_key_index_list])
+
+        if v_sort_key_list is None:
+            return v_key
+
+        return tuple([
+            v_value if v_sort_key is None or v_value is None else v_sort_key(v_value)
+            for v_value, v_sort_key in zip(v_key, v_sort_key_list)
+        ])
+
+    def get_row(p_decode_field, p_fields):
+        return [p_decode_field(v_index, v_field) for v_index, v_field in enumerate(p_fields)]
+
+    v_lines_1 = fetch_lines(p_database=p_database_1, p_sql=p_sql, p_block_size=p_block_size) if v_oid_list_1 is not None else (v_line for v_line in [])
+    v_lines_2 = fetch_lines(p_database=p_database_2, p_sql=p_sql, p_block_size=p_block_size)
+
+    try:
+        v_line_1 = next(v_lines_1, None)
+        v_line_2 = next(v_lines_2, None)
+        v_fields_1 = v_line_1.split(b'\t') if v_line_1 is not None else None
+        v_fields_2 = v_line_2.split(b'\t') if v_line_2 is not None else None
+        v_key_1 = get_key(v_decode_field_1, v_fields_1) if v_line_1 is not None else None
+        v_key_2 = get_key(v_decode_field_2, v_fields_2) if v_line_2 is not None else None
+
+        #Main loop, compare records while both sides have data
+        while v_line_1 is not None and v_line_2 is not None:
+            #Record in both databases
+            if v_key_1 == v_key_2:
+                if v_line_1 != v_line_2:
+                    v_row_1 = get_row(v_decode_field_1, v_fields_1)
+                    v_row_2 = get_row(v_decode_field_2, v_fields_2)
+
+                    v_all_diffs = [
+                        {
+                            'column': v_column,
+                            'old_value': v_row_1[v_index],
+                            'new_value': v_row_2[v_index]
+                        }
+                        for v_index, v_column in enumerate(v_columns)
+                        if not v_equal(v_row_1[v_index], v_row_2[v_index])
+                    ]
+
+                    if len(v_all_diffs) > 0 and p_updated_callback is not None:
+                        p_updated_callback(v_columns, v_row_1, v_row_2, p_key, v_all_diffs)
+
+                v_line_1 = next(v_lines_1, None)
+                v_line_2 = next(v_lines_2, None)
+                v_fields_1 = v_line_1.split(b'\t') if v_line_1 is not None else None
+                v_fields_2 = v_line_2.split(b'\t') if v_line_2 is not None else None
+                v_key_1 = get_key(v_decode_field_1, v_fields_1) if v_line_1 is not None else None
+                v_key_2 = get_key(v_decode_field_2, v_fields_2) if v_line_2 is not None else None
+
+                continue
+
+            try:
+                v_is_deleted = v_key_1 < v_key_2
+            except TypeError:
+                v_is_deleted = utils.get_sortable_key(p_key=v_key_1) < utils.get_sortable_key(p_key=v_key_2)
+
+            #Record was deleted from second database
+            if v_is_deleted:
+                if p_deleted_callback is not None:
+                    p_deleted_callback(v_columns, get_row(v_decode_field_1, v_fields_1), p_key)
+
+                v_line_1 = next(v_lines_1, None)
+                v_fields_1 = v_line_1.split(b'\t') if v_line_1 is not None else None
+                v_key_1 = get_key(v_decode_field_1, v_fields_1) if v_line_1 is not None else None
+            #Record was inserted into second database
+            else:
+                if p_inserted_callback is not None:
+                    p_inserted_callback(v_columns, get_row(v_decode_field_2, v_fields_2), p_key)
+
+                v_line_2 = next(v_lines_2, None)
+                v_fields_2 = v_line_2.split(b'\t') if v_line_2 is not None else None
+                v_key_2 = get_key(v_decode_field_2, v_fields_2) if v_line_2 is not None else None
+
+        #Data fetch finished on first database, so let's insert remaining rows of second one, if any
+        while v_line_2 is not None:
+            if p_inserted_callback is not None:
+                p_inserted_callback(v_columns, get_row(v_decode_field_2, v_line_2.split(b'\t')), p_key)
+
+            v_line_2 = next(v_lines_2, None)
+
+        #Data fetch finished on second database, so let's delete remaining rows of first one, if any
+        while v_line_1 is not None:
+            if p_deleted_callback is not None:
+                p_deleted_callback(v_columns, get_row(v_decode_field_1, v_line_1.split(b'\t')), p_key)
+
+            v_line_1 = next(v_lines_1, None)
+    finally:
+        v_lines_1.close()
+        v_lines_2.close()
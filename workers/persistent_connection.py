@@ -0,0 +1,183 @@
+import multiprocessing.util
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+import Spartacus.Database
+
+from .import custom_exceptions
+from .import async_fetch
+
+
+#Persistent connections of this process to the first and second databases, set by "initialize_process"
+v_process_connection_list = [None, None]
+
+
+class PersistentConnection(Spartacus.Database.PostgreSQL):
+    """PostgreSQL connection kept open across the tasks run by a process, so each task does not pay a new connection handshake.
+    Close calls done by tasks just finish the current transaction. Open calls check if the kept connection is still healthy,
+    discarding any transaction left by a failed task, and connect again if it is not. The connection is closed by "Release".
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database to connect to. Just its connection parameters are used. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    def __init__(self, p_database=None):
+        if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+            raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+        super(PersistentConnection, self).__init__(
+            p_host=p_database.v_host,
+            p_port=p_database.v_port,
+            p_service=p_database.v_service,
+            p_user=p_database.v_user,
+            p_password=p_database.v_password,
+            p_application_name=p_database.v_application_name
+        )
+
+        self.v_connect_count = 0
+
+    def IsHealthy(self):
+        """Check if the kept connection can still be used, discarding any transaction left open.
+
+            Returns:
+                bool: True if the connection answered a trivial query.
+        """
+
+        if self.v_con is None or self.v_con.closed != 0:
+            return False
+
+        try:
+            if self.v_con.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                self.v_con.rollback()
+
+            self.v_con.autocommit = True
+            v_cursor = self.v_con.cursor()
+            v_cursor.execute('SELECT 1')
+            v_cursor.close()
+        except psycopg2.Error:
+            return False
+
+        return True
+
+    def Open(self, p_autocommit=True, p_datetime_as_string=False, p_json_as_string=False, p_async=False):
+        """Reuse the kept connection if it is healthy, or connect again. Each call gets a new cursor, with the same type handling a new connection would get.
+        """
+
+        if p_async or not self.IsHealthy():
+            self.Release()
+            super(PersistentConnection, self).Open(p_autocommit=p_autocommit, p_datetime_as_string=p_datetime_as_string, p_json_as_string=p_json_as_string, p_async=p_async)
+            self.v_connect_count += 1
+
+            return
+
+        try:
+            self.v_con.autocommit = p_autocommit
+            self.v_cur = self.v_con.cursor()
+            self.v_start = True
+            self.v_cursor = None
+
+            if p_datetime_as_string:
+                psycopg2.extensions.register_type(
+                    psycopg2.extensions.new_type(
+                        tuple([v_oid for v_oid, v_name in self.v_types.items() if v_name in ['date', 'timestamp', 'timestamptz']]),
+                        'DATE',
+                        self.DateHandler
+                    ),
+                    self.v_cur
+                )
+
+            if p_json_as_string:
+                psycopg2.extras.register_default_json(self.v_cur, loads=lambda x: x)
+                psycopg2.extras.register_default_jsonb(self.v_cur, loads=lambda x: x)
+
+            self.v_con.notices = Spartacus.Database.DataList()
+        except psycopg2.Error as exc:
+            raise Spartacus.Database.Exception(str(exc))
+
+    def Close(self, p_commit=True):
+        """Finish the current transaction, keeping the connection open for next tasks.
+        """
+
+        #Asynchronous connections have no transactions to finish, so they are not kept
+        if self.v_con is not None and self.v_con.async_ == 1:
+            self.Release()
+
+            return
+
+        try:
+            if self.v_con is not None:
+                if p_commit:
+                    self.v_con.commit()
+                else:
+                    self.v_con.rollback()
+
+                if self.v_cur is not None:
+                    self.v_cur.close()
+
+                #Queries run after closing get the same autocommit behavior they get from a closed connection
+                self.v_con.autocommit = True
+                self.v_cur = self.v_con.cursor()
+
+            self.v_start = True
+            self.v_cursor = None
+        except psycopg2.Error as exc:
+            raise Spartacus.Database.Exception(str(exc))
+
+    def Release(self):
+        """Close the kept connection, ignoring errors of a broken one.
+        """
+
+        try:
+            super(PersistentConnection, self).Close(p_commit=False)
+        except Spartacus.Database.Exception:
+            self.v_con = None
+            self.v_cur = None
+            self.v_start = True
+
+
+def release_process_connections():
+    """Close persistent connections of this process, and asynchronous connections it kept. See "async_fetch.connect".
+    """
+
+    for v_connection in v_process_connection_list:
+        if v_connection is not None:
+            v_connection.Release()
+
+    async_fetch.release_process_connections()
+
+
+def initialize_process(p_database_1=None, p_database_2=None):
+    """Initialize a pool process, creating its persistent connections. They connect when first opened and are closed when the process exits.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database, or None if there is no connection to it. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if p_database_1 is not None and not isinstance(p_database_1, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database_1" parameter must be None or a "Spartacus.Database.PostgreSQL" instance.', p_database_1)
+
+    if not isinstance(p_database_2, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database_2" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database_2)
+
+    v_process_connection_list[0] = PersistentConnection(p_database=p_database_1) if p_database_1 is not None else None
+    v_process_connection_list[1] = PersistentConnection(p_database=p_database_2)
+
+    #Pool processes do not run atexit handlers, but run finalizers
+    multiprocessing.util.Finalize(None, release_process_connections, exitpriority=10)
+
+
+def get_process_connections():
+    """Get persistent connections of this process, as created by "initialize_process".
+
+        Returns:
+            list: connections to the first and second databases. The first one is None if there is no connection to it.
+    """
+
+    return list(v_process_connection_list)
@@ -1,11 +1,896 @@
 import os
+import json
+import heapq
+import queue
+import pickle
+import locale
+import tempfile
+import itertools
+import threading
+import collections
+import multiprocessing
+import multiprocessing.managers
+import psycopg2.extras
 import Spartacus.Database
 
 from .import custom_exceptions
+from .import async_fetch
 
 
-def compare_datatables(p_database_1=None, p_database_2=None, p_block_size=None, p_key=None, p_sql=None, p_inserted_callback=None, p_updated_callback=None, p_deleted_callback=None, p_equal_callback=None):
+#Ways blocks of records of both databases are fetched
+FETCH_MODE_LIST = [
+    'serial',
+    'thread',
+    'asyncio'
+]
+
+#Characters that make PostgreSQL quote an array element when it outputs the array
+ARRAY_QUOTED_CHARACTERS = set('{},"\\ \t\n\r\v\f')
+
+#Characters that make PostgreSQL quote a range bound when it outputs the range
+RANGE_QUOTED_CHARACTERS = set('()[],"\\ \t\n\r\v\f')
+
+#Maximum size, in characters, of messages kept by a queue buffer before sending them to the queue
+QUEUE_BUFFER_MAX_SIZE = 4 * 1024 * 1024
+
+#Maximum number of message blocks kept in memory by a bounded queue
+QUEUE_MAX_ITEMS = 1000
+
+#Maximum size, in characters, of message blocks kept in memory by a bounded queue
+QUEUE_MAX_SIZE = 256 * 1024 * 1024
+
+#What a bounded queue does with blocks put while it is full
+QUEUE_OVERFLOW_MODE_LIST = [
+    'block',
+    'spill'
+]
+
+
+def get_message_size(p_message=None):
+    """Get size of a message, as measured to limit memory used by queues.
+
+        Args:
+            p_message (dict): the message, with 'type' and 'row' keys. Defaults to None.
+
+        Returns:
+            int: characters of text values of the message row.
+    """
+
+    return sum([len(v_value) for v_value in p_message['row'].values() if isinstance(v_value, str)])
+
+
+class QueueBuffer(object):
+    """Buffers messages of a producer worker and sends them to the queue by blocks, saving a round trip to the manager process per message.
+    Consumers receive a list of messages instead of a single message.
+
+        Args:
+            p_queue (multiprocessing.managers.BaseProxy): queue used to communicate to parent process. Created from a multiprocessing.Manager instance. Defaults to None.
+            p_block_size (int): maximum number of messages sent at a time. Defaults to None.
+            p_max_size (int): maximum size of messages sent at a time, in characters of their text values. Defaults to QUEUE_BUFFER_MAX_SIZE.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    def __init__(self, p_queue=None, p_block_size=None, p_max_size=QUEUE_BUFFER_MAX_SIZE):
+        if not isinstance(p_queue, multiprocessing.managers.BaseProxy):
+            raise custom_exceptions.InvalidParameterTypeException('"p_queue" parameter must be a "multiprocessing.managers.BaseProxy" instance.', p_queue)
+
+        if not isinstance(p_block_size, int):
+            raise custom_exceptions.InvalidParameterTypeException('"p_block_size" parameter must be an "int" instance.', p_block_size)
+
+        if p_block_size < 1:
+            raise custom_exceptions.InvalidParameterValueException('"p_block_size" parameter must be a positive "int" instance.', p_block_size)
+
+        if not isinstance(p_max_size, int):
+            raise custom_exceptions.InvalidParameterTypeException('"p_max_size" parameter must be an "int" instance.', p_max_size)
+
+        if p_max_size < 1:
+            raise custom_exceptions.InvalidParameterValueException('"p_max_size" parameter must be a positive "int" instance.', p_max_size)
+
+        self.v_queue = p_queue
+        self.v_block_size = p_block_size
+        self.v_max_size = p_max_size
+        self.v_message_list = []
+        self.v_size = 0
+
+    def put(self, p_message=None):
+        """Add a message to the buffer, sending the buffered messages if the buffer is full.
+
+            Args:
+                p_message (dict): the message, with 'type' and 'row' keys. Defaults to None.
+
+            Raises:
+                custom_exceptions.InvalidParameterTypeException.
+        """
+
+        if not isinstance(p_message, dict):
+            raise custom_exceptions.InvalidParameterTypeException('"p_message" parameter must be a "dict" instance.', p_message)
+
+        self.v_message_list.append(p_message)
+        self.v_size += get_message_size(p_message=p_message)
+
+        if len(self.v_message_list) >= self.v_block_size or self.v_size >= self.v_max_size:
+            self.flush()
+
+    def flush(self):
+        """Send buffered messages to the queue, if any.
+        """
+
+        if len(self.v_message_list) > 0:
+            self.v_queue.put(self.v_message_list)
+            self.v_message_list = []
+            self.v_size = 0
+
+
+class BoundedQueue(object):
+    """Queue of message blocks that keeps at most a number of blocks, and of characters of their text values, in memory.
+    Lives in the manager process, so producers and consumers use it through a proxy with the same "put", "get" and "qsize" calls of a manager queue.
+    Blocks put while it is full either wait for consumers to get older ones, or are written to a temporary file and read back, in the same order, as consumers free memory.
+
+        Args:
+            p_max_items (int): maximum number of blocks kept in memory. Defaults to QUEUE_MAX_ITEMS.
+            p_max_size (int): maximum size of blocks kept in memory, in characters of their text values. A single bigger block is still accepted by an empty queue. Defaults to QUEUE_MAX_SIZE.
+            p_overflow_mode (str): what is done with blocks put while the queue is full. Defaults to 'block'.
+                Notes: must be one of:
+                    - block: producers wait until there is room for the block.
+                    - spill: the block is written to a temporary file, so producers never wait.
+            p_spill_directory (str): directory of the temporary file, or None for the default temporary directory. Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    def __init__(self, p_max_items=QUEUE_MAX_ITEMS, p_max_size=QUEUE_MAX_SIZE, p_overflow_mode='block', p_spill_directory=None):
+        if not isinstance(p_max_items, int):
+            raise custom_exceptions.InvalidParameterTypeException('"p_max_items" parameter must be an "int" instance.', p_max_items)
+
+        if p_max_items < 1:
+            raise custom_exceptions.InvalidParameterValueException('"p_max_items" parameter must be a positive "int" instance.', p_max_items)
+
+        if not isinstance(p_max_size, int):
+            raise custom_exceptions.InvalidParameterTypeException('"p_max_size" parameter must be an "int" instance.', p_max_size)
+
+        if p_max_size < 1:
+            raise custom_exceptions.InvalidParameterValueException('"p_max_size" parameter must be a positive "int" instance.', p_max_size)
+
+        if p_overflow_mode not in QUEUE_OVERFLOW_MODE_LIST:
+            raise custom_exceptions.InvalidParameterValueException('"p_overflow_mode" parameter must be one between: {0}.'.format(', '.join(QUEUE_OVERFLOW_MODE_LIST)), p_overflow_mode)
+
+        if p_spill_directory is not None and not isinstance(p_spill_directory, str):
+            raise custom_exceptions.InvalidParameterTypeException('"p_spill_directory" parameter must be None or a "str" instance.', p_spill_directory)
+
+        self.v_max_items = p_max_items
+        self.v_max_size = p_max_size
+        self.v_overflow_mode = p_overflow_mode
+        self.v_spill_directory = p_spill_directory
+        self.v_condition = threading.Condition()
+        self.v_item_list = collections.deque()
+        self.v_size = 0
+        self.v_spill_file = None
+        self.v_spill_count = 0
+        self.v_spill_offset = 0
+        self.v_abandoned = False
+        self.v_stats = {'peak_items': 0, 'peak_size': 0, 'spilled_items': 0}
+
+    def is_full(self, p_size=0):
+        """Check if a block of the given size does not fit in memory. Must be called holding the condition.
+        """
+
+        return len(self.v_item_list) > 0 and (len(self.v_item_list) >= self.v_max_items or self.v_size + p_size > self.v_max_size)
+
+    def append(self, p_item=None, p_size=0):
+        """Keep a block in memory. Must be called holding the condition.
+        """
+
+        self.v_item_list.append((p_item, p_size))
+        self.v_size += p_size
+        self.v_stats['peak_items'] = max(self.v_stats['peak_items'], len(self.v_item_list))
+        self.v_stats['peak_size'] = max(self.v_stats['peak_size'], self.v_size)
+
+    def spill(self, p_item=None, p_size=0):
+        """Write a block to the end of the temporary file. Must be called holding the condition.
+        """
+
+        if self.v_spill_file is None:
+            self.v_spill_file = tempfile.TemporaryFile(prefix='database_comparer_queue_', dir=self.v_spill_directory)
+
+        self.v_spill_file.seek(0, os.SEEK_END)
+        pickle.dump((p_item, p_size), self.v_spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.v_spill_count += 1
+        self.v_stats['spilled_items'] += 1
+
+    def unspill(self):
+        """Read blocks back from the temporary file, oldest first, while they fit in memory. Must be called holding the condition.
+        """
+
+        while self.v_spill_count > 0 and len(self.v_item_list) < self.v_max_items and self.v_size < self.v_max_size:
+            self.v_spill_file.seek(self.v_spill_offset)
+            v_item, v_size = pickle.load(self.v_spill_file)
+            self.v_spill_offset = self.v_spill_file.tell()
+            self.v_spill_count -= 1
+            self.append(p_item=v_item, p_size=v_size)
+
+        #Once every block was read back, the file is emptied, so it does not grow for the whole comparison
+        if self.v_spill_file is not None and self.v_spill_count == 0 and self.v_spill_offset > 0:
+            self.v_spill_file.truncate(0)
+            self.v_spill_offset = 0
+
+    def put(self, item=None, block=True, timeout=None):
+        """Put a block of messages, or a None sentinel, at the end of the queue. Arguments match the ones of "queue.Queue.put".
+
+            Raises:
+                queue.Full: if the queue is still full after timeout seconds.
+        """
+
+        v_size = sum([get_message_size(p_message=v_message) for v_message in item]) if item is not None else 0
+
+        with self.v_condition:
+            if self.v_abandoned:
+                return
+
+            #Blocks that arrive after any spilled one are spilled too, so they are read in the same order they were put
+            if self.v_overflow_mode == 'spill' and (self.v_spill_count > 0 or self.is_full(p_size=v_size)):
+                self.spill(p_item=item, p_size=v_size)
+            else:
+                if self.is_full(p_size=v_size):
+                    if not block or not self.v_condition.wait_for(lambda: self.v_abandoned or not self.is_full(p_size=v_size), timeout=timeout):
+                        raise queue.Full
+
+                    if self.v_abandoned:
+                        return
+
+                self.append(p_item=item, p_size=v_size)
+
+            self.v_condition.notify_all()
+
+    def get(self, block=True, timeout=None):
+        """Remove and return the first block of the queue. Arguments match the ones of "queue.Queue.get".
+
+            Raises:
+                queue.Empty: if the queue is still empty after timeout seconds.
+        """
+
+        with self.v_condition:
+            if not self.v_condition.wait_for(lambda: len(self.v_item_list) > 0 or self.v_spill_count > 0, timeout=timeout if block else 0):
+                raise queue.Empty
+
+            self.unspill()
+            v_item, v_size = self.v_item_list.popleft()
+            self.v_size -= v_size
+            self.unspill()
+            self.v_condition.notify_all()
+
+            return v_item
+
+    def qsize(self):
+        """Get number of blocks in the queue, in memory or spilled.
+        """
+
+        with self.v_condition:
+            return len(self.v_item_list) + self.v_spill_count
+
+    def abandon(self):
+        """Discard every block, and the ones put later, waking up waiting producers. Used when no consumer is left to get them.
+        """
+
+        with self.v_condition:
+            self.v_abandoned = True
+            self.v_item_list.clear()
+            self.v_size = 0
+            self.v_spill_count = 0
+
+            if self.v_spill_file is not None:
+                self.v_spill_file.close()
+                self.v_spill_file = None
+
+            self.v_condition.notify_all()
+
+    def get_stats(self):
+        """Get peak number and size of blocks kept in memory, and number of blocks spilled to the temporary file.
+
+            Returns:
+                dict: with 'peak_items', 'peak_size' and 'spilled_items' keys.
+        """
+
+        with self.v_condition:
+            return dict(self.v_stats)
+
+
+class BucketChecksumStore(object):
+    """Sums of differences between bucket checksums of both databases, for tables whose buckets are computed by many producers, each one over a range of the table.
+    Lives in the manager process, so producers add the differences of their ranges through a proxy, and the last one of a table gets the buckets that differ.
+    Record counts and hashes sums are additive, so summed differences of all ranges are the differences of the whole table, however records lie in each database.
+    """
+
+    def __init__(self):
+        self.v_lock = threading.Lock()
+        self.v_table_dict = {}
+
+    def add(self, p_name=None, p_range_count=None, p_difference_dict=None):
+        """Add differences between bucket checksums of both databases found in a range of a table.
+
+            Args:
+                p_name (str): the table name, qualified by its schema. Defaults to None.
+                p_range_count (int): number of ranges of the table. Defaults to None.
+                p_difference_dict (dict): records count and hashes sum of database 2 minus the ones of database 1, as a tuple, keyed by bucket. Defaults to None.
+                    Notes: buckets without differences may be missing.
+
+            Returns:
+                list: sorted buckets that differ in the whole table, once every range of the table was added, or None before.
+
+            Raises:
+                custom_exceptions.InvalidParameterTypeException.
+        """
+
+        if not isinstance(p_name, str):
+            raise custom_exceptions.InvalidParameterTypeException('"p_name" parameter must be a "str" instance.', p_name)
+
+        if not isinstance(p_range_count, int):
+            raise custom_exceptions.InvalidParameterTypeException('"p_range_count" parameter must be an "int" instance.', p_range_count)
+
+        if not isinstance(p_difference_dict, dict):
+            raise custom_exceptions.InvalidParameterTypeException('"p_difference_dict" parameter must be a "dict" instance.', p_difference_dict)
+
+        with self.v_lock:
+            v_added_count, v_sum_dict = self.v_table_dict.get(p_name, (0, {}))
+
+            for v_bucket, (v_row_count, v_row_hash) in p_difference_dict.items():
+                v_sum = v_sum_dict.get(v_bucket, (0, 0))
+                v_sum_dict[v_bucket] = (v_sum[0] + v_row_count, v_sum[1] + v_row_hash)
+
+            if v_added_count + 1 < p_range_count:
+                self.v_table_dict[p_name] = (v_added_count + 1, v_sum_dict)
+
+                return None
+
+            self.v_table_dict.pop(p_name, None)
+
+            return sorted([v_bucket for v_bucket, v_sum in v_sum_dict.items() if v_sum != (0, 0)])
+
+
+class QueueManager(multiprocessing.managers.SyncManager):
+    """Manager of the queues shared by producer and consumer processes, that can also create bounded queues and bucket checksum stores.
+    """
+
+
+QueueManager.register('BoundedQueue', BoundedQueue, exposed=['put', 'get', 'qsize', 'abandon', 'get_stats'])
+QueueManager.register('BucketChecksumStore', BucketChecksumStore, exposed=['add'])
+
+
+class NullKeyValue(object):
+    """Used in records keys in place of NULL values. Is greater than any other value, just like NULLS LAST ordering of PostgreSQL.
+    """
+
+    def __eq__(self, p_other):
+        return p_other is self
+
+    def __ne__(self, p_other):
+        return p_other is not self
+
+    def __lt__(self, p_other):
+        return False
+
+    def __le__(self, p_other):
+        return p_other is self
+
+    def __gt__(self, p_other):
+        return p_other is not self
+
+    def __ge__(self, p_other):
+        return True
+
+    def __hash__(self):
+        return 0
+
+
+NULL_KEY_VALUE = NullKeyValue()
+
+
+def get_key_function(p_columns=None, p_key=None, p_sort_key_dict=None):
+    """Get a function that extracts the key of a record as a tuple of typed values, ordered like PostgreSQL orders them.
+    Values are compared as python compares them, unless their column has a sort key function, so text values must be ordered in "C"
+    collation by the database, or in a collation whose order is given by such function. See "get_collation_sort_key".
+    Keys holding NULL or bytea values must be passed to "get_sortable_key" before checking their order.
+
+        Args:
+            p_columns (list): list of columns of the records. Defaults to None.
+            p_key (list): list of columns that form the records key. Defaults to None.
+            p_sort_key_dict (dict): key/value pairs of key column names and functions that map their non NULL values to values ordered
+                like the database orders them. Values of other columns are kept as they are. Defaults to None.
+
+        Returns:
+            function: receives a record and returns its key tuple.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_columns, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_columns" parameter must be a "list" instance.', p_columns)
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    if p_sort_key_dict is not None and not isinstance(p_sort_key_dict, dict):
+        raise custom_exceptions.InvalidParameterTypeException('"p_sort_key_dict" parameter must be a "dict" instance.', p_sort_key_dict)
+
+    for v_column in p_key:
+        if v_column not in p_columns:
+            raise custom_exceptions.InvalidParameterValueException('"p_key" parameter must contain just columns present in "p_columns" parameter.', p_key)
+
+    #Fetched records are psycopg2 DictRow instances, whose name lookup is slow, so let's index them as plain lists
+    v_index_list = [p_columns.index(v_column) for v_column in p_key]
+    v_get_item = list.__getitem__
+
+    if p_sort_key_dict:
+        v_sort_key_list = [
+            (v_index, p_sort_key_dict.get(v_column))
+            for v_index, v_column in zip(v_index_list, p_key)
+        ]
+
+        def get_key(p_row):
+            v_key = []
+
+            for v_index, v_sort_key in v_sort_key_list:
+                v_value = v_get_item(p_row, v_index)
+                v_key.append(v_value if v_sort_key is None or v_value is None else v_sort_key(v_value))
+
+            return tuple(v_key)
+    elif len(v_index_list) == 1:
+        v_index = v_index_list[0]
+
+        def get_key(p_row):
+            return (v_get_item(p_row, v_index),)
+    else:
+        def get_key(p_row):
+            return tuple([v_get_item(p_row, v_index) for v_index in v_index_list])
+
+    return get_key
+
+
+def get_collation_sort_key(p_locale=None):
+    """Get a function that maps strings to values ordered like a deterministic libc collation of the database orders them.
+    Sets the collation locale of the whole process, so a process can follow a single collation at a time. The locale must be
+    installed with the same definition used by the database server.
+
+        Args:
+            p_locale (str): the locale of the collation, as in "pg_collation.collcollate". Defaults to None.
+
+        Returns:
+            function: receives a string and returns its sort key. None if the locale is not available.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_locale, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_locale" parameter must be a "str" instance.', p_locale)
+
+    try:
+        locale.setlocale(locale.LC_COLLATE, p_locale)
+    except locale.Error:
+        return None
+
+    v_transform = locale.strxfrm
+
+    def get_sort_key(p_value):
+        #Strings that collate the same are ordered by their code points, just like deterministic collations do
+        return (v_transform(p_value), p_value)
+
+    return get_sort_key
+
+
+def get_text_sort_key(p_value=None):
+    """Map a fetched value to its text representation in PostgreSQL, so values ordered by the database by their text in "C" collation are
+    ordered alike by python. Booleans, json, arrays and ranges are rendered as PostgreSQL outputs them, and other values through "str".
+
+        Args:
+            p_value (object): the value, not NULL. Defaults to None.
+
+        Returns:
+            str: the text representation.
+    """
+
+    if isinstance(p_value, str):
+        return p_value
+
+    if isinstance(p_value, bool):
+        return 't' if p_value else 'f'
+
+    if isinstance(p_value, dict):
+        return get_json_sort_key(p_value=p_value)
+
+    if isinstance(p_value, list):
+        return '{{{p_elements}}}'.format(
+            p_elements=','.join([
+                'NULL' if v_element is None else get_array_element_text(p_value=v_element)
+                for v_element in p_value
+            ])
+        )
+
+    if isinstance(p_value, psycopg2.extras.Range):
+        if p_value.isempty:
+            return 'empty'
+
+        return '{p_lower_bound}{p_lower},{p_upper}{p_upper_bound}'.format(
+            p_lower_bound='[' if p_value.lower_inc else '(',
+            p_lower=get_range_bound_text(p_value=p_value.lower),
+            p_upper=get_range_bound_text(p_value=p_value.upper),
+            p_upper_bound=']' if p_value.upper_inc else ')'
+        )
+
+    return str(p_value)
+
+
+def get_range_bound_text(p_value=None):
+    """Get text of a range bound, quoted just like PostgreSQL quotes it when it outputs the range.
+
+        Args:
+            p_value (object): the bound, or None if it is infinite. Defaults to None.
+
+        Returns:
+            str: the bound text.
+    """
+
+    if p_value is None:
+        return ''
+
+    v_text = get_text_sort_key(p_value=p_value)
+
+    if v_text == '' or any([v_char in RANGE_QUOTED_CHARACTERS for v_char in v_text]):
+        return '"{p_text}"'.format(p_text=v_text.replace('\\', '\\\\').replace('"', '\\"'))
+
+    return v_text
+
+
+def get_array_element_text(p_value=None):
+    """Get text of an array element, quoted just like PostgreSQL quotes it when it outputs the array.
+
+        Args:
+            p_value (object): the element, not NULL. Defaults to None.
+
+        Returns:
+            str: the element text.
+    """
+
+    v_text = get_text_sort_key(p_value=p_value)
+
+    if isinstance(p_value, list):
+        return v_text
+
+    if v_text == '' or v_text.upper() == 'NULL' or any([v_char in ARRAY_QUOTED_CHARACTERS for v_char in v_text]):
+        return '"{p_text}"'.format(p_text=v_text.replace('\\', '\\\\').replace('"', '\\"'))
+
+    return v_text
+
+
+def get_json_sort_key(p_value=None):
+    """Map a fetched json value to its text representation as "jsonb", so values ordered by the database by their "jsonb" text in "C"
+    collation are ordered alike by python. Object keys are ordered like "jsonb" stores them: shorter first, then by their bytes.
+
+        Args:
+            p_value (object): the json value, as decoded by psycopg2, not NULL. Defaults to None.
+
+        Returns:
+            str: the "jsonb" text representation.
+    """
+
+    def get_jsonb_value(p_value):
+        if isinstance(p_value, dict):
+            return {
+                v_key: get_jsonb_value(p_value[v_key])
+                for v_key in sorted(p_value, key=lambda v_key: (len(v_key.encode('utf-8')), v_key.encode('utf-8')))
+            }
+
+        if isinstance(p_value, list):
+            return [get_jsonb_value(v_element) for v_element in p_value]
+
+        return p_value
+
+    return json.dumps(get_jsonb_value(p_value), ensure_ascii=False)
+
+
+def get_sortable_key(p_key=None):
+    """Get a copy of a record key that can be ordered. NULL and bytea values cannot be ordered in python, so they are replaced, also
+    when they are array elements.
+
+        Args:
+            p_key (tuple): the record key, as returned by a function got from "get_key_function". Defaults to None.
+
+        Returns:
+            tuple: the sortable key.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not isinstance(p_key, tuple):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "tuple" instance.', p_key)
+
+    def get_sortable_value(p_value):
+        if p_value is None:
+            return NULL_KEY_VALUE
+
+        if isinstance(p_value, memoryview):
+            return bytes(p_value)
+
+        if isinstance(p_value, list):
+            return [get_sortable_value(v_element) for v_element in p_value]
+
+        return p_value
+
+    return tuple([get_sortable_value(v_value) for v_value in p_key])
+
+
+def fetch_blocks(p_database=None, p_sql=None, p_block_size=None):
+    """Generator of blocks of records returned by a query. Used to fetch query results without loading all of them into memory.
+
+        Args:
+            p_database (Spartacus.Database.PostgreSQL): the database, already opened. Defaults to None.
+            p_sql (str): the sql query to be executed. Defaults to None.
+            p_block_size (int): Number of data records in each block. Defaults to None.
+
+        Yields:
+            Spartacus.Database.DataTable: next block of records. At least one block is yielded, even if empty.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    if not isinstance(p_database, Spartacus.Database.PostgreSQL):
+        raise custom_exceptions.InvalidParameterTypeException('"p_database" parameter must be a "Spartacus.Database.PostgreSQL" instance.', p_database)
+
+    if not isinstance(p_sql, str):
+        raise custom_exceptions.InvalidParameterTypeException('"p_sql" parameter must be a "str" instance.', p_sql)
+
+    if not isinstance(p_block_size, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_block_size" parameter must be an "int" instance.', p_block_size)
+
+    if p_block_size < 1:
+        raise custom_exceptions.InvalidParameterValueException('"p_block_size" parameter must be a positive "int" instance.', p_block_size)
+
+    v_has_more_data = True
+
+    while v_has_more_data:
+        v_table = p_database.QueryBlock(p_sql=p_sql, p_blocksize=p_block_size)
+        v_has_more_data = not p_database.v_start
+
+        yield v_table
+
+
+def prefetch_blocks(p_blocks=None):
+    """Generator of blocks that fetches the next block in a thread while the current one is being used, so database round trips
+    overlap with comparisons. At most two blocks are kept in memory: the one being used and the one being fetched.
+    The database connection used by p_blocks must not be used by anything else until this generator is exhausted or closed.
+
+        Args:
+            p_blocks (generator): generator of blocks, as returned by "fetch_blocks". Defaults to None.
+
+        Yields:
+            Spartacus.Database.DataTable: next block of records. Exceptions raised while fetching are raised again here.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+    """
+
+    if not hasattr(p_blocks, '__next__'):
+        raise custom_exceptions.InvalidParameterTypeException('"p_blocks" parameter must be an iterator.', p_blocks)
+
+    v_request_queue = queue.Queue()
+    v_block_queue = queue.Queue()
+
+    def fetch():
+        """Fetch a block each time it is requested, until there are no more blocks or an error occurs.
+        """
+
+        while v_request_queue.get():
+            try:
+                v_block_queue.put((next(p_blocks), None))
+            except Exception as exc:
+                v_block_queue.put((None, exc))
+                return
+
+    v_thread = threading.Thread(target=fetch, daemon=True)
+    v_thread.start()
+    v_request_queue.put(True)
+
+    try:
+        while True:
+            v_block, v_exception = v_block_queue.get()
+
+            if isinstance(v_exception, StopIteration):
+                return
+
+            if v_exception is not None:
+                raise v_exception
+
+            #Fetch next block while this one is being used
+            v_request_queue.put(True)
+
+            yield v_block
+    finally:
+        v_request_queue.put(False)
+        v_thread.join()
+
+
+def fetch_block_pair(p_database_1=None, p_database_2=None, p_sql=None, p_block_size=None, p_fetch_mode='thread'):
+    """Get generators of blocks of records returned by a query in both databases.
+
+        Args:
+            p_database_1 (Spartacus.Database.PostgreSQL): the first database, already opened. Defaults to None.
+            p_database_2 (Spartacus.Database.PostgreSQL): the second database, already opened. Defaults to None.
+            p_sql (str): the sql query to be executed in both databases. Defaults to None.
+            p_block_size (int): Number of data records in each block. Defaults to None.
+            p_fetch_mode (str): how blocks are fetched. Defaults to 'thread'.
+                Notes: must be one of:
+                    - serial: each block is fetched when needed.
+                    - thread: next block of each database is fetched by a thread while the current one is used. See "prefetch_blocks".
+                    - asyncio: next blocks of both databases are fetched at the same time by an event loop, through their own
+                      asynchronous connections. See "async_fetch.ConcurrentBlocks".
+
+        Returns:
+            tuple: pair of iterators of blocks, one for each database, as returned by "fetch_blocks". They should be closed if not exhausted.
+
+        Raises:
+            custom_exceptions.InvalidParameterValueException.
+    """
+
+    if p_fetch_mode not in FETCH_MODE_LIST:
+        raise custom_exceptions.InvalidParameterValueException('"p_fetch_mode" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(FETCH_MODE_LIST)), p_fetch_mode)
+
+    if p_fetch_mode == 'asyncio':
+        v_blocks = async_fetch.ConcurrentBlocks(p_database_list=[p_database_1, p_database_2], p_sql=p_sql, p_block_size=p_block_size)
+
+        return (v_blocks.get_blocks(p_index=0), v_blocks.get_blocks(p_index=1))
+
+    v_blocks_1 = fetch_blocks(p_database=p_database_1, p_sql=p_sql, p_block_size=p_block_size)
+    v_blocks_2 = fetch_blocks(p_database=p_database_2, p_sql=p_sql, p_block_size=p_block_size)
+
+    if p_fetch_mode == 'thread':
+        v_blocks_1 = prefetch_blocks(p_blocks=v_blocks_1)
+        v_blocks_2 = prefetch_blocks(p_blocks=v_blocks_2)
+
+    return (v_blocks_1, v_blocks_2)
+
+
+def close_blocks(p_blocks=None):
+    """Close an iterator of blocks, as returned by "fetch_block_pair", if it was not exhausted. Blocks left unfetched, as when
+    a comparison fails, would keep their connection busy in an open transaction.
+
+        Args:
+            p_blocks (iterator): the iterator of blocks. Iterators without "close" method, like lists, are left as they are. Defaults to None.
+    """
+
+    if hasattr(p_blocks, 'close'):
+        p_blocks.close()
+
+
+def compare_blocks(p_blocks_1=None, p_blocks_2=None, p_key=None, p_inserted_callback=None, p_updated_callback=None, p_deleted_callback=None, p_equal_callback=None, p_sort_key_dict=None):
+    """Used to compare records of two sequences of datatables. Records must be ordered by their keys, as returned by "get_key_function".
+
+        Args:
+            p_blocks_1 (iterator): blocks of records of the first database. Each item is a Spartacus.Database.DataTable instance. Defaults to None.
+            p_blocks_2 (iterator): blocks of records of the second database. Each item is a Spartacus.Database.DataTable instance. Defaults to None.
+            p_key (list): list of columns that form the records key. Defaults to None.
+            p_inserted_callback (function): callback executed when an inserted record is found in database 2. Defaults to None.
+                Notes: check "compare_datatables" for its parameters.
+            p_updated_callback (function): callback executed when an updated record is found in database 2. Defaults to None.
+                Notes: check "compare_datatables" for its parameters.
+            p_deleted_callback (function): the callback executed when a deleted record is not found in database 2. Defaults to None.
+                Notes: check "compare_datatables" for its parameters.
+            p_equal_callback (function): the callback executed when a record exists in tha same way in both databases. Defaults to None.
+                Notes: check "compare_datatables" for its parameters.
+            p_sort_key_dict (dict): sort key functions of key columns. Check "get_key_function". Defaults to None.
+
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            Exception: if datatables have different columns.
+    """
+
+    if not isinstance(p_key, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_key" parameter must be a "list" instance.', p_key)
+
+    v_blocks_1 = iter(p_blocks_1)
+    v_blocks_2 = iter(p_blocks_2)
+
+    try:
+        #Query first block in each database
+        v_table_1 = next(v_blocks_1)
+        v_table_2 = next(v_blocks_2)
+
+        if v_table_1.Columns != v_table_2.Columns:
+            raise Exception('Cannot compare table with different columns.')
+
+        v_columns = v_table_1.Columns
+        v_equal = v_table_1.Equal
+        v_get_key = get_key_function(p_columns=v_columns, p_key=p_key, p_sort_key_dict=p_sort_key_dict)
+
+        v_rows_1 = itertools.chain(v_table_1.Rows, (v_row for v_table in v_blocks_1 for v_row in v_table.Rows))
+        v_rows_2 = itertools.chain(v_table_2.Rows, (v_row for v_table in v_blocks_2 for v_row in v_table.Rows))
+
+        v_row_1 = next(v_rows_1, None)
+        v_row_2 = next(v_rows_2, None)
+        v_key_1 = v_get_key(v_row_1) if v_row_1 is not None else None
+        v_key_2 = v_get_key(v_row_2) if v_row_2 is not None else None
+
+        #Main loop, compare records while both sides have data
+        while v_row_1 is not None and v_row_2 is not None:
+            #Record in both datatables
+            if v_key_1 == v_key_2:
+                if v_row_1 == v_row_2:
+                    if p_equal_callback is not None:
+                        p_equal_callback(v_columns, v_row_2, p_key)
+                else:
+                    v_all_diffs = [
+                        {
+                            'column': v_column,
+                            'old_value': v_row_1[v_index],
+                            'new_value': v_row_2[v_index]
+                        }
+                        for v_index, v_column in enumerate(v_columns)
+                        if not v_equal(v_row_1[v_index], v_row_2[v_index])
+                    ]
+
+                    if len(v_all_diffs) == 0:
+                        if p_equal_callback is not None:
+                            p_equal_callback(v_columns, v_row_2, p_key)
+                    elif p_updated_callback is not None:
+                        p_updated_callback(v_columns, v_row_1, v_row_2, p_key, v_all_diffs)
+
+                v_row_1 = next(v_rows_1, None)
+                v_row_2 = next(v_rows_2, None)
+                v_key_1 = v_get_key(v_row_1) if v_row_1 is not None else None
+                v_key_2 = v_get_key(v_row_2) if v_row_2 is not None else None
+
+                continue
+
+            try:
+                v_is_deleted = v_key_1 < v_key_2
+            except TypeError:
+                v_is_deleted = get_sortable_key(p_key=v_key_1) < get_sortable_key(p_key=v_key_2)
+
+            #Record was deleted from second database
+            if v_is_deleted:
+                if p_deleted_callback is not None:
+                    p_deleted_callback(v_columns, v_row_1, p_key)
+
+                v_row_1 = next(v_rows_1, None)
+                v_key_1 = v_get_key(v_row_1) if v_row_1 is not None else None
+            #Record was inserted into second database
+            else:
+                if p_inserted_callback is not None:
+                    p_inserted_callback(v_columns, v_row_2, p_key)
+
+                v_row_2 = next(v_rows_2, None)
+                v_key_2 = v_get_key(v_row_2) if v_row_2 is not None else None
+
+        #Data fetch finished on first database, so let's insert remaining rows of second one, if any
+        while v_row_2 is not None:
+            if p_inserted_callback is not None:
+                p_inserted_callback(v_columns, v_row_2, p_key)
+
+            v_row_2 = next(v_rows_2, None)
+
+        #Data fetch finished on second database, so let's delete remaining rows of first one, if any
+        while v_row_1 is not None:
+            if p_deleted_callback is not None:
+                p_deleted_callback(v_columns, v_row_1, p_key)
+
+            v_row_1 = next(v_rows_1, None)
+
+    finally:
+        close_blocks(p_blocks=v_blocks_1)
+        close_blocks(p_blocks=v_blocks_2)
+
+
+def compare_datatables(p_database_1=None, p_database_2=None, p_block_size=None, p_key=None, p_sql=None, p_inserted_callback=None, p_updated_callback=None, p_deleted_callback=None, p_equal_callback=None, p_fetch_mode='thread'):
     """Used to compare data between datatables. Such objects are fetched by blocks using given database connections and SQL query.
+    Records are ordered by the text representation of their key columns in "C" collation, so key columns must hold text values.
 
         Args:
             p_database_1 (Spartacus.Database.PostgreSQL): the first database. Defaults to None.
@@ -43,6 +928,7 @@ def compare_datatables(p_database_1=None, p_database_2=None, p_block_size=None,
                     p_columns (list): list of columns that are present in p_row parameter.
                     p_row (list): the row that that matched.
                     p_key (list): the key used for comparison.
+            p_fetch_mode (str): how blocks are fetched. Check "fetch_block_pair" for allowed values. Defaults to 'thread'.
 
         Raises:
             custom_exceptions.InvalidParameterTypeException.
@@ -79,137 +965,77 @@ def compare_datatables(p_database_1=None, p_database_2=None, p_block_size=None,
     if p_equal_callback is not None and not callable(p_equal_callback):
         raise custom_exceptions.InvalidParameterTypeException('"p_equal_callback" parameter must be a callable "function".', p_equal_callback)
 
+    if p_fetch_mode not in FETCH_MODE_LIST:
+        raise custom_exceptions.InvalidParameterValueException('"p_fetch_mode" parameter must be one between: {p_modes}.'.format(p_modes=', '.join(FETCH_MODE_LIST)), p_fetch_mode)
+
     p_database_1.Open(p_autocommit=False)
     p_database_2.Open(p_autocommit=False)
 
-    #Query first block in each database
-    v_table_1 = p_database_1.QueryBlock(p_sql=p_sql, p_blocksize=p_block_size)
-    v_table_2 = p_database_2.QueryBlock(p_sql=p_sql, p_blocksize=p_block_size)
-
-    if v_table_1.Columns != v_table_2.Columns:
-        raise Exception('Cannot compare table with different columns.')
-
-    #Set comparison key
-    v_key = p_key
-
-    v_has_more_data_1 = True
-    v_has_more_data_2 = True
-    v_index_1 = 0
-    v_index_2 = 0
-
-    #Main loop, compare tables data
-    while v_has_more_data_1 or v_has_more_data_2:
-        while v_index_1 < len(v_table_1.Rows) and v_index_2 < len(v_table_2.Rows):
-            v_row_1 = v_table_1.Rows[v_index_1]
-            v_row_2 = v_table_2.Rows[v_index_2]
-
-            v_record_1_pk = '_'.join(
-                [
-                    str(v_row_1[v_column])
-                    for v_column in v_key
-                ]
-            )
-
-            v_record_2_pk = '_'.join(
-                [
-                    str(v_row_2[v_column])
-                    for v_column in v_key
-                ]
-            )
+    #Order records by their key in "C" collation, which is the same order of python strings
+    v_sql = '''
+        SELECT *
+        FROM (
+            {p_sql}
+        ) data_comparer_rows
+        ORDER BY {p_order}
+    '''.format(
+        p_sql=p_sql,
+        p_order=','.join([
+            'data_comparer_rows.{p_column}::TEXT COLLATE "C"'.format(p_column=v_column)
+            for v_column in p_key
+        ])
+    )
 
-            #Record in both datatables
-            if v_record_1_pk == v_record_2_pk:
-                v_all_match = True
-                v_output_row = []
-                v_all_diffs = []
-
-                for v_column in v_table_1.Columns:
-                    if not v_table_1.Equal(v_row_1[v_column], v_row_2[v_column]):
-                        v_all_diffs.append({
-                            'column': v_column,
-                            'old_value': v_row_1[v_column],
-                            'new_value': v_row_2[v_column]
-                        })
-                        v_all_match = False
+    v_blocks_1, v_blocks_2 = fetch_block_pair(
+        p_database_1=p_database_1,
+        p_database_2=p_database_2,
+        p_sql=v_sql,
+        p_block_size=p_block_size,
+        p_fetch_mode=p_fetch_mode
+    )
 
-                if v_all_match:
-                    if p_equal_callback is not None:
-                        p_equal_callback(
-                            v_table_2.Columns,
-                            v_row_2,
-                            v_key
-                        )
-                else:
-                    if p_updated_callback is not None:
-                        p_updated_callback(
-                            v_table_1.Columns,
-                            v_row_1,
-                            v_row_2,
-                            v_key,
-                            v_all_diffs,
-                        )
-
-                v_index_1 += 1
-                v_index_2 += 1
-            #Record was deleted from second database
-            elif v_record_1_pk < v_record_2_pk:
-                if p_deleted_callback is not None:
-                    p_deleted_callback(
-                        v_table_1.Columns,
-                        v_row_1,
-                        v_key
-                    )
+    compare_blocks(
+        p_blocks_1=v_blocks_1,
+        p_blocks_2=v_blocks_2,
+        p_key=p_key,
+        p_inserted_callback=p_inserted_callback,
+        p_updated_callback=p_updated_callback,
+        p_deleted_callback=p_deleted_callback,
+        p_equal_callback=p_equal_callback
+    )
 
-                v_index_1 += 1
-            #Record was inserted into second database
-            else:
-                if p_inserted_callback is not None:
-                    p_inserted_callback(
-                        v_table_2.Columns,
-                        v_row_2,
-                        v_key
-                    )
+    p_database_1.Close(p_commit=False)
+    p_database_2.Close(p_commit=False)
 
-                v_index_2 += 1
 
-        v_has_more_data_1 = not p_database_1.v_start
-        v_has_more_data_2 = not p_database_2.v_start
+def get_makespan(p_duration_list=None, p_worker_count=None):
+    """Get the time a pool of workers takes to run tasks of given durations, each idle worker taking the next task in list order.
 
-        if not v_has_more_data_1:
-            #Data fetch finished on first database, so let's insert remaining rows of table 2, if any
-            while v_index_2 < len(v_table_2.Rows):
-                v_row_2 = v_table_2.Rows[v_index_2]
+        Args:
+            p_duration_list (list): list of durations of the tasks, in the order they are submitted. Defaults to None.
+            p_worker_count (int): number of workers of the pool. Defaults to None.
 
-                if p_inserted_callback is not None:
-                    p_inserted_callback(
-                        v_table_2.Columns,
-                        v_row_2,
-                        v_key
-                    )
+        Returns:
+            float: the time the last task finishes.
 
-                v_index_2 += 1
+        Raises:
+            custom_exceptions.InvalidParameterTypeException.
+            custom_exceptions.InvalidParameterValueException.
+    """
 
-        if not v_has_more_data_2:
-            #Data fetch finished on second database, so let's insert remaining rows of table 1, if any
-            while v_index_1 < len(v_table_1.Rows):
-                v_row_1 = v_table_1.Rows[v_index_1]
+    if not isinstance(p_duration_list, list):
+        raise custom_exceptions.InvalidParameterTypeException('"p_duration_list" parameter must be a "list" instance.', p_duration_list)
 
-                if p_deleted_callback is not None:
-                    p_deleted_callback(
-                        v_table_1.Columns,
-                        v_row_1,
-                        v_key
-                    )
+    if not isinstance(p_worker_count, int):
+        raise custom_exceptions.InvalidParameterTypeException('"p_worker_count" parameter must be an "int" instance.', p_worker_count)
 
-                v_index_1 += 1
+    if p_worker_count < 1:
+        raise custom_exceptions.InvalidParameterValueException('"p_worker_count" parameter must be a positive "int" instance.', p_worker_count)
 
-        if v_index_1 == len(v_table_1.Rows) and v_has_more_data_1:
-            v_table_1 = p_database_1.QueryBlock(p_sql=p_sql, p_blocksize=p_block_size)
-            v_index_1 = 0
+    #Time each worker gets idle
+    v_worker_heap = [0.0] * p_worker_count
 
-        if v_index_2 == len(v_table_2.Rows) and v_has_more_data_2:
-            v_table_2 = p_database_2.QueryBlock(p_sql=p_sql, p_blocksize=p_block_size)
-            v_index_2 = 0
+    for v_duration in p_duration_list:
+        heapq.heappush(v_worker_heap, heapq.heappop(v_worker_heap) + v_duration)
 
-    p_database_1.Close(p_commit=False)
-    p_database_2.Close(p_commit=False)
+    return max(v_worker_heap)